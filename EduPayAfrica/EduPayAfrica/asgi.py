@@ -3,6 +3,11 @@ ASGI config for EduPayAfrica project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Django itself only serves HTTP, so lifespan events are handled here: startup
+opens the shared httpx client that async Firebase login uses (see
+accounts.firebase_tokens) and shutdown closes it. Serve with
+``uvicorn EduPayAfrica.asgi:application --lifespan on``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -13,4 +18,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EduPayAfrica.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from accounts.firebase_tokens import close_async_http_client, open_async_http_client  # noqa: E402
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            open_async_http_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_http_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -1,15 +1,166 @@
 """Custom middleware for EduPayAfrica platform."""
 
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils.functional import SimpleLazyObject
+
 from platform_admin.models import PlatformUserProfile
+from platform_admin.utils import get_or_create_user_profile
+
+request_logger = logging.getLogger("EduPayAfrica.requests")
+
+# Profile of the request being handled in this context (None outside requests)
+_current_profile: ContextVar = ContextVar("request_profile", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view issued more queries than its QUERY_BUDGETS entry allows."""
+
+
+def _load_platform_profile(user):
+    profile = PlatformUserProfile.objects.filter(user=user).first()
+    if profile is None:
+        # Sessions opened before profiles were provisioned at login
+        profile = get_or_create_user_profile(user)
+    # Share the row with request.user.platform_profile
+    PlatformUserProfile.user.field.remote_field.set_cached_value(user, profile)
+    return profile
 
 
 class PlatformUserProfileMiddleware:
-    """Auto-create PlatformUserProfile for authenticated users."""
+    """
+    Attach a lazily loaded PlatformUserProfile as request.platform_profile.
+
+    Profiles are provisioned when a user is created or logs in (see
+    platform_admin.signals), so requests only read the profile - and only
+    when a view actually uses it. Anonymous requests get None.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        if request.user.is_authenticated:
-            PlatformUserProfile.objects.get_or_create(user=request.user)
+        if not hasattr(request, "platform_profile"):
+            user = request.user
+            if user.is_authenticated:
+                request.platform_profile = SimpleLazyObject(lambda: _load_platform_profile(user))
+            else:
+                request.platform_profile = None
         return self.get_response(request)
+
+
+# Savepoints only appear when a request runs inside an outer transaction
+# (tests, the benchmark harness), so they are timed but not counted as queries
+_TRANSACTION_CONTROL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class RequestProfile:
+    """Query count, DB time and template time collected for one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not sql.startswith(_TRANSACTION_CONTROL):
+                self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def _timed_template_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+    wrapper._request_profiled = True
+    return wrapper
+
+
+def _install_template_timer():
+    # Top-level renders go through the backend Template; {% include %} and
+    # {% extends %} render inside it, so nothing is counted twice.
+    if not getattr(DjangoTemplate.render, "_request_profiled", False):
+        DjangoTemplate.render = _timed_template_render(DjangoTemplate.render)
+
+
+class RequestProfilingMiddleware:
+    """
+    Record query count, DB time, template render time and total time per
+    resolved URL name.
+
+    Results are logged on the ``EduPayAfrica.requests`` logger, optionally sent
+    as a ``Server-Timing`` header (REQUEST_PROFILING_SERVER_TIMING), and
+    checked against QUERY_BUDGETS ({url_name: max_queries}). A view over its
+    budget logs a warning, or raises QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is set (as it is under the test runner).
+
+    Queries run while a StreamingHttpResponse is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        total_time = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view_name = (match.view_name if match else None) or "unresolved"
+
+        if getattr(settings, "REQUEST_PROFILING_SERVER_TIMING", False):
+            response["Server-Timing"] = (
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries", '
+                f"tpl;dur={profile.template_time * 1000:.1f}, "
+                f"total;dur={total_time * 1000:.1f}"
+            )
+
+        metrics = {
+            "view": view_name,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": profile.queries,
+            "db_ms": round(profile.db_time * 1000, 1),
+            "template_ms": round(profile.template_time * 1000, 1),
+            "total_ms": round(total_time * 1000, 1),
+        }
+        request_logger.info(
+            " ".join(f"{key}={value}" for key, value in metrics.items()),
+            extra={"request_metrics": metrics},
+        )
+
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view_name)
+        if budget is not None and profile.queries > budget:
+            message = f"{view_name} issued {profile.queries} queries (budget {budget})"
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            request_logger.warning(message, extra={"request_metrics": metrics})
+
+        return response
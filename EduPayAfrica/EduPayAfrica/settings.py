@@ -97,6 +97,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'EduPayAfrica.middleware.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -200,6 +201,91 @@ else:
 
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@edupayafrica.com')
 
+# Transactional email outbox (core.outbox)
+# Confirmation emails are queued and sent by `python manage.py send_outbox_emails`.
+# Set EMAIL_OUTBOX_EAGER=True to send them in-process once the response is sent (no worker needed).
+EMAIL_OUTBOX_EAGER = os.environ.get('EMAIL_OUTBOX_EAGER', 'False') == 'True'
+EMAIL_OUTBOX_RETRY_BACKOFF = int(os.environ.get('EMAIL_OUTBOX_RETRY_BACKOFF', 60))
+
+# Cache
+# Redis in production (REDIS_URL), a shared directory when several processes
+# run without Redis (CACHE_DIR), otherwise per-process local memory.
+# Institution pages cache computed data under versioned keys (institutions.cache),
+# so the backend only needs get/set/incr. The job worker invalidates those keys
+# too, and session-cached institution contexts are trusted while their cached
+# version is unchanged, so `manage.py check --deploy` fails on a per-process cache.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_DIR = os.environ.get('CACHE_DIR', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'edupay',
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'KEY_PREFIX': 'edupay',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'edupay',
+        }
+    }
+INSTITUTION_CACHE_TIMEOUT = int(os.environ.get('INSTITUTION_CACHE_TIMEOUT', 300))
+
+# Background jobs (institutions.services.jobs)
+# Jobs are queued in the database and processed by `python manage.py run_institution_jobs`.
+# Set INSTITUTION_JOBS_EAGER=True to run them in-process once the response is sent (no worker needed).
+INSTITUTION_JOBS_EAGER = os.environ.get('INSTITUTION_JOBS_EAGER', 'False') == 'True'
+INSTITUTION_JOBS_RETRY_BACKOFF = int(os.environ.get('INSTITUTION_JOBS_RETRY_BACKOFF', 30))
+INSTITUTION_JOBS_STALE_AFTER = int(os.environ.get('INSTITUTION_JOBS_STALE_AFTER', 30 * 60))
+
+# Request profiling (EduPayAfrica.middleware.RequestProfilingMiddleware)
+# Every request logs its query count, DB/template/total time on the
+# "EduPayAfrica.requests" logger. Server-Timing headers default to on in DEBUG.
+REQUEST_PROFILING_SERVER_TIMING = os.environ.get('REQUEST_PROFILING_SERVER_TIMING', str(DEBUG)) == 'True'
+
+# Maximum queries per URL name, counted across the whole middleware stack.
+# Over-budget requests log a warning; the test runner makes them fail.
+# Each includes the session and user queries. The dashboard's also covers a
+# request that resolves the institution context and writes it to the session.
+QUERY_BUDGETS = {
+    'institutions:dashboard': 7,
+    'institutions:students': 8,
+    'institutions:fee_analysis': 8,
+    'institutions:reports': 8,
+    'institutions:fee_structure_management': 8,
+    'institutions:job_status': 5,
+}
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+TEST_RUNNER = 'EduPayAfrica.test_runner.QueryBudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'EduPayAfrica.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Firebase Configuration
 FIREBASE_CONFIG = {
     'apiKey': os.environ.get('FIREBASE_API_KEY', ''),
@@ -215,6 +301,27 @@ FIREBASE_CONFIG = {
 FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH', '')
 SUPER_ADMIN_EMAIL = os.environ.get('SUPER_ADMIN_EMAIL', 'frankmk2025@gmail.com')
 
+# Email/password logins are checked against Firebase; username logins
+# (e.g. the Django admin) still use the local password.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.FirebaseBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Firebase ID token verification (accounts.firebase_tokens)
+# Tokens are verified locally against Google's signing keys, which are cached
+# per their Cache-Control header; verified claims are cached until expiry.
+FIREBASE_PUBLIC_KEYS_URL = os.environ.get(
+    'FIREBASE_PUBLIC_KEYS_URL',
+    'https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com',
+)
+FIREBASE_HTTP_TIMEOUT = (
+    float(os.environ.get('FIREBASE_HTTP_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('FIREBASE_HTTP_READ_TIMEOUT', 5)),
+)
+FIREBASE_HTTP_POOL_SIZE = int(os.environ.get('FIREBASE_HTTP_POOL_SIZE', 16))
+FIREBASE_TOKEN_CACHE_SIZE = int(os.environ.get('FIREBASE_TOKEN_CACHE_SIZE', 1024))
+
 
 JAZZMIN_SETTINGS = {
     "site_title": "EduPay Africa Adminstartion",
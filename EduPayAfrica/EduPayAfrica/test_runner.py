@@ -0,0 +1,25 @@
+"""Test runner that turns query budget overruns into test failures."""
+
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with QUERY_BUDGET_STRICT enabled.
+
+    Any request in a test that exceeds its QUERY_BUDGETS entry raises
+    QueryBudgetExceeded, which the test client re-raises in the test.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+
+    def run_suite(self, suite, **kwargs):
+        # Per-request metric lines would drown the test output. Set here rather
+        # than in setup_test_environment because discovery may reconfigure logging.
+        logging.getLogger("EduPayAfrica.requests").setLevel(logging.WARNING)
+        return super().run_suite(suite, **kwargs)
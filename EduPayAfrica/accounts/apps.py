@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        # Let Firebase logins record last_login in their own user write
+        from .signals import replace_last_login_receiver
+        replace_last_login_receiver()
@@ -0,0 +1,37 @@
+"""
+Authentication Backends
+Lets django.contrib.auth.authenticate() and aauthenticate() sign users in with Firebase.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import ModelBackend
+
+from .firebase_auth import afirebase_login, firebase_login
+from .firebase_tokens import get_async_http_client
+
+
+class FirebaseBackend(ModelBackend):
+    """
+    Authenticate email/password credentials against Firebase.
+
+    Called as authenticate(request, email=..., password=...); username-based
+    credentials fall through to the next backend. Under ASGI, aauthenticate()
+    awaits Firebase on the httpx client opened by the lifespan in
+    EduPayAfrica/asgi.py, so login_view waits without holding a thread.
+    Permissions and get_user come from ModelBackend.
+    """
+
+    def authenticate(self, request, email=None, password=None):
+        if not email or not password:
+            return None
+        user = firebase_login(request, email, password, can_authenticate=self.user_can_authenticate)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aauthenticate(self, request, email=None, password=None):
+        if not email or not password:
+            return None
+        if get_async_http_client() is None:
+            # No ASGI lifespan (WSGI, the test client): the pooled requests path, in a thread
+            return await sync_to_async(self.authenticate)(request, email=email, password=password)
+        user = await afirebase_login(request, email, password, can_authenticate=self.user_can_authenticate)
+        return user if user is not None and self.user_can_authenticate(user) else None
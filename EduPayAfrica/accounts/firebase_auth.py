@@ -5,12 +5,16 @@ Handles authentication with Firebase and synchronizes users with Django.
 
 import json
 import os
-from typing import Optional
+from functools import cache
+from typing import Callable, Optional
 
 import firebase_admin
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from firebase_admin import auth, credentials
 
+from .firebase_tokens import get_async_http_client, get_http_session, get_token_verifier, http_timeout
+
 User = get_user_model()
 
 # Initialize Firebase Admin SDK
@@ -18,16 +22,31 @@ FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH', '')
 FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID', '')
 
 
-def initialize_firebase():
-    """Initialize Firebase Admin SDK from credentials with explicit project ID."""
-    if firebase_admin._apps:
-        return firebase_admin.get_app()
+@cache
+def firebase_project_id() -> str:
+    """
+    Project ID from the environment, or from the service account file.
 
+    Resolved once per process: every login verifies a token against it, and
+    neither the environment nor the credentials file changes while running.
+    """
     project_id = (
         FIREBASE_PROJECT_ID
         or os.environ.get('GOOGLE_CLOUD_PROJECT')
         or os.environ.get('GCLOUD_PROJECT')
     )
+    if not project_id and FIREBASE_CREDENTIALS_PATH and os.path.exists(FIREBASE_CREDENTIALS_PATH):
+        with open(FIREBASE_CREDENTIALS_PATH) as f:
+            project_id = json.load(f).get('project_id', '')
+    return project_id
+
+
+def initialize_firebase():
+    """Initialize Firebase Admin SDK from credentials with explicit project ID."""
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+
+    project_id = firebase_project_id()
 
     options = {'projectId': project_id} if project_id else None
 
@@ -49,6 +68,9 @@ def verify_firebase_token(id_token: str) -> Optional[dict]:
     """
     Verify a Firebase ID token and return the decoded claims.
 
+    Verification happens locally against Google's cached signing keys;
+    see firebase_tokens.FirebaseTokenVerifier.
+
     Args:
         id_token: Firebase ID token from client
 
@@ -56,14 +78,41 @@ def verify_firebase_token(id_token: str) -> Optional[dict]:
         Decoded token claims or None if invalid
     """
     try:
-        initialize_firebase()
-        decoded_token = auth.verify_id_token(id_token)
-        return decoded_token
+        return get_token_verifier(firebase_project_id()).verify(id_token)
+    except Exception as e:
+        print(f"Token verification failed: {e}")
+        return None
+
+
+async def averify_firebase_token(id_token: str) -> Optional[dict]:
+    """Async version of verify_firebase_token; a key refresh goes over the shared httpx client."""
+    try:
+        return await get_token_verifier(firebase_project_id()).averify(id_token, get_async_http_client())
     except Exception as e:
         print(f"Token verification failed: {e}")
         return None
 
 
+SIGN_IN_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={api_key}"
+
+
+def _sign_in_request(email: str, password: str):
+    """URL and payload for the Identity Toolkit email/password sign-in."""
+    api_key = os.environ.get('FIREBASE_API_KEY', '')
+    if not api_key:
+        raise ValueError("FIREBASE_API_KEY not configured")
+    payload = {"email": email, "password": password, "returnSecureToken": True}
+    return SIGN_IN_URL.format(api_key=api_key), payload
+
+
+def _id_token_from_response(status_code: int, data: dict) -> Optional[str]:
+    if status_code == 200:
+        return data.get('idToken')
+    error_message = data.get('error', {}).get('message', 'Authentication failed')
+    print(f"Firebase auth error: {error_message}")
+    return None
+
+
 def authenticate_firebase_user(email: str, password: str) -> Optional[str]:
     """
     Authenticate user with Firebase REST API using email and password.
@@ -79,35 +128,91 @@ def authenticate_firebase_user(email: str, password: str) -> Optional[str]:
     try:
         # Note: This uses the REST API because firebase-admin SDK doesn't support
         # email/password authentication directly. In production, use Firebase JS SDK on client.
-        import requests
-
-        api_key = os.environ.get('FIREBASE_API_KEY', '')
-        if not api_key:
-            raise ValueError("FIREBASE_API_KEY not configured")
-
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={api_key}"
-        payload = {"email": email, "password": password, "returnSecureToken": True}
+        url, payload = _sign_in_request(email, password)
+        response = get_http_session().post(url, json=payload, timeout=http_timeout())
+        return _id_token_from_response(response.status_code, response.json())
+    except Exception as e:
+        print(f"Firebase authentication error: {e}")
+        return None
 
-        response = requests.post(url, json=payload)
-        data = response.json()
 
-        if response.status_code == 200:
-            return data.get('idToken')
-        else:
-            error_message = data.get('error', {}).get('message', 'Authentication failed')
-            print(f"Firebase auth error: {error_message}")
-            return None
+async def aauthenticate_firebase_user(email: str, password: str) -> Optional[str]:
+    """Async version of authenticate_firebase_user, for ASGI views."""
+    try:
+        url, payload = _sign_in_request(email, password)
+        response = await get_async_http_client().post(url, json=payload)
+        return _id_token_from_response(response.status_code, response.json())
     except Exception as e:
         print(f"Firebase authentication error: {e}")
         return None
 
 
-def get_or_create_django_user(firebase_user: dict) -> Optional[User]:
+def is_super_admin_email(email: str) -> bool:
+    return email == os.environ.get('SUPER_ADMIN_EMAIL', 'frankmk2025@gmail.com')
+
+
+def _new_user_defaults(firebase_user: dict) -> dict:
+    name = firebase_user.get('name', '')
+    defaults = {'email': firebase_user['email'], 'first_name': name.split()[0] if name else ''}
+    if is_super_admin_email(firebase_user['email']):
+        defaults.update(is_staff=True, is_superuser=True)
+    return defaults
+
+
+def _sync_user_fields(user, firebase_user: dict) -> list:
+    """
+    Copy Firebase data onto an existing user.
+
+    Returns:
+        Names of the fields that changed (empty if the user is up to date)
+    """
+    changed = []
+    if user.email != firebase_user['email']:
+        user.email = firebase_user['email']
+        changed.append('email')
+    # The super admin email always gets platform admin rights
+    if is_super_admin_email(firebase_user['email']):
+        for field in ('is_staff', 'is_superuser'):
+            if not getattr(user, field):
+                setattr(user, field, True)
+                changed.append(field)
+    return changed
+
+
+def _accepts(can_authenticate: Optional[Callable], user) -> bool:
+    """Whether the backend will let the user in (ModelBackend's is_active rule by default)."""
+    if can_authenticate is None:
+        return getattr(user, 'is_active', True)
+    return can_authenticate(user)
+
+
+def _login_update_fields(user, changed: list) -> list:
+    """
+    Fold last_login into the sync write, so a login costs one narrow UPDATE.
+
+    The user is flagged so accounts.signals skips Django's own last_login save.
+    """
+    user.last_login = timezone.now()
+    user._last_login_recorded = True
+    return changed + ['last_login']
+
+
+def get_or_create_django_user(
+    firebase_user: dict, record_login: bool = True, can_authenticate: Optional[Callable] = None
+) -> Optional[User]:
     """
     Create or update a Django user from Firebase user data.
 
+    Only changed columns are written. With record_login, last_login is set in
+    the same INSERT or UPDATE, so a returning user with unchanged data costs
+    a single `UPDATE ... SET last_login` and nothing else. Users the backend
+    will reject (inactive ones) are synced but their login is not recorded.
+
     Args:
         firebase_user: Decoded Firebase ID token claims
+        record_login: Set last_login as part of the write
+        can_authenticate: The backend's user_can_authenticate; defaults to
+            requiring is_active
 
     Returns:
         Django User object or None if creation fails
@@ -119,16 +224,23 @@ def get_or_create_django_user(firebase_user: dict) -> Optional[User]:
         if not email or not uid:
             return None
 
+        defaults = _new_user_defaults(firebase_user)
+        if record_login and _accepts(can_authenticate, User(username=email, **defaults)):
+            defaults['last_login'] = timezone.now()
+
         # Get or create Django user
-        user, created = User.objects.get_or_create(
-            username=email,
-            defaults={'email': email, 'first_name': firebase_user.get('name', '').split()[0] if firebase_user.get('name') else ''},
-        )
+        user, created = User.objects.get_or_create(username=email, defaults=defaults)
+
+        if created:
+            user._last_login_recorded = 'last_login' in defaults
+            return user
 
         # Update user info if they already existed
-        if not created:
-            user.email = email
-            user.save()
+        changed = _sync_user_fields(user, firebase_user)
+        if record_login and _accepts(can_authenticate, user):
+            changed = _login_update_fields(user, changed)
+        if changed:
+            user.save(update_fields=changed)
 
         return user
     except Exception as e:
@@ -136,7 +248,42 @@ def get_or_create_django_user(firebase_user: dict) -> Optional[User]:
         return None
 
 
-def firebase_login(request, email: str, password: str) -> Optional[User]:
+async def aget_or_create_django_user(
+    firebase_user: dict, record_login: bool = True, can_authenticate: Optional[Callable] = None
+) -> Optional[User]:
+    """Async version of get_or_create_django_user."""
+    try:
+        email = firebase_user.get('email', '')
+        uid = firebase_user.get('uid', '')
+
+        if not email or not uid:
+            return None
+
+        defaults = _new_user_defaults(firebase_user)
+        if record_login and _accepts(can_authenticate, User(username=email, **defaults)):
+            defaults['last_login'] = timezone.now()
+
+        user, created = await User.objects.aget_or_create(username=email, defaults=defaults)
+
+        if created:
+            user._last_login_recorded = 'last_login' in defaults
+            return user
+
+        changed = _sync_user_fields(user, firebase_user)
+        if record_login and _accepts(can_authenticate, user):
+            changed = _login_update_fields(user, changed)
+        if changed:
+            await user.asave(update_fields=changed)
+
+        return user
+    except Exception as e:
+        print(f"Error creating/updating Django user: {e}")
+        return None
+
+
+def firebase_login(
+    request, email: str, password: str, can_authenticate: Optional[Callable] = None
+) -> Optional[User]:
     """
     Authenticate a user via Firebase and sync with Django.
     Also handles permission setup for super admins.
@@ -145,6 +292,8 @@ def firebase_login(request, email: str, password: str) -> Optional[User]:
         request: Django request object
         email: User email
         password: User password
+        can_authenticate: The calling backend's user_can_authenticate, so
+            last_login is only recorded for users it accepts
 
     Returns:
         Django User object if successful, None otherwise
@@ -160,18 +309,33 @@ def firebase_login(request, email: str, password: str) -> Optional[User]:
         if not decoded_token:
             return None
 
-        # Get or create Django user
-        user = get_or_create_django_user(decoded_token)
-        if not user:
+        # Get or create Django user (super admins get is_staff/is_superuser here)
+        return get_or_create_django_user(decoded_token, can_authenticate=can_authenticate)
+    except Exception as e:
+        print(f"Firebase login error: {e}")
+        return None
+
+
+async def afirebase_login(
+    request, email: str, password: str, can_authenticate: Optional[Callable] = None
+) -> Optional[User]:
+    """
+    Async version of firebase_login.
+
+    The sign-in and any signing key refresh are awaited on the shared httpx
+    client, so under ASGI a slow Google response no longer ties up a thread.
+    Requires the client opened by the ASGI lifespan (get_async_http_client).
+    """
+    try:
+        id_token = await aauthenticate_firebase_user(email, password)
+        if not id_token:
             return None
 
-        # If this is the super admin email, ensure is_staff and is_superuser are set
-        if email == os.environ.get('SUPER_ADMIN_EMAIL', 'frankmk2025@gmail.com'):
-            user.is_staff = True
-            user.is_superuser = True
-            user.save()
+        decoded_token = await averify_firebase_token(id_token)
+        if not decoded_token:
+            return None
 
-        return user
+        return await aget_or_create_django_user(decoded_token, can_authenticate=can_authenticate)
     except Exception as e:
         print(f"Firebase login error: {e}")
         return None
@@ -0,0 +1,367 @@
+"""
+Firebase ID Token Verification
+Verifies Firebase ID tokens locally against Google's published signing keys.
+
+The signing keys are fetched over a pooled HTTP session with explicit
+timeouts and cached for as long as Google's Cache-Control header allows.
+Verified claims are memoised in a bounded LRU until the token expires, so
+repeated verification of the same token costs a dictionary lookup. When a key
+refresh fails, the previous keys keep being used, which keeps logins working
+while Google's endpoints are slow or unavailable.
+
+Async callers (FirebaseBackend.aauthenticate under ASGI) use one long-lived
+httpx.AsyncClient instead, opened and closed by the ASGI lifespan in
+EduPayAfrica/asgi.py; under WSGI there is no async client and the pooled
+requests session is used.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import httpx
+import jwt
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+# (connect, read) seconds for calls to Google
+DEFAULT_TIMEOUT = (3.05, 5)
+# Key lifetime when the response carries no usable Cache-Control header
+DEFAULT_KEY_MAX_AGE = 3600
+# Minimum seconds between refreshes triggered by an unknown key ID
+MIN_REFRESH_INTERVAL = 30
+# Seconds of clock skew tolerated on exp/iat/auth_time
+CLOCK_SKEW = 10
+DEFAULT_CACHE_SIZE = 1024
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+# Failures of a key refresh that fall back to the cached keys
+FETCH_ERRORS = (requests.RequestException, httpx.HTTPError, ValueError, KeyError, jwt.PyJWKError)
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+
+class TokenVerificationError(Exception):
+    """The token is malformed, expired, not issued for this project, or its keys are unavailable."""
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide HTTP session, so calls to Google reuse pooled TLS connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=getattr(settings, "FIREBASE_HTTP_POOL_SIZE", 16))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def open_async_http_client() -> httpx.AsyncClient:
+    """
+    Create the process-wide httpx client; called on ASGI lifespan startup.
+
+    The client belongs to the server's event loop, so it is only opened from
+    the lifespan of the loop that serves requests.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        connect, read = http_timeout()
+        pool_size = getattr(settings, "FIREBASE_HTTP_POOL_SIZE", 16)
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+    return _async_client
+
+
+async def close_async_http_client():
+    """Close the httpx client; called on ASGI lifespan shutdown."""
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
+
+
+def get_async_http_client() -> Optional[httpx.AsyncClient]:
+    """The open httpx client, or None when not served by the ASGI lifespan."""
+    if _async_client is None or _async_client.is_closed:
+        return None
+    return _async_client
+
+
+def http_timeout():
+    """(connect, read) timeout for calls to Firebase and Google endpoints."""
+    return getattr(settings, "FIREBASE_HTTP_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def cache_max_age(cache_control: str) -> int:
+    """Seconds a response may be cached according to its Cache-Control header."""
+    directives = (cache_control or "").lower()
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    match = _MAX_AGE.search(directives)
+    return int(match.group(1)) if match else DEFAULT_KEY_MAX_AGE
+
+
+class PublicKeyCache:
+    """Google's token signing keys (a JWKS document), keyed by key ID."""
+
+    def __init__(self, url: str = GOOGLE_JWKS_URL, session: Optional[requests.Session] = None, timeout=None, clock: Callable[[], float] = time.time):
+        self.url = url
+        self.session = session or get_http_session()
+        self.timeout = timeout or http_timeout()
+        self.clock = clock
+        self.keys = {}
+        self.expires_at = 0.0
+        self.fetched_at = None
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def get(self, kid: str):
+        """
+        Return the public key for `kid`, refreshing the key set when needed.
+
+        Args:
+            kid: Key ID from the token header
+
+        Returns:
+            Public key usable by jwt.decode
+
+        Raises:
+            TokenVerificationError: If the key is unknown or no keys could be loaded
+        """
+        with self._lock:
+            now = self.clock()
+            if self._needs_refresh(kid, now):
+                self.fetched_at = now
+                try:
+                    response = self.session.get(self.url, timeout=self.timeout)
+                    response.raise_for_status()
+                    self._install(now, response)
+                except FETCH_ERRORS as e:
+                    self._refresh_failed(e)
+            return self._key(kid)
+
+    async def aget(self, kid: str, client: httpx.AsyncClient):
+        """
+        Async version of get(), fetching over `client`.
+
+        Concurrent callers that need a refresh share one in-flight fetch.
+        """
+        with self._lock:
+            now = self.clock()
+            pending = None
+            if self._needs_refresh(kid, now):
+                if self._pending is None:
+                    self.fetched_at = now
+                    self._pending = asyncio.ensure_future(self._afetch(client, now))
+                pending = self._pending
+
+        if pending is not None:
+            error = await asyncio.shield(pending)
+            if error is not None:
+                with self._lock:
+                    self._refresh_failed(error)
+        with self._lock:
+            return self._key(kid)
+
+    async def _afetch(self, client: httpx.AsyncClient, now: float):
+        """Fetch and install the key set; returns the error instead of raising."""
+        try:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            with self._lock:
+                self._install(now, response)
+        except FETCH_ERRORS as e:
+            return e
+        finally:
+            self._pending = None
+        return None
+
+    def _needs_refresh(self, kid: str, now: float) -> bool:
+        stale = now >= self.expires_at
+        # Keys rotate ahead of use, but an unknown ID may mean we missed a rotation
+        unknown = kid not in self.keys and (self.fetched_at is None or now - self.fetched_at >= MIN_REFRESH_INTERVAL)
+        return stale or unknown
+
+    def _install(self, now: float, response):
+        """Replace the key set from a requests or httpx response."""
+        self.keys = {
+            jwk["kid"]: jwt.PyJWK(jwk, algorithm="RS256").key
+            for jwk in response.json()["keys"]
+        }
+        self.expires_at = now + cache_max_age(response.headers.get("Cache-Control", ""))
+
+    def _refresh_failed(self, error: Exception):
+        if not self.keys:
+            raise TokenVerificationError(f"Could not load signing keys: {error}") from error
+        logger.warning("Firebase signing key refresh failed, using cached keys: %s", error)
+
+    def _key(self, kid: str):
+        try:
+            return self.keys[kid]
+        except KeyError:
+            raise TokenVerificationError(f"Unknown signing key ID {kid!r}") from None
+
+
+class ClaimsCache:
+    """Bounded LRU of verified claims, keyed by a digest of the token."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None:
+                return None
+            if claims["exp"] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class FirebaseTokenVerifier:
+    """
+    Verify Firebase ID tokens for one project without calling the Admin SDK.
+
+    Performs the checks firebase_admin.auth.verify_id_token does (RS256
+    signature by a current Google key, audience, issuer, expiry, subject)
+    and returns the claims with `uid` set, in the same shape.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        keys_url: str = GOOGLE_JWKS_URL,
+        session: Optional[requests.Session] = None,
+        timeout=None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not project_id:
+            raise TokenVerificationError("Firebase project ID not configured")
+        self.project_id = project_id
+        self.issuer = ISSUER_PREFIX + project_id
+        self.clock = clock
+        self.keys = PublicKeyCache(keys_url, session=session, timeout=timeout, clock=clock)
+        self.claims = ClaimsCache(cache_size, clock=clock)
+
+    def verify(self, id_token: str) -> dict:
+        """
+        Verify an ID token and return its decoded claims.
+
+        Args:
+            id_token: Firebase ID token from the client or the REST sign-in
+
+        Returns:
+            Decoded claims, including `uid`
+
+        Raises:
+            TokenVerificationError: If the token is not valid for this project
+        """
+        cached = self._cached_claims(id_token)
+        if cached is not None:
+            return cached
+        return self._decode(id_token, self.keys.get(self._key_id(id_token)))
+
+    async def averify(self, id_token: str, client: httpx.AsyncClient) -> dict:
+        """Async version of verify(), refreshing keys over `client`."""
+        cached = self._cached_claims(id_token)
+        if cached is not None:
+            return cached
+        return self._decode(id_token, await self.keys.aget(self._key_id(id_token), client))
+
+    def _cached_claims(self, id_token: str) -> Optional[dict]:
+        if not id_token or not isinstance(id_token, str):
+            raise TokenVerificationError("ID token must be a non-empty string")
+        cached = self.claims.get(id_token)
+        return dict(cached) if cached is not None else None
+
+    @staticmethod
+    def _key_id(id_token: str) -> str:
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed ID token: {e}") from e
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise TokenVerificationError("ID token must be RS256-signed with a key ID")
+        return header["kid"]
+
+    def _decode(self, id_token: str, key) -> dict:
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=CLOCK_SKEW,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Invalid ID token: {e}") from e
+
+        subject = claims["sub"]
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise TokenVerificationError("ID token has an invalid subject")
+        if claims.get("auth_time", 0) > self.clock() + CLOCK_SKEW:
+            raise TokenVerificationError("ID token has an authentication time in the future")
+
+        claims["uid"] = subject
+        self.claims.put(id_token, claims)
+        return dict(claims)
+
+
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_token_verifier(project_id: str) -> FirebaseTokenVerifier:
+    """Shared verifier for a project, so keys and claims are cached process-wide."""
+    with _verifiers_lock:
+        verifier = _verifiers.get(project_id)
+        if verifier is None:
+            verifier = FirebaseTokenVerifier(
+                project_id,
+                keys_url=getattr(settings, "FIREBASE_PUBLIC_KEYS_URL", GOOGLE_JWKS_URL),
+                cache_size=getattr(settings, "FIREBASE_TOKEN_CACHE_SIZE", DEFAULT_CACHE_SIZE),
+            )
+            _verifiers[project_id] = verifier
+        return verifier
@@ -0,0 +1,27 @@
+"""
+Signal handlers for the accounts app.
+Connected when the app is ready (see apps.py).
+"""
+
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.signals import user_logged_in
+
+
+def record_last_login(sender, user, **kwargs):
+    """
+    Django's update_last_login, minus the write when the login already set it.
+
+    Firebase logins the backend accepts set last_login in the same statement
+    that syncs the user (see firebase_auth.get_or_create_django_user); every
+    other login still gets the usual `UPDATE ... SET last_login`.
+    """
+    if getattr(user, '_last_login_recorded', False):
+        user._last_login_recorded = False
+        return
+    update_last_login(sender, user, **kwargs)
+
+
+def replace_last_login_receiver():
+    # django.contrib.auth connects update_last_login under this dispatch_uid
+    if user_logged_in.disconnect(dispatch_uid='update_last_login'):
+        user_logged_in.connect(record_last_login, dispatch_uid='update_last_login')
@@ -1,3 +1,315 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import aauthenticate, authenticate, get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import backends, firebase_auth, firebase_tokens
+from .firebase_tokens import FirebaseTokenVerifier, TokenVerificationError
+
+PROJECT_ID = "edupay-test"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+class StubKeyHandler(BaseHTTPRequestHandler):
+    """Serves the stub server's JWKS document the way Google does."""
+
+    def do_GET(self):
+        self.server.hits += 1
+        if self.server.failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"keys": self.server.jwks}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", self.server.cache_control)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FirebaseTokenVerifierTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubKeyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/jwks"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.signing_keys = {}
+        self.server.jwks = []
+        self.server.hits = 0
+        self.server.failing = False
+        self.server.cache_control = "public, max-age=3600, must-revalidate"
+        self.publish_key("key-1")
+        self.clock = FakeClock()
+        self.verifier = FirebaseTokenVerifier(PROJECT_ID, keys_url=self.url, timeout=(1, 2), clock=self.clock)
+
+    def publish_key(self, kid):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk.update(kid=kid, alg="RS256", use="sig")
+        self.server.jwks.append(jwk)
+        self.signing_keys[kid] = private_key
+
+    def make_token(self, sub="uid-1", kid="key-1", **overrides):
+        now = int(time.time())
+        claims = {
+            "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+            "aud": PROJECT_ID,
+            "sub": sub,
+            "auth_time": now - 5,
+            "iat": now - 5,
+            "exp": now + 3600,
+            "email": f"{sub}@edupay.test",
+        }
+        claims.update(overrides)
+        return jwt.encode(claims, self.signing_keys[kid], algorithm="RS256", headers={"kid": kid})
+
+    def test_verifies_tokens_with_one_key_fetch(self):
+        first = self.verifier.verify(self.make_token("uid-1"))
+        second = self.verifier.verify(self.make_token("uid-2"))
+
+        self.assertEqual(first["uid"], "uid-1")
+        self.assertEqual(second["email"], "uid-2@edupay.test")
+        self.assertEqual(self.server.hits, 1)
+
+    def test_claims_memoised_until_expiry(self):
+        token = self.make_token(exp=int(time.time()) + 60)
+        with mock.patch.object(firebase_tokens.jwt, "decode", wraps=jwt.decode) as decode:
+            self.verifier.verify(token)
+            self.verifier.verify(token)
+            self.assertEqual(decode.call_count, 1)
+
+            self.clock.now += 61
+            self.verifier.verify(token)
+            self.assertEqual(decode.call_count, 2)
+
+    def test_claims_cache_is_bounded(self):
+        verifier = FirebaseTokenVerifier(PROJECT_ID, keys_url=self.url, cache_size=2, clock=self.clock)
+        for sub in ("a", "b", "c"):
+            verifier.verify(self.make_token(sub))
+        self.assertEqual(len(verifier.claims), 2)
+
+    def test_rejects_invalid_tokens(self):
+        for token in (
+            self.make_token(aud="another-project"),
+            self.make_token(iss="https://securetoken.google.com/another-project"),
+            self.make_token(exp=int(time.time()) - 3600),
+            self.make_token(sub=""),
+            "not-a-token",
+        ):
+            with self.assertRaises(TokenVerificationError):
+                self.verifier.verify(token)
+
+    def test_keys_refreshed_after_cache_control_max_age(self):
+        self.server.cache_control = "public, max-age=60"
+        self.verifier.verify(self.make_token("uid-1"))
+        self.clock.now += 30
+        self.verifier.verify(self.make_token("uid-2"))
+        self.assertEqual(self.server.hits, 1)
+
+        self.clock.now += 31
+        self.verifier.verify(self.make_token("uid-3"))
+        self.assertEqual(self.server.hits, 2)
+
+    def test_unknown_key_id_triggers_refresh(self):
+        self.verifier.verify(self.make_token())
+        self.publish_key("key-2")
+        self.clock.now += firebase_tokens.MIN_REFRESH_INTERVAL
+
+        claims = self.verifier.verify(self.make_token("uid-2", kid="key-2"))
+        self.assertEqual(claims["uid"], "uid-2")
+        self.assertEqual(self.server.hits, 2)
+
+    def test_stale_keys_used_when_refresh_fails(self):
+        self.verifier.verify(self.make_token("uid-1"))
+        self.server.failing = True
+        self.clock.now += 3601
+
+        with self.assertLogs("accounts.firebase_tokens", "WARNING"):
+            self.assertEqual(self.verifier.verify(self.make_token("uid-2"))["uid"], "uid-2")
+        self.assertEqual(self.server.hits, 2)
+
+    def test_no_keys_available(self):
+        self.server.failing = True
+        with self.assertRaises(TokenVerificationError):
+            self.verifier.verify(self.make_token())
+
+    async def test_async_verify_shares_one_key_fetch(self):
+        async with httpx.AsyncClient() as client:
+            first, second = await asyncio.gather(
+                self.verifier.averify(self.make_token("uid-1"), client),
+                self.verifier.averify(self.make_token("uid-2"), client),
+            )
+        self.assertEqual((first["uid"], second["uid"]), ("uid-1", "uid-2"))
+        self.assertEqual(self.server.hits, 1)
+
+    async def test_async_stale_keys_used_when_refresh_fails(self):
+        async with httpx.AsyncClient() as client:
+            await self.verifier.averify(self.make_token("uid-1"), client)
+            self.server.failing = True
+            self.clock.now += 3601
+            with self.assertLogs("accounts.firebase_tokens", "WARNING"):
+                claims = await self.verifier.averify(self.make_token("uid-2"), client)
+        self.assertEqual(claims["uid"], "uid-2")
+
+
+class AsgiLifespanTests(SimpleTestCase):
+    async def test_lifespan_opens_and_closes_the_async_client(self):
+        from EduPayAfrica.asgi import application
+
+        messages = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message["type"])
+            if message["type"] == "lifespan.startup.complete":
+                self.assertIsNotNone(firebase_tokens.get_async_http_client())
+                await messages.put({"type": "lifespan.shutdown"})
+
+        await messages.put({"type": "lifespan.startup"})
+        await application({"type": "lifespan"}, messages.get, send)
+
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.assertIsNone(firebase_tokens.get_async_http_client())
+
+
+class FirebaseProjectIdTests(SimpleTestCase):
+    def test_credentials_file_read_once(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as credentials:
+            json.dump({"project_id": "edupay-test"}, credentials)
+            credentials.flush()
+            firebase_auth.firebase_project_id.cache_clear()
+            self.addCleanup(firebase_auth.firebase_project_id.cache_clear)
+            with (
+                mock.patch.dict("os.environ", {"GOOGLE_CLOUD_PROJECT": "", "GCLOUD_PROJECT": ""}),
+                mock.patch.object(firebase_auth, "FIREBASE_PROJECT_ID", ""),
+                mock.patch.object(firebase_auth, "FIREBASE_CREDENTIALS_PATH", credentials.name),
+                mock.patch.object(firebase_auth.json, "load", wraps=json.load) as load,
+            ):
+                self.assertEqual(firebase_auth.firebase_project_id(), "edupay-test")
+                self.assertEqual(firebase_auth.firebase_project_id(), "edupay-test")
+        load.assert_called_once()
+
+
+class FirebaseBackendTests(TestCase):
+    email = "bursar@school.test"
+
+    def setUp(self):
+        claims = {"uid": "uid-1", "email": self.email, "name": "Jane Doe"}
+        patches = [
+            mock.patch.object(firebase_auth, "authenticate_firebase_user", return_value="token"),
+            mock.patch.object(firebase_auth, "verify_firebase_token", return_value=claims),
+            mock.patch.object(firebase_auth, "aauthenticate_firebase_user", mock.AsyncMock(return_value="token")),
+            mock.patch.object(firebase_auth, "averify_firebase_token", mock.AsyncMock(return_value=claims)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_login_view_signs_in_and_creates_user(self):
+        response = self.client.post(reverse("login"), {"email": self.email, "password": "secret"})
+
+        self.assertRedirects(response, reverse("home"), fetch_redirect_response=False)
+        user = get_user_model().objects.get(username=self.email)
+        self.assertEqual(user.first_name, "Jane")
+        self.assertEqual(self.client.session["_auth_user_id"], str(user.pk))
+
+    def test_sync_backend_only_records_login_for_unchanged_user(self):
+        get_user_model().objects.create_user(username=self.email, email=self.email)
+        with mock.patch.object(get_user_model(), "save") as save:
+            user = authenticate(None, email=self.email, password="secret")
+        self.assertEqual(user.email, self.email)
+        save.assert_called_once_with(update_fields=["last_login"])
+
+    def test_rejected_user_login_is_not_recorded(self):
+        get_user_model().objects.create_user(username=self.email, email="old@school.test", is_active=False)
+        self.assertIsNone(authenticate(None, email=self.email, password="secret"))
+
+        user = get_user_model().objects.get(username=self.email)
+        self.assertIsNone(user.last_login)
+        # Firebase data is still synced
+        self.assertEqual(user.email, self.email)
+
+    def test_backend_writes_only_changed_fields(self):
+        get_user_model().objects.create(username=self.email, email="old@school.test")
+        with mock.patch.object(get_user_model(), "save") as save:
+            user = authenticate(None, email=self.email, password="secret")
+        self.assertEqual(user.email, self.email)
+        save.assert_called_once()
+        self.assertEqual(save.call_args.kwargs["update_fields"], ["email", "last_login"])
+        firebase_auth.authenticate_firebase_user.assert_called_once_with(self.email, "secret")
+
+    async def test_async_backend_writes_only_changed_fields(self):
+        await get_user_model().objects.acreate(username=self.email, email="old@school.test")
+        with mock.patch.object(backends, "get_async_http_client", return_value=mock.sentinel.client), \
+                mock.patch.object(get_user_model(), "save") as save:
+            user = await aauthenticate(None, email=self.email, password="secret")
+        self.assertEqual(user.email, self.email)
+        save.assert_called_once()
+        self.assertEqual(save.call_args.kwargs["update_fields"], ["email", "last_login"])
+        firebase_auth.aauthenticate_firebase_user.assert_awaited_once_with(self.email, "secret")
+        firebase_auth.authenticate_firebase_user.assert_not_called()
+
+    async def test_async_backend_without_lifespan_uses_requests_path(self):
+        user = await aauthenticate(None, email=self.email, password="secret")
+        self.assertEqual(user.username, self.email)
+        firebase_auth.authenticate_firebase_user.assert_called_once_with(self.email, "secret")
+        firebase_auth.aauthenticate_firebase_user.assert_not_awaited()
+
+    def test_login_issues_one_narrow_user_update(self):
+        get_user_model().objects.create_user(username=self.email, email=self.email)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("login"), {"email": self.email, "password": "secret"})
+
+        user_writes = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "auth_user"')]
+        self.assertEqual(len(user_writes), 1)
+        self.assertIn('SET "last_login"', user_writes[0])
+        self.assertNotIn('"password"', user_writes[0])
+        self.assertIsNotNone(get_user_model().objects.get(username=self.email).last_login)
+
+    def test_other_logins_still_update_last_login(self):
+        user = get_user_model().objects.create_user(username="admin", password="local-pass")
+        self.client.login(username="admin", password="local-pass")
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    def test_super_admin_promoted(self):
+        with mock.patch.dict("os.environ", {"SUPER_ADMIN_EMAIL": self.email}):
+            user = authenticate(None, email=self.email, password="secret")
+        self.assertTrue(user.is_staff and user.is_superuser)
+
+    def test_username_credentials_use_model_backend(self):
+        get_user_model().objects.create_user(username="admin", password="local-pass")
+        self.assertIsNotNone(authenticate(None, username="admin", password="local-pass"))
+        firebase_auth.authenticate_firebase_user.assert_not_called()
@@ -1,15 +1,53 @@
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_http_methods
-from django.contrib.auth import login, logout
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib import messages
-import requests
+from asgiref.sync import sync_to_async
 import os
 
-from .firebase_auth import firebase_login
+from .firebase_tokens import get_http_session, http_timeout
+
+STAFF_DASHBOARDS = {
+    'principal': 'institutions:principal_dashboard',
+    'bursar': 'institutions:bursar_dashboard',
+    'teacher': 'institutions:teacher_dashboard',
+    'accountant': 'institutions:accountant_dashboard',
+    'registrar': 'institutions:registrar_dashboard',
+    'support_staff': 'institutions:support_staff_dashboard',
+    'deputy_principal': 'institutions:deputy_principal_dashboard',
+    'admin': 'institutions:dashboard',
+}
+
+
+async def _post_login_destination(user):
+    """URL name of the dashboard a freshly signed-in user should land on."""
+    if user.is_staff and user.is_superuser:
+        # Super admins go to platform admin dashboard
+        return 'platform_admin:dashboard'
+    from institutions.models import InstitutionStaff, InstitutionProfile
+    try:
+        # Institution admin (one-to-one)
+        if await InstitutionProfile.objects.filter(user=user).aexists():
+            return 'institutions:dashboard'
+        # Institution staff (many-to-one), routed by role
+        staff = await InstitutionStaff.objects.filter(user=user, is_active=True).afirst()
+        if staff:
+            return STAFF_DASHBOARDS.get(staff.role, 'institutions:dashboard')
+    except Exception as e:
+        print(f"Staff role routing error: {e}")
+    # Fallback
+    return 'home'
+
 
 @require_http_methods(["GET", "POST"])
-def login_view(request):
-    """Login page with Firebase authentication"""
+async def login_view(request):
+    """
+    Login page with Firebase authentication.
+
+    Async so that, under ASGI, the Firebase sign-in round-trip is awaited
+    (see accounts.backends.FirebaseBackend) instead of blocking a worker.
+    """
+    render_login = sync_to_async(render)
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
         password = request.POST.get('password', '')
@@ -18,68 +56,34 @@ def login_view(request):
         # Validate input
         if not email or not password:
             messages.error(request, 'Please enter both email and password.')
-            return render(request, 'accounts/login.html')
+            return await render_login(request, 'accounts/login.html')
         
         try:
             # Authenticate via Firebase and sync with Django
-            user = firebase_login(request, email, password)
+            user = await aauthenticate(request, email=email, password=password)
             
             if user is not None:
-                login(request, user)
+                await alogin(request, user)
                 
                 # Set session timeout based on "Remember me"
                 if not remember:
-                    request.session.set_expiry(0)  # Browser session
+                    await request.session.aset_expiry(0)  # Browser session
                 else:
-                    request.session.set_expiry(30 * 24 * 60 * 60)  # 30 days
+                    await request.session.aset_expiry(30 * 24 * 60 * 60)  # 30 days
                 
                 messages.success(request, f'Welcome back, {user.first_name or user.username}!')
                 
                 # Route users based on their role
-                if user.is_staff and user.is_superuser:
-                    # Super admins go to platform admin dashboard
-                    return redirect('platform_admin:dashboard')
-                # Check if user is institution admin or staff
-                from institutions.models import InstitutionStaff, InstitutionProfile
-                try:
-                    # Institution admin (one-to-one)
-                    if hasattr(user, 'institution_profile'):
-                        return redirect('institutions:dashboard')
-                    # Institution staff (many-to-one)
-                    staff = InstitutionStaff.objects.filter(user=user, is_active=True).first()
-                    if staff:
-                        # Redirect based on staff role
-                        if staff.role == 'principal':
-                            return redirect('institutions:principal_dashboard')
-                        elif staff.role == 'bursar':
-                            return redirect('institutions:bursar_dashboard')
-                        elif staff.role == 'teacher':
-                            return redirect('institutions:teacher_dashboard')
-                        elif staff.role == 'accountant':
-                            return redirect('institutions:accountant_dashboard')
-                        elif staff.role == 'registrar':
-                            return redirect('institutions:registrar_dashboard')
-                        elif staff.role == 'support_staff':
-                            return redirect('institutions:support_staff_dashboard')
-                        elif staff.role == 'deputy_principal':
-                            return redirect('institutions:deputy_principal_dashboard')
-                        elif staff.role == 'admin':
-                            return redirect('institutions:dashboard')
-                        else:
-                            return redirect('institutions:dashboard')
-                except Exception as e:
-                    print(f"Staff role routing error: {e}")
-                # Fallback
-                return redirect('home')
+                return redirect(await _post_login_destination(user))
             else:
                 messages.error(request, 'Invalid email or password. Please check your credentials.')
-                return render(request, 'accounts/login.html')
+                return await render_login(request, 'accounts/login.html')
         except Exception as e:
             messages.error(request, 'An error occurred during login. Please try again.')
             print(f"Login error: {e}")
-            return render(request, 'accounts/login.html')
+            return await render_login(request, 'accounts/login.html')
     
-    return render(request, 'accounts/login.html')
+    return await render_login(request, 'accounts/login.html')
 
 
 @require_http_methods(["GET", "POST"])
@@ -105,7 +109,7 @@ def password_reset_request(request):
                 "email": email
             }
             
-            response = requests.post(url, json=payload)
+            response = get_http_session().post(url, json=payload, timeout=http_timeout())
             
             if response.status_code == 200:
                 messages.success(request, 
@@ -160,7 +164,7 @@ def password_reset_confirm(request):
                 "newPassword": new_password
             }
             
-            response = requests.post(url, json=payload)
+            response = get_http_session().post(url, json=payload, timeout=http_timeout())
             
             if response.status_code == 200:
                 messages.success(request, 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import NewsletterSubscriber, NewsArticle, JobPosition, JobApplication, ContactInquiry
+from .models import NewsletterSubscriber, NewsArticle, JobPosition, JobApplication, ContactInquiry, OutboxEmail
 
 @admin.register(NewsletterSubscriber)
 class NewsletterSubscriberAdmin(admin.ModelAdmin):
@@ -70,3 +70,9 @@ class ContactInquiryAdmin(admin.ModelAdmin):
     search_fields = ('full_name', 'email', 'subject', 'message')
     readonly_fields = ('full_name', 'email', 'phone', 'subject', 'message', 'privacy_agreed', 'created_at')
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('dedup_key', 'created_at', 'updated_at', 'sent_at', 'locked_at')
@@ -0,0 +1,50 @@
+"""
+After-Response Callbacks
+Work deferred until the current response has been sent.
+
+Eager modes (EMAIL_OUTBOX_EAGER, INSTITUTION_JOBS_EAGER) run their work in
+the web process. transaction.on_commit() alone is not enough for that: with
+no atomic block active (ATOMIC_REQUESTS is off) the callback runs
+immediately, inside the view, and the client waits for it. Callbacks queued
+here during a request run when Django sends request_finished, i.e. once the
+response has been closed; outside a request (workers, shell, management
+commands) they run immediately.
+"""
+
+import logging
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Callbacks of the request being handled, or None outside a request
+_pending: ContextVar[Optional[list]] = ContextVar("after_response_callbacks", default=None)
+
+
+def run_after_response(func: Callable[[], None]):
+    """Run func once the current response is sent, or now outside a request."""
+    pending = _pending.get()
+    if pending is None:
+        func()
+    else:
+        pending.append(func)
+
+
+@receiver(request_started)
+def _start_request(sender, **kwargs):
+    _pending.set([])
+
+
+@receiver(request_finished)
+def _run_pending(sender, **kwargs):
+    pending = _pending.get()
+    _pending.set(None)
+    for func in pending or ():
+        try:
+            func()
+        except Exception:
+            # The response is already sent; a failure must not affect other callbacks
+            logger.exception("After-response callback %r failed", func)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Register the request signal receivers that run after-response callbacks
+        from . import after_response  # noqa: F401
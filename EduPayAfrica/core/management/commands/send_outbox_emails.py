@@ -0,0 +1,69 @@
+"""
+Django management command to send queued transactional emails
+Usage: python manage.py send_outbox_emails [--once] [--sleep 5] [--batch-size 50]
+
+Run it alongside the web process (see Procfile). Each batch is sent over one
+connection to the mail server; failed emails are retried with backoff.
+"""
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import OUTBOX_BATCH_SIZE, requeue_stale_emails, send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails (demo and contact confirmations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send everything that is due once and exit instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when nothing is due'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help='Emails sent per mail server connection'
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        sent = 0
+        while not self._stopping:
+            close_old_connections()
+            requeued = requeue_stale_emails()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale email(s)"))
+
+            result = send_outbox(options['batch_size'])
+            if not result.processed:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            sent += result.sent
+            style = self.style.SUCCESS if not (result.retried or result.failed) else self.style.WARNING
+            self.stdout.write(style(
+                f"Batch: {result.sent} sent, {result.retried} to retry, {result.failed} failed "
+                f"in {result.seconds:.2f}s"
+            ))
+
+        self.stdout.write(f"Outbox sender stopped after {sent} email(s)")
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
@@ -112,3 +112,41 @@ class JobApplication(models.Model):
     def __str__(self):
         return f"{self.full_name} - {self.job_position.title} ({self.applied_date.strftime('%Y-%m-%d')})"
 
+
+
+class OutboxEmail(models.Model):
+    """Transactional email queued for the background sender (core.outbox)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    # Identical emails queued with the same key are sent only once
+    dedup_key = models.CharField(max_length=64, unique=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Outbox Email"
+        verbose_name_plural = "Outbox Emails"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_attempt'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
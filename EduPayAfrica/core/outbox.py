@@ -0,0 +1,185 @@
+"""
+Email Outbox
+Transactional emails queued in the database and sent by a background worker.
+
+Form handlers call queue_email(), which only inserts an OutboxEmail row, so
+a submission never waits on the mail server. `python manage.py
+send_outbox_emails` claims due emails in batches and sends each batch over a
+single connection of the configured EMAIL_BACKEND. Failed emails are retried
+with exponential backoff; the same email to the same recipient is queued only
+once per day. With EMAIL_OUTBOX_EAGER the web process sends the batch itself
+once the transaction has committed and the response has been sent.
+"""
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .after_response import run_after_response
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Emails claimed and sent per connection
+OUTBOX_BATCH_SIZE = 50
+
+# First retry delay in seconds; doubled on every further attempt
+RETRY_BACKOFF_SECONDS = getattr(settings, "EMAIL_OUTBOX_RETRY_BACKOFF", 60)
+
+# Emails left in "sending" this long (a worker died mid-batch) are sent again
+STALE_AFTER = timedelta(minutes=10)
+
+
+@dataclass
+class OutboxResult:
+    """Outcome of one sender pass."""
+
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.retried + self.failed
+
+
+def dedup_key(recipient: str, subject: str, body: str) -> str:
+    """Key identifying an email to one recipient for the current day."""
+    raw = "\n".join([recipient.strip().lower(), subject, body, timezone.localdate().isoformat()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def queue_email(
+    subject: str,
+    body: str,
+    recipient: str,
+    from_email: Optional[str] = None,
+    key: Optional[str] = None,
+) -> OutboxEmail:
+    """
+    Queue a plain-text email for the background sender.
+
+    Args:
+        subject: Subject line
+        body: Plain-text body
+        recipient: Email address
+        from_email: Sender (defaults to DEFAULT_FROM_EMAIL)
+        key: Deduplication key (defaults to recipient, content and today's date)
+
+    Returns:
+        The queued OutboxEmail, or the existing one if it was already queued
+    """
+    email, created = OutboxEmail.objects.get_or_create(
+        dedup_key=key or dedup_key(recipient, subject, body),
+        defaults={
+            "subject": subject,
+            "body": body,
+            "recipient": recipient,
+            "from_email": from_email or settings.DEFAULT_FROM_EMAIL,
+        },
+    )
+    if created and getattr(settings, "EMAIL_OUTBOX_EAGER", False):
+        transaction.on_commit(lambda: run_after_response(send_outbox))
+    return email
+
+
+def requeue_stale_emails() -> int:
+    """Return emails stuck in "sending" to the queue."""
+    return OutboxEmail.objects.filter(status="sending", locked_at__lt=timezone.now() - STALE_AFTER).update(
+        status="pending", locked_at=None, updated_at=timezone.now()
+    )
+
+
+def claim_batch(batch_size: int = OUTBOX_BATCH_SIZE) -> list:
+    """Mark up to batch_size due emails as sending and return them."""
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(status="pending", next_attempt_at__lte=now).order_by("next_attempt_at", "pk")
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list("pk", flat=True)[:batch_size])
+        # Compare-and-swap so backends without row locks (SQLite) never double-claim
+        OutboxEmail.objects.filter(pk__in=ids, status="pending").update(
+            status="sending", locked_at=now, updated_at=now
+        )
+    return list(OutboxEmail.objects.filter(pk__in=ids, status="sending", locked_at=now).order_by("pk"))
+
+
+def _record_failure(email: OutboxEmail, error: str, now) -> bool:
+    """Schedule a retry, or give up after max_attempts; returns True if retried."""
+    email.attempts += 1
+    email.last_error = error
+    email.locked_at = None
+    email.updated_at = now
+    if email.attempts >= email.max_attempts:
+        email.status = "failed"
+        return False
+    email.status = "pending"
+    email.next_attempt_at = now + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1))
+    return True
+
+
+def send_outbox(batch_size: int = OUTBOX_BATCH_SIZE) -> OutboxResult:
+    """
+    Send one batch of due emails over a single mail connection.
+
+    Returns:
+        OutboxResult with the emails sent, scheduled for retry and given up on
+    """
+    started = time.perf_counter()
+    result = OutboxResult()
+    batch = claim_batch(batch_size)
+    if not batch:
+        return result
+
+    sent, failures = [], []
+    mail = get_connection()
+    try:
+        mail.open()
+    except Exception as e:
+        logger.warning("Could not connect to the mail server: %s", e)
+        failures = [(email, str(e)) for email in batch]
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(email.subject, email.body, email.from_email, [email.recipient])
+                try:
+                    # The connection is already open, so it is reused for every message
+                    if mail.send_messages([message]) != 1:
+                        raise RuntimeError("The mail backend did not accept the message")
+                except Exception as e:
+                    logger.warning("Sending outbox email %s to %s failed: %s", email.pk, email.recipient, e)
+                    failures.append((email, str(e)))
+                else:
+                    sent.append(email.pk)
+        finally:
+            mail.close()
+
+    now = timezone.now()
+    OutboxEmail.objects.filter(pk__in=sent).update(
+        status="sent", sent_at=now, attempts=F("attempts") + 1, last_error="", locked_at=None, updated_at=now
+    )
+    for email, error in failures:
+        if _record_failure(email, error, now):
+            result.retried += 1
+        else:
+            result.failed += 1
+    OutboxEmail.objects.bulk_update(
+        [email for email, _ in failures],
+        ["status", "attempts", "last_error", "next_attempt_at", "locked_at", "updated_at"],
+    )
+
+    result.sent = len(sent)
+    result.seconds = time.perf_counter() - started
+    return result
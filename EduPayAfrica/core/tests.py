@@ -1,3 +1,122 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .after_response import run_after_response
+from .models import ContactInquiry, OutboxEmail
+from .outbox import queue_email, send_outbox
+
+
+class BouncingBackend(BaseEmailBackend):
+    """Mail backend double that rejects every address at bounce.test."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.to[0].endswith("@bounce.test"):
+                raise ConnectionError("550 mailbox unavailable")
+        return len(email_messages)
+
+
+@contextmanager
+def request_cycle():
+    """Send request_started and, on exit, request_finished like a handler would."""
+    # As the test client does: closing connections would end the test's transaction
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        request_started.send(sender=None)
+        yield
+        request_finished.send(sender=None)
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+class EmailOutboxTests(TestCase):
+    def test_contact_form_queues_confirmation(self):
+        response = self.client.post(reverse("contact"), {
+            "full_name": "Amina Mensah", "email": "amina@school.test", "phone": "+254700000000",
+            "subject": "Pricing", "message": "Hello", "privacy_agreed": "on",
+        })
+        self.assertRedirects(response, reverse("contact"))
+        self.assertTrue(ContactInquiry.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.recipient, queued.status), ("amina@school.test", "pending"))
+
+        result = send_outbox()
+        self.assertEqual(result.sent, 1)
+        self.assertEqual(mail.outbox[0].to, ["amina@school.test"])
+        self.assertIn("Amina Mensah", mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ("sent", 1))
+
+    def test_batch_shares_one_connection(self):
+        for i in range(3):
+            queue_email("Welcome", "Hello", f"user{i}@school.test")
+        with mock.patch("core.outbox.get_connection", wraps=get_connection) as connect:
+            result = send_outbox()
+        connect.assert_called_once()
+        self.assertEqual(result.sent, 3)
+        self.assertEqual(send_outbox().processed, 0)
+
+    def test_same_email_is_queued_once(self):
+        first = queue_email("Welcome", "Hello", "user@school.test")
+        second = queue_email("Welcome", "Hello", "USER@school.test")
+        self.assertEqual(first.pk, second.pk)
+        queue_email("Welcome", "Hello again", "user@school.test")
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    @override_settings(EMAIL_BACKEND="core.tests.BouncingBackend")
+    def test_failures_retry_with_backoff_then_give_up(self):
+        queue_email("Welcome", "Hello", "ok@school.test")
+        bounced = queue_email("Welcome", "Hello", "nobody@bounce.test")
+
+        result = send_outbox()
+        self.assertEqual((result.sent, result.retried, result.failed), (1, 1, 0))
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), ("pending", 1))
+        self.assertEqual(bounced.last_error, "550 mailbox unavailable")
+        self.assertGreater(bounced.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # Not due yet
+        self.assertEqual(send_outbox().processed, 0)
+
+        OutboxEmail.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now(), attempts=4)
+        result = send_outbox()
+        self.assertEqual(result.failed, 1)
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), ("failed", 5))
+
+    @override_settings(EMAIL_OUTBOX_EAGER=True)
+    def test_eager_mode_sends_after_the_response(self):
+        with request_cycle():
+            # No atomic block in the view: on_commit runs at once, the send must still wait
+            with self.captureOnCommitCallbacks(execute=True):
+                queue_email("Welcome", "Hello", "user@school.test")
+            self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutboxEmail.objects.get().status, "sent")
+
+        # Outside a request there is no response to wait for
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_email("Welcome", "Hello again", "user@school.test")
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failing_after_response_callback_does_not_stop_the_others(self):
+        calls = []
+        with self.assertLogs("core.after_response", "ERROR"), request_cycle():
+            run_after_response(lambda: 1 / 0)
+            run_after_response(lambda: calls.append("sent"))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ["sent"])
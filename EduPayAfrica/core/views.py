@@ -2,10 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
 from .models import NewsArticle, JobPosition, JobApplication, ContactInquiry
 from .forms import NewsletterSubscriberForm, JobApplicationForm
+from .outbox import queue_email
 
 @require_http_methods(["GET"])
 def index(request):
@@ -115,7 +114,7 @@ def terms(request):
     return render(request, 'core/terms.html')
 
 def send_contact_confirmation_email(full_name, email):
-    """Send automated confirmation email to contact inquiry"""
+    """Queue automated confirmation email to contact inquiry"""
     subject = "We received your message - EduPay Africa"
     message = f"""Hello {full_name},
 
@@ -130,15 +129,5 @@ The EduPay Africa Team
 support@edupayafrica.com
 """
     
-    try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        # Log error but don't fail the form submission
-        print(f"Error sending contact confirmation email: {e}")
+    queue_email(subject, message, email)
 
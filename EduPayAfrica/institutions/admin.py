@@ -15,7 +15,9 @@ from .models import (
     InstitutionStaff,
     ParentGuardian,
     PrincipalMessage,
+    MessageDelivery,
     FeeAnalysisSnapshot,
+    InstitutionJob,
 )
 
 
@@ -218,12 +220,12 @@ class StudentFeeAssignmentAdmin(admin.ModelAdmin):
         "academic_year",
         "total_fees",
         "outstanding_balance",
-        "is_paid_in_full",
+        "payment_status",
         "is_overdue",
     )
-    list_filter = ("academic_year", "is_overdue", "created_at")
+    list_filter = ("academic_year", "payment_status", "is_overdue", "created_at")
     search_fields = ("student__full_name", "student__admission_number")
-    readonly_fields = ("created_at", "updated_at", "outstanding_balance", "is_paid_in_full")
+    readonly_fields = ("created_at", "updated_at", "outstanding_balance", "payment_status")
 
 
 @admin.register(InstitutionAuditLog)
@@ -275,9 +277,26 @@ class PrincipalMessageAdmin(admin.ModelAdmin):
     filter_horizontal = ("target_students",)
 
 
+@admin.register(MessageDelivery)
+class MessageDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("message", "recipient", "channel", "status", "attempts", "sent_at")
+    list_filter = ("status", "channel")
+    search_fields = ("recipient", "message__subject", "student__full_name")
+    raw_id_fields = ("message", "student", "parent")
+    readonly_fields = ("created_at", "updated_at", "sent_at")
+
+
 @admin.register(FeeAnalysisSnapshot)
 class FeeAnalysisSnapshotAdmin(admin.ModelAdmin):
-    list_display = ("institution", "snapshot_date", "total_students", "collection_rate")
+    list_display = ("institution", "academic_year", "snapshot_date", "total_students", "collection_rate", "refreshed_at")
     list_filter = ("institution", "snapshot_date")
     search_fields = ("institution__institution_name",)
-    readonly_fields = ("created_at", "snapshot_date")
+    readonly_fields = ("created_at", "snapshot_date", "refreshed_at", "source_updated_at", "assignment_count")
+
+
+@admin.register(InstitutionJob)
+class InstitutionJobAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "institution", "status", "processed", "total", "attempts", "created_at")
+    list_filter = ("status", "job_type", "institution")
+    search_fields = ("job_type", "institution__institution_name", "error")
+    readonly_fields = ("created_at", "updated_at", "started_at", "finished_at", "locked_by", "locked_at")
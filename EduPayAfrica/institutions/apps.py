@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class InstitutionsConfig(AppConfig):
     name = 'institutions'
+
+    def ready(self):
+        # Register background job handlers, signal receivers and system checks
+        from . import checks, signals, tasks  # noqa: F401
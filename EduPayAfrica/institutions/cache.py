@@ -0,0 +1,105 @@
+"""
+Institution Cache
+Versioned cache entries for data computed per institution.
+
+Every key embeds its institution's current version number. Writes to
+Student, StudentFeeAssignment, FeeStructure, Program and InstitutionStaff
+bump the version (see signals.py), as do the bulk services that bypass
+signals, so all of an institution's entries become unreachable at once and
+the next read recomputes them. Stale entries are never deleted; they simply
+age out of the cache.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+_MISSING = object()
+
+
+def _version_key(institution_id) -> str:
+    return f"institution:{institution_id}:version"
+
+
+def _initial_version() -> int:
+    # Clock-based, so a counter evicted from the cache never revives old entries
+    return time.time_ns() // 1000
+
+
+def institution_version(institution_id) -> int:
+    key = _version_key(institution_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_institution_version(institution_id):
+    key = _version_key(institution_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def invalidate_institution(institution_id):
+    """
+    Invalidate every cached entry of an institution.
+
+    The version is bumped immediately, and again when the surrounding
+    transaction commits, so a concurrent reader cannot cache pre-commit data
+    under the new version.
+    """
+    if institution_id is None:
+        return
+    bump_institution_version(institution_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_institution_version(institution_id))
+
+
+def institution_cache_key(institution_id, name: str, *parts) -> str:
+    """
+    Cache key for `name` under the institution's current version.
+
+    Args:
+        institution_id: InstitutionProfile primary key
+        name: What is cached, e.g. "fee-stats"
+        parts: Anything else the value depends on (year, role, filters)
+
+    Returns:
+        A key that changes whenever the institution's data does
+    """
+    key = f"institution:{institution_id}:v{institution_version(institution_id)}:{name}"
+    if parts:
+        digest = hashlib.md5(repr(parts).encode("utf-8"), usedforsecurity=False).hexdigest()
+        key = f"{key}:{digest}"
+    return key
+
+
+def cached_for_institution(institution, name: str, compute, *parts, timeout=None):
+    """
+    Return the cached value for (institution, name, parts), computing it on a miss.
+
+    Args:
+        institution: InstitutionProfile the value belongs to
+        name: What is cached
+        compute: Zero-argument callable producing the value (must be picklable;
+            evaluate querysets with list())
+        parts: Anything else the value depends on
+        timeout: Seconds to keep the entry (defaults to INSTITUTION_CACHE_TIMEOUT)
+
+    Returns:
+        The cached or freshly computed value
+    """
+    key = institution_cache_key(institution.pk, name, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        if timeout is None:
+            timeout = getattr(settings, "INSTITUTION_CACHE_TIMEOUT", 300)
+        cache.set(key, value, timeout)
+    return value
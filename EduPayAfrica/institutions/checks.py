@@ -0,0 +1,57 @@
+"""
+System checks for the institutions app.
+Registered when the app is ready (see apps.py).
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+# Backends that keep nothing, so a version counter never moves
+NON_PERSISTENT_CACHES = ("django.core.cache.backends.dummy.DummyCache",)
+
+
+def _default_cache_backend() -> str:
+    return settings.CACHES.get("default", {}).get("BACKEND", "")
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_institution_cache(app_configs, **kwargs):
+    """
+    Institution caches are invalidated by whichever process writes, including
+    the job worker, so web processes must see the same cache as the worker.
+    """
+    if getattr(settings, "INSTITUTION_JOBS_EAGER", False):
+        return []
+    if _default_cache_backend() not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        "The default cache is local to each process, but institution jobs run in a separate worker.",
+        hint=(
+            "Invalidations made by run_institution_jobs never reach the web processes, which keep "
+            "serving stale dashboards and reports. Set REDIS_URL (or CACHE_DIR on a shared disk), "
+            "or set INSTITUTION_JOBS_EAGER=True to run jobs in the web process."
+        ),
+        id="institutions.E001",
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_context_versions(app_configs, **kwargs):
+    """
+    Session-cached institution contexts are trusted while their version in the
+    cache is unchanged, so every web process must see the same version counters.
+    """
+    if _default_cache_backend() not in PROCESS_LOCAL_CACHES + NON_PERSISTENT_CACHES:
+        return []
+    return [Error(
+        "The default cache cannot share institution context versions between processes.",
+        hint=(
+            "A role change or revocation saved in one process would not reach sessions served by "
+            "another, which keep acting on the old role until the context expires. Set REDIS_URL "
+            "(or CACHE_DIR on a shared disk)."
+        ),
+        id="institutions.E002",
+    )]
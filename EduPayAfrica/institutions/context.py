@@ -0,0 +1,149 @@
+"""
+Institution Context
+Request-scoped institution, staff record and role for the signed-in user.
+
+The context is resolved at most once per request and memoised on it. Between
+requests it is kept in the session together with a per-user version number
+held in the cache; saving or deleting any of the user's InstitutionStaff rows
+(including one created for an owner), or their institution's profile, bumps
+the version (see signals.py), so the next request resolves it again. A
+session-cached context whose version still matches costs no queries. A short
+TTL bounds staleness for writes that bypass signals, such as queryset.update().
+
+The version must be visible to every process, so the default cache has to be
+shared; `manage.py check --deploy` fails on a per-process cache
+(institutions.E002, see checks.py).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery
+
+from institutions.models import InstitutionProfile, InstitutionStaff
+
+SESSION_KEY = "institution_context"
+
+# Seconds a session-cached context is trusted without re-checking the database
+CONTEXT_TTL = 300
+
+
+@dataclass(frozen=True)
+class InstitutionContext:
+    """The institution a user acts for, and their staff record there."""
+
+    institution: Optional[InstitutionProfile] = None
+    staff: Optional[InstitutionStaff] = None
+
+    @property
+    def role(self) -> Optional[str]:
+        return self.staff.role if self.staff else None
+
+    def has_role(self, *roles) -> bool:
+        return self.role is not None and self.role in roles
+
+
+def _version_key(user_id) -> str:
+    return f"institution-context-version:{user_id}"
+
+
+def context_version(user_id) -> int:
+    return cache.get(_version_key(user_id), 0)
+
+
+def bump_context_version(user_id):
+    """Invalidate every cached institution context of a user."""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, context_version(user_id) + 1, None)
+
+
+def _freeze(instance) -> Optional[dict]:
+    if instance is None:
+        return None
+    return {field.attname: field.value_to_string(instance) for field in instance._meta.concrete_fields}
+
+
+def _thaw(model, data: Optional[dict]):
+    if data is None:
+        return None
+    fields = model._meta.concrete_fields
+    values = [field.to_python(data[field.attname]) for field in fields]
+    return model.from_db("default", [field.attname for field in fields], values)
+
+
+def _resolve(user) -> InstitutionContext:
+    """Look the context up in the database (one query; two for an owner without a staff row there)."""
+    owned = InstitutionProfile.objects.filter(user=user).values("pk")[:1]
+    staff = (
+        InstitutionStaff.objects.filter(user=user, is_active=True)
+        .select_related("institution")
+        .annotate(
+            owns_institution=Exists(InstitutionProfile.objects.filter(pk=OuterRef("institution_id"), user=user)),
+            owned_institution_id=Subquery(owned),
+        )
+        # Owners act for their own institution, with their staff row there if they have one
+        .order_by("-owns_institution", "pk")
+        .first()
+    )
+
+    if staff is None:
+        return InstitutionContext(institution=InstitutionProfile.objects.filter(user=user).first())
+    if staff.owned_institution_id is not None and not staff.owns_institution:
+        return InstitutionContext(institution=InstitutionProfile.objects.get(pk=staff.owned_institution_id))
+    # Staff members act for the institution that employs them
+    return InstitutionContext(institution=staff.institution, staff=staff)
+
+
+def get_institution_context(request, refresh: bool = False, user=None) -> InstitutionContext:
+    """
+    Institution context for the request's user.
+
+    Args:
+        request: Current request (the context is memoised on it)
+        refresh: Ignore the request and session caches
+        user: User to resolve for instead of request.user (used at login)
+
+    Returns:
+        InstitutionContext, empty for anonymous users or users without an institution
+    """
+    if not refresh and hasattr(request, "_institution_context"):
+        return request._institution_context
+
+    user = user or request.user
+    if not user.is_authenticated:
+        context = InstitutionContext()
+        request._institution_context = context
+        return context
+
+    version = context_version(user.pk)
+    cached = None if refresh else request.session.get(SESSION_KEY)
+    context = None
+    if (
+        cached
+        and cached.get("user") == user.pk
+        and cached.get("version") == version
+        and cached.get("expires", 0) > time.time()
+    ):
+        institution = _thaw(InstitutionProfile, cached["institution"])
+        staff = _thaw(InstitutionStaff, cached["staff"])
+        if staff is not None and institution is not None and staff.institution_id == institution.pk:
+            staff.institution = institution
+        context = InstitutionContext(institution=institution, staff=staff)
+
+    if context is None:
+        context = _resolve(user)
+        request.session[SESSION_KEY] = {
+            "user": user.pk,
+            "version": version,
+            "expires": time.time() + CONTEXT_TTL,
+            "institution": _freeze(context.institution),
+            "staff": _freeze(context.staff),
+        }
+
+    request._institution_context = context
+    return context
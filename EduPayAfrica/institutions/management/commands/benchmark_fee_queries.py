@@ -0,0 +1,174 @@
+"""
+Django management command to benchmark tenant-scoped fee queries
+Usage: python manage.py benchmark_fee_queries [--assignments 1000000] [--institutions 10] [--repeat 5]
+
+Compares each fee analytics query filtered through the student join
+(student__institution, the old form) with the same query on the
+denormalised StudentFeeAssignment.institution column. All data is created
+inside a transaction that is rolled back at the end.
+"""
+
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from institutions.models import (
+    AcademicYear,
+    Faculty,
+    FeeStructure,
+    InstitutionProfile,
+    Program,
+    Student,
+    StudentFeeAssignment,
+    Term,
+)
+from institutions.services.fee_analysis import FeeStatistics
+
+User = get_user_model()
+
+# Two academic years with two terms each
+ASSIGNMENTS_PER_STUDENT = 4
+BATCH_SIZE = 5000
+
+
+class _Rollback(Exception):
+    """Raised to discard benchmark data once measurements are taken."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark fee queries scoped through Student against the denormalised institution column'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assignments',
+            type=int,
+            default=1_000_000,
+            help='Total fee assignments to generate across all institutions'
+        )
+        parser.add_argument(
+            '--institutions',
+            type=int,
+            default=10,
+            help='Institutions to spread the assignments over'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per query; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                institution, year = self.seed(options['assignments'], options['institutions'])
+                self.stdout.write(
+                    f"Seeded {options['assignments']:,} assignments in {time.perf_counter() - started:.1f}s"
+                )
+                self.report(institution, year, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def report(self, institution, year, repeat):
+        scopes = {
+            'join': StudentFeeAssignment.objects.filter(student__institution=institution),
+            'column': StudentFeeAssignment.objects.filter(institution=institution),
+        }
+        queries = {
+            'fee statistics (year)': lambda qs: FeeStatistics.for_queryset(qs.filter(academic_year=year)),
+            'overdue count': lambda qs: qs.filter(is_overdue=True).count(),
+            'outstanding total': lambda qs: qs.aggregate(total=Sum('outstanding_balance')),
+            'latest 100 (year)': lambda qs: list(qs.filter(academic_year=year).order_by('-created_at')[:100]),
+        }
+
+        self.stdout.write(f"{'query':<24}{'join ms':>12}{'column ms':>12}{'speedup':>10}")
+        for name, run in queries.items():
+            timings = {}
+            for scope, queryset in scopes.items():
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    run(queryset)
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[scope] = statistics.median(samples)
+            self.stdout.write(
+                f"{name:<24}{timings['join']:>12.1f}{timings['column']:>12.1f}"
+                f"{timings['join'] / timings['column']:>9.1f}x"
+            )
+
+    def seed(self, assignments, institutions):
+        """Create the institutions and their assignments; return the first institution and its current year."""
+        students_per_institution = max(1, assignments // ASSIGNMENTS_PER_STUDENT // institutions)
+        target = None
+        for i in range(institutions):
+            institution, year = self.seed_institution(i, students_per_institution)
+            target = target or (institution, year)
+        return target
+
+    def seed_institution(self, index, student_count):
+        user = User.objects.create(username=f"bench-fees-{index}", email=f"bench-fees-{index}@edupay.test")
+        institution = InstitutionProfile.objects.create(
+            user=user,
+            institution_name=f"Fee Benchmark {index}",
+            institution_type="university",
+            contact_email=user.email,
+        )
+        faculty = Faculty.objects.create(institution=institution, name="Benchmark", code="BENCH")
+        program = Program.objects.create(
+            institution=institution, faculty=faculty, program_name="Benchmark", program_code="BENCH"
+        )
+        fee_structure = FeeStructure.objects.create(institution=institution, version=1)
+
+        terms = []
+        for offset, code in enumerate(("2024/2025", "2025/2026")):
+            start = date(2024 + offset, 9, 1)
+            year = AcademicYear.objects.create(
+                institution=institution,
+                year_code=code,
+                start_date=start,
+                end_date=start + timedelta(days=333),
+                is_active=bool(offset),
+            )
+            for number in (1, 2):
+                terms.append(Term.objects.create(
+                    academic_year=year,
+                    term_number=number,
+                    start_date=start + timedelta(days=120 * (number - 1)),
+                    end_date=start + timedelta(days=120 * number),
+                ))
+
+        due_date = date(2025, 10, 1)
+        for first in range(0, student_count, BATCH_SIZE):
+            students = Student.objects.bulk_create([
+                Student(
+                    institution=institution,
+                    program=program,
+                    full_name=f"Student {n}",
+                    admission_number=f"B{index}-{n:07d}",
+                )
+                for n in range(first, min(first + BATCH_SIZE, student_count))
+            ])
+            StudentFeeAssignment.objects.bulk_create([
+                StudentFeeAssignment(
+                    institution=institution,
+                    student=student,
+                    fee_structure=fee_structure,
+                    academic_year=term.academic_year,
+                    term=term,
+                    total_fees=Decimal("50000"),
+                    amount_paid=Decimal((student.pk * 7919) % 60000),
+                    due_date=due_date,
+                    is_overdue=student.pk % 5 == 0,
+                )
+                for student in students
+                for term in terms
+            ], batch_size=BATCH_SIZE)
+        return institution, terms[-1].academic_year
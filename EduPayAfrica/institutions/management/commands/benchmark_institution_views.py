@@ -0,0 +1,343 @@
+"""
+Django management command to benchmark the institution views and their background jobs
+Usage: python manage.py benchmark_institution_views [--sizes 1000 10000 50000] [--repeat 5] [--output FILE] [--compare BASELINE]
+
+For every size a synthetic dataset (generate_synthetic_dataset) with one
+institution of that many students is created inside a transaction that is
+rolled back afterwards. Each scenario is timed over --repeat runs, then run
+once more under tracemalloc to record its query count and peak Python
+memory. Results are written as JSON; pass an earlier file with --compare to
+flag scenarios that got slower or started issuing more queries.
+"""
+
+import csv
+import io
+import json
+import logging
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from institutions.models import InstitutionJob
+from institutions.services.fee_analysis import refresh_fee_snapshots
+from institutions.services.jobs import claim_job, execute_job
+from institutions.services.student_import import STUDENT_IMPORT_COLUMNS
+from institutions.services.synthetic import generate_dataset, synthetic_username
+
+User = get_user_model()
+
+RESULTS_VERSION = 1
+
+
+class _Rollback(Exception):
+    """Raised to discard benchmark data once measurements are taken."""
+
+
+class _Context:
+    """Dataset and client shared by the scenarios of one size."""
+
+    def __init__(self, institution, prefix, upload_rows):
+        self.institution = institution
+        self.prefix = prefix
+        self.upload_rows = upload_rows
+        self.client = Client()
+        self.role = None
+        self.runs = 0
+
+    def login(self, role):
+        if role and role != self.role:
+            self.client.force_login(User.objects.get(username=synthetic_username(self.prefix, 0, role)))
+            self.role = role
+            # The first request of a session stores the institution context in it; keep that out of the timings
+            self.client.get(reverse("institutions:dashboard"), secure=True)
+
+
+def _get(url_name):
+    def run(ctx):
+        response = ctx.client.get(reverse(url_name), secure=True)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url_name} returned {response.status_code}")
+    return run
+
+
+def _upload_students(ctx):
+    ctx.runs += 1
+    programs = list(ctx.institution.programs.values_list("program_code", flat=True))
+    year_code = ctx.institution.academic_years.get(is_active=True).year_code
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STUDENT_IMPORT_COLUMNS)
+    for i in range(ctx.upload_rows):
+        writer.writerow([
+            f"Upload Student {i}", f"UP{ctx.runs}-{i:06d}", f"up{ctx.runs}.{i}@students.edupay.test",
+            programs[i % len(programs)], year_code,
+        ])
+    upload = SimpleUploadedFile("students.csv", buffer.getvalue().encode("utf-8"), content_type="text/csv")
+    response = ctx.client.post(reverse("institutions:bulk_upload_students"), {"file": upload}, secure=True)
+    if response.status_code != 302:
+        raise CommandError(f"bulk upload returned {response.status_code}")
+
+
+def _send_message(ctx):
+    response = ctx.client.post(reverse("institutions:send_message"), {
+        "subject": "Fee reminder",
+        "content": "Please clear the outstanding balance before the end of term.",
+        "message_type": "reminder",
+        "target_type": "all",
+    }, secure=True)
+    if response.status_code != 302:
+        raise CommandError(f"send_message returned {response.status_code}")
+
+
+def _run_job(job_type):
+    """Work off the oldest job the matching request scenario queued."""
+    def run(ctx):
+        queued = InstitutionJob.objects.filter(institution=ctx.institution, job_type=job_type, status="queued")
+        job = queued.order_by("pk").first()
+        if job is None:
+            raise CommandError(f"No queued {job_type} job to run")
+        job = execute_job(claim_job(worker_id="benchmark", job_pk=job.pk))
+        if job.status != "succeeded":
+            raise CommandError(f"{job_type} job failed: {job.error}")
+        mail.outbox = []
+    return run
+
+
+# name -> (role, one run); job scenarios follow the request that queues them
+SCENARIOS = {
+    "institution_dashboard": ("admin", _get("institutions:dashboard")),
+    "student_management": ("admin", _get("institutions:students")),
+    "fee_analysis_dashboard": ("bursar", _get("institutions:fee_analysis")),
+    "fee_reports": ("bursar", _get("institutions:reports")),
+    "bulk_upload_students": ("admin", _upload_students),
+    "bulk_upload_students.job": (None, _run_job("bulk_upload_students")),
+    "send_message": ("principal", _send_message),
+    "send_message.job": (None, _run_job("send_principal_message")),
+}
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Compare two result sets entry by entry.
+
+    Args:
+        results: Entries of the current run
+        baseline: Entries of an earlier run
+        threshold: Allowed relative slowdown of the median, e.g. 0.25 for 25%
+
+    Returns:
+        List of (scenario, size, reason) for every regression
+    """
+    previous = {(entry["scenario"], entry["size"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["scenario"], entry["size"]))
+        if before is None:
+            continue
+        if entry["median_ms"] > before["median_ms"] * (1 + threshold):
+            regressions.append((
+                entry["scenario"], entry["size"],
+                f"median {before['median_ms']:.1f}ms -> {entry['median_ms']:.1f}ms",
+            ))
+        if entry["queries"] > before["queries"]:
+            regressions.append((
+                entry["scenario"], entry["size"], f"queries {before['queries']} -> {entry['queries']}",
+            ))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, query count and peak memory of the institution views at several data sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000],
+            help='Students in the benchmark institution'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per scenario; the median and 95th percentile are reported'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=list(SCENARIOS),
+            help='Only run these scenarios (a job scenario also needs its request scenario)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Synthetic dataset seed'
+        )
+        parser.add_argument(
+            '--upload-rows',
+            type=int,
+            default=1000,
+            help='Rows in each bulk upload file'
+        )
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Keep the cache between runs (by default every run starts cold)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='',
+            help='JSON file to write (defaults to institution-benchmarks-<timestamp>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Earlier JSON results to compare against'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Relative slowdown of the median flagged as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when a regression is flagged'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+
+        scenarios = options['only'] or list(SCENARIOS)
+        results = []
+        self.stdout.write(
+            f"{'scenario':<28}{'size':>8}{'median ms':>12}{'p95 ms':>10}{'queries':>9}{'peak KiB':>10}"
+        )
+
+        # Per-request log lines would drown the table
+        request_logger = logging.getLogger("EduPayAfrica.requests")
+        log_level = request_logger.level
+        request_logger.setLevel(logging.WARNING)
+        try:
+            # Uploads go to a throwaway media root and mail stays in memory, unthrottled;
+            # budget overruns show up in the query counts
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                MEDIA_ROOT=media_root,
+                QUERY_BUDGET_STRICT=False,
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                MESSAGE_RATE_LIMITS={},
+            ):
+                for size in options['sizes']:
+                    results.extend(self.run_size(size, scenarios, options))
+        finally:
+            request_logger.setLevel(log_level)
+
+        output = options['output'] or f"institution-benchmarks-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as f:
+            json.dump({
+                "version": RESULTS_VERSION,
+                "created_at": timezone.now().isoformat(),
+                "environment": {
+                    "database": connection.vendor,
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                },
+                "options": {
+                    key: options[key] for key in ('sizes', 'repeat', 'seed', 'upload_rows', 'warm')
+                },
+                "results": results,
+            }, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} result(s) to {output}"))
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, options['threshold'])
+            for scenario, size, reason in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {scenario} @ {size}: {reason}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+            elif options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}")
+
+    def run_size(self, size, scenarios, options):
+        results = []
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                prefix = f"bench-views-{size}"
+                dataset = generate_dataset(institutions=1, students=size, seed=options['seed'], prefix=prefix)
+                institution = dataset.institutions[0]
+                # Production dashboards read the nightly snapshot
+                refresh_fee_snapshots(institution)
+                self.stdout.write(
+                    f"Seeded {dataset.total_rows:,} rows for {size:,} students in {time.perf_counter() - started:.1f}s"
+                )
+
+                ctx = _Context(institution, prefix, options['upload_rows'])
+                for name in scenarios:
+                    role, run = SCENARIOS[name]
+                    ctx.login(role)
+                    entry = self.measure(ctx, run, options['repeat'], options['warm'])
+                    entry.update(scenario=name, size=size)
+                    results.append(entry)
+                    self.stdout.write(
+                        f"{name:<28}{size:>8}{entry['median_ms']:>12.1f}{entry['p95_ms']:>10.1f}"
+                        f"{entry['queries']:>9}{entry['peak_kib']:>10,.0f}"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+        return results
+
+    def measure(self, ctx, run, repeat, warm):
+        samples = []
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+            started = time.perf_counter()
+            run(ctx)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        # Queries and memory come from one extra run so tracing does not skew the timings
+        if not warm:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                run(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "runs": repeat,
+            "median_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0], 3),
+            "min_ms": round(min(samples), 3),
+            "queries": len(queries),
+            "peak_kib": round(peak / 1024, 1),
+        }
@@ -0,0 +1,148 @@
+"""
+Django management command to benchmark the bulk student import engine
+Usage: python manage.py benchmark_student_import [--sizes 1000 10000 100000] [--formats csv xlsx]
+
+All data is created inside a transaction that is rolled back at the end,
+so the benchmark can be run against any database without leaving rows behind.
+"""
+
+import csv
+import io
+import time
+import tracemalloc
+from datetime import date
+
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from institutions.models import AcademicYear, Faculty, InstitutionProfile, Program
+from institutions.services.student_import import STUDENT_IMPORT_COLUMNS, StudentImporter
+from institutions.services.uploads import iter_upload_rows
+
+User = get_user_model()
+
+PROGRAM_CODES = ["BSC-CS", "BSC-IT", "BCOM", "BA-ECON", "DIP-NUR"]
+YEAR_CODE = "2025/2026"
+
+
+class _Rollback(Exception):
+    """Raised to discard benchmark data once measurements are taken."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk student import throughput (rows/sec) for CSV and XLSX uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Row counts to benchmark'
+        )
+        parser.add_argument(
+            '--formats',
+            nargs='+',
+            default=['csv', 'xlsx'],
+            choices=['csv', 'xlsx'],
+            help='Upload formats to benchmark'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='bulk_create batch size'
+        )
+        parser.add_argument(
+            '--trace-memory',
+            action='store_true',
+            help='Report peak Python memory during the import (slows the run down)'
+        )
+
+    def handle(self, *args, **options):
+        trace_memory = options['trace_memory']
+        self.stdout.write(
+            f"{'format':<8}{'rows':>10}{'seconds':>12}{'rows/sec':>14}{'created':>10}{'errors':>8}"
+            + (f"{'peak MiB':>10}" if trace_memory else "")
+        )
+
+        for file_format in options['formats']:
+            for size in options['sizes']:
+                payload = self.build_payload(file_format, size)
+                try:
+                    with transaction.atomic():
+                        institution = self.create_institution(size)
+                        upload = SimpleUploadedFile(f"students.{file_format}", payload)
+                        if trace_memory:
+                            tracemalloc.start()
+                        started = time.perf_counter()
+                        result = StudentImporter(institution, batch_size=options['batch_size']).run(
+                            iter_upload_rows(upload)
+                        )
+                        elapsed = time.perf_counter() - started
+                        if trace_memory:
+                            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                            tracemalloc.stop()
+                        raise _Rollback
+                except _Rollback:
+                    pass
+
+                self.stdout.write(
+                    f"{file_format:<8}{size:>10}{elapsed:>12.2f}{size / elapsed:>14,.0f}"
+                    f"{result.created:>10}{result.error_count:>8}"
+                    + (f"{peak:>10.1f}" if trace_memory else "")
+                )
+
+    def create_institution(self, size):
+        """Create a throwaway institution with the programs used by the payload."""
+        user = User.objects.create(username=f"bench-import-{size}", email=f"bench-{size}@edupay.test")
+        institution = InstitutionProfile.objects.create(
+            user=user,
+            institution_name="Import Benchmark University",
+            institution_type="university",
+            contact_email=user.email,
+        )
+        faculty = Faculty.objects.create(institution=institution, name="Benchmark", code="BENCH")
+        Program.objects.bulk_create([
+            Program(institution=institution, faculty=faculty, program_name=code, program_code=code)
+            for code in PROGRAM_CODES
+        ])
+        AcademicYear.objects.create(
+            institution=institution,
+            year_code=YEAR_CODE,
+            start_date=date(2025, 9, 1),
+            end_date=date(2026, 7, 31),
+            is_active=True,
+        )
+        return institution
+
+    def iter_rows(self, size):
+        for i in range(size):
+            yield [
+                f"Student {i}",
+                f"ADM{i:07d}",
+                f"student{i}@edupay.test",
+                PROGRAM_CODES[i % len(PROGRAM_CODES)],
+                YEAR_CODE,
+            ]
+
+    def build_payload(self, file_format, size):
+        """Build an in-memory upload so file generation is not part of the timing."""
+        if file_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(STUDENT_IMPORT_COLUMNS)
+            writer.writerows(self.iter_rows(size))
+            return buffer.getvalue().encode('utf-8')
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(STUDENT_IMPORT_COLUMNS)
+        for row in self.iter_rows(size):
+            ws.append(row)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
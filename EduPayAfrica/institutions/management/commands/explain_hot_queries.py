@@ -0,0 +1,127 @@
+"""
+Django management command to print the query plans of the hot multi-tenant filters
+Usage: python manage.py explain_hot_queries [--institution ID] [--user ID] [--analyze] [--only NAME ...]
+
+Run it against a production-sized database after adding or changing indexes
+to confirm each query is served by an index rather than a table scan.
+--analyze executes the queries (EXPLAIN ANALYZE) and is PostgreSQL only.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from institutions.models import (
+    AcademicYear,
+    InstitutionAuditLog,
+    InstitutionProfile,
+    InstitutionStaff,
+    Student,
+    StudentFeeAssignment,
+)
+
+
+def _active_year(institution, user):
+    return AcademicYear.objects.filter(institution=institution, is_active=True).order_by("-start_date")[:1]
+
+
+def _students(institution, user):
+    return Student.objects.filter(institution=institution, is_active=True).order_by("full_name", "id")[:50]
+
+
+def _student_search(institution, user):
+    return Student.objects.filter(institution=institution, is_active=True).filter(
+        Q(full_name__istartswith="a") | Q(admission_number__istartswith="a") | Q(email__istartswith="a")
+    ).order_by("full_name", "id")[:50]
+
+
+def _year_assignments(institution, user):
+    year = AcademicYear.objects.filter(institution=institution).order_by("-is_active", "-start_date").first()
+    return StudentFeeAssignment.objects.filter(institution=institution, academic_year=year)
+
+
+def _overdue_students(institution, user):
+    return Student.objects.filter(
+        institution=institution, is_active=True, fee_assignments__is_overdue=True
+    ).distinct()
+
+
+def _overdue_sweep(institution, user):
+    return StudentFeeAssignment.objects.filter(
+        institution=institution, is_overdue=False, due_date__lt=timezone.localdate(), outstanding_balance__gt=0
+    )
+
+
+def _audit_log(institution, user):
+    return InstitutionAuditLog.objects.filter(institution=institution).order_by("-created_at")[:50]
+
+
+def _staff_role(institution, user):
+    return InstitutionStaff.objects.filter(user=user, is_active=True).order_by("pk")[:1]
+
+
+# name -> (description, queryset factory)
+HOT_QUERIES = {
+    "active_year": ("AcademicYear(institution, is_active)", _active_year),
+    "students": ("Student(institution, is_active) listing", _students),
+    "student_search": ("Student prefix search on name, admission number, email", _student_search),
+    "year_assignments": ("StudentFeeAssignment(institution, academic_year)", _year_assignments),
+    "overdue_students": ("Students with overdue assignments", _overdue_students),
+    "overdue_sweep": ("StudentFeeAssignment rows becoming overdue", _overdue_sweep),
+    "audit_log": ("InstitutionAuditLog(institution, created_at) latest entries", _audit_log),
+    "staff_role": ("InstitutionStaff(user, is_active)", _staff_role),
+}
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the hot multi-tenant queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--institution',
+            type=int,
+            help='InstitutionProfile ID to plan for (defaults to the one with most students)'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='User ID for the staff role lookup (defaults to the institution owner)'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only; executes the queries)'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=sorted(HOT_QUERIES),
+            help='Only explain these queries'
+        )
+
+    def handle(self, *args, **options):
+        if options['analyze'] and connection.vendor != 'postgresql':
+            raise CommandError("--analyze is only supported on PostgreSQL")
+
+        if options['institution']:
+            institution = InstitutionProfile.objects.filter(pk=options['institution']).first()
+            if institution is None:
+                raise CommandError(f"Institution {options['institution']} does not exist")
+        else:
+            institution = (
+                InstitutionProfile.objects.annotate(student_count=Count('students'))
+                .order_by('-student_count', 'pk')
+                .first()
+            )
+            if institution is None:
+                raise CommandError("No institutions to plan for")
+        user_id = options['user'] or institution.user_id
+
+        explain_options = {'analyze': True, 'buffers': True} if options['analyze'] else {}
+        for name in options['only'] or HOT_QUERIES:
+            description, factory = HOT_QUERIES[name]
+            queryset = factory(institution, user_id)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {description}"))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
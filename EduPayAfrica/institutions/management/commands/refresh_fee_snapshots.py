@@ -0,0 +1,60 @@
+"""
+Django management command to materialise fee analysis snapshots
+Usage: python manage.py refresh_fee_snapshots [--full] [--institution ID]
+
+Schedule this nightly (cron, Heroku Scheduler, ...). Only academic years whose
+fee assignments changed since their last snapshot are recomputed unless
+--full is given.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from institutions.models import InstitutionProfile
+from institutions.services.fee_analysis import refresh_fee_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Refresh FeeAnalysisSnapshot rows for academic years whose fee assignments changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every academic year, even if nothing changed'
+        )
+        parser.add_argument(
+            '--institution',
+            type=int,
+            help='Only refresh snapshots for this InstitutionProfile ID'
+        )
+
+    def handle(self, *args, **options):
+        institution = None
+        if options['institution']:
+            try:
+                institution = InstitutionProfile.objects.get(pk=options['institution'])
+            except InstitutionProfile.DoesNotExist:
+                raise CommandError(f"Institution {options['institution']} does not exist")
+
+        started = time.perf_counter()
+        result = refresh_fee_snapshots(institution=institution, full=options['full'])
+        elapsed = time.perf_counter() - started
+
+        for academic_year in result.refreshed:
+            self.stdout.write(
+                f"  {academic_year.institution.institution_name} {academic_year.year_code}: refreshed"
+            )
+        for academic_year in result.failed:
+            self.stdout.write(self.style.ERROR(
+                f"  {academic_year.institution.institution_name} {academic_year.year_code}: failed"
+            ))
+
+        summary = (
+            f"Checked {result.checked} academic year(s): {len(result.refreshed)} refreshed, "
+            f"{result.skipped} unchanged, {len(result.failed)} failed in {elapsed:.2f}s"
+        )
+        if result.failed:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,89 @@
+"""
+Django management command to process queued institution jobs
+Usage: python manage.py run_institution_jobs [--once] [--sleep 2] [--max-jobs N]
+
+Run one or more of these alongside the web process (see Procfile). Workers
+coordinate through the database, so no external broker is needed.
+"""
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from institutions.services.jobs import (
+    claim_job,
+    default_worker_id,
+    execute_job,
+    requeue_stale_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Process background institution jobs (bulk uploads, messaging, fee analysis, statements)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help='Exit after processing this many jobs (0 = unlimited)'
+        )
+        parser.add_argument(
+            '--worker-id',
+            type=str,
+            default='',
+            help='Identifier recorded on claimed jobs (defaults to host:pid)'
+        )
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.stdout.write(f"Worker {worker_id} started")
+        processed = 0
+
+        while not self._stopping:
+            close_old_connections()
+            recovered = requeue_stale_jobs()
+            if recovered:
+                self.stdout.write(self.style.WARNING(f"Recovered {recovered} stale job(s)"))
+
+            job = claim_job(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            started = time.perf_counter()
+            job = execute_job(job)
+            elapsed = time.perf_counter() - started
+            processed += 1
+
+            style = self.style.SUCCESS if job.status == "succeeded" else self.style.ERROR
+            self.stdout.write(style(
+                f"Job #{job.pk} {job.job_type}: {job.status} in {elapsed:.2f}s (attempt {job.attempts})"
+            ))
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f"Worker {worker_id} stopped after {processed} job(s)")
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
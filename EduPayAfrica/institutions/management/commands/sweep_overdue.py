@@ -0,0 +1,59 @@
+"""
+Django management command to flag overdue fee assignments
+Usage: python manage.py sweep_overdue [--institution ID] [--date YYYY-MM-DD]
+
+Safe to run hourly across all tenants: each institution costs two UPDATE
+statements, and unchanged institutions write nothing.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from institutions.models import InstitutionProfile
+from institutions.services.overdue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = 'Mark fee assignments past their due date as overdue and clear paid ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--institution',
+            type=int,
+            help='Only sweep this InstitutionProfile ID'
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Reference date (YYYY-MM-DD), defaults to today'
+        )
+
+    def handle(self, *args, **options):
+        institution = None
+        if options['institution']:
+            try:
+                institution = InstitutionProfile.objects.get(pk=options['institution'])
+            except InstitutionProfile.DoesNotExist:
+                raise CommandError(f"Institution {options['institution']} does not exist")
+
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        result = sweep_overdue(institution=institution, today=today)
+
+        for sweep in result.institutions:
+            if sweep.changed or options['verbosity'] > 1:
+                self.stdout.write(
+                    f"  {sweep.institution.institution_name}: {sweep.marked} marked, "
+                    f"{sweep.cleared} cleared ({sweep.seconds * 1000:.1f} ms)"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {len(result.institutions)} institution(s) as of {result.today}: "
+            f"{result.marked} marked overdue, {result.cleared} cleared in {result.seconds:.2f}s"
+        ))
@@ -0,0 +1,77 @@
+"""
+Migration Operations
+Schema operations that stay safe on large production tables.
+
+On PostgreSQL, indexes are built with CREATE INDEX CONCURRENTLY, which does
+not block writes to the table while the index is built. Other backends
+(SQLite in development) get a plain CREATE INDEX. Migrations using these
+operations must set `atomic = False`, since PostgreSQL cannot build an index
+concurrently inside a transaction.
+
+PostgreSQL-only indexes that Django's Index cannot express portably (such as
+expression indexes with an operator class) use RunSQLOnPostgreSQL.
+"""
+
+from django.db import NotSupportedError, migrations
+
+
+def _concurrently(schema_editor) -> bool:
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            "Concurrent index operations cannot run inside a transaction; set atomic = False on the migration."
+        )
+    return True
+
+
+def _index_kwargs(schema_editor) -> dict:
+    return {"concurrently": True} if _concurrently(schema_editor) else {}
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex that builds the index without locking writes on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **_index_kwargs(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **_index_kwargs(schema_editor))
+
+    def describe(self):
+        return f"Concurrently create index {self.index.name} on {self.model_name}"
+
+
+class RemoveIndexConcurrently(migrations.RemoveIndex):
+    """RemoveIndex that drops the index without locking writes on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = from_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+            schema_editor.remove_index(model, index, **_index_kwargs(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+            schema_editor.add_index(model, index, **_index_kwargs(schema_editor))
+
+    def describe(self):
+        return f"Concurrently remove index {self.name} from {self.model_name}"
+
+
+class RunSQLOnPostgreSQL(migrations.RunSQL):
+    """RunSQL that only runs on PostgreSQL; other backends skip it."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
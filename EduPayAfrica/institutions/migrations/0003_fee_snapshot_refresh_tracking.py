@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0002_institutionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feeanalysissnapshot',
+            name='assignment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='feeanalysissnapshot',
+            name='refreshed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='feeanalysissnapshot',
+            name='source_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='feeanalysissnapshot',
+            index=models.Index(fields=['institution', 'academic_year', 'snapshot_date'], name='fee_snapshot_inst_year_date'),
+        ),
+    ]
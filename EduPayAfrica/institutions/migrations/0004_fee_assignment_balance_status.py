@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:50
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0003_fee_snapshot_refresh_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfeeassignment',
+            name='outstanding_balance',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('total_fees'), '-', models.F('discount_amount')), '+', models.F('penalty_amount')), '-', models.F('amount_paid')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddField(
+            model_name='studentfeeassignment',
+            name='payment_status',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(amount_paid__gte=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('total_fees'), '-', models.F('discount_amount')), '+', models.F('penalty_amount')), then=models.Value('paid')), models.When(amount_paid__gt=0, then=models.Value('partial')), default=models.Value('unpaid')), output_field=models.CharField(choices=[('paid', 'Paid in Full'), ('partial', 'Partially Paid'), ('unpaid', 'Not Paid')], max_length=10)),
+        ),
+        migrations.AddIndex(
+            model_name='studentfeeassignment',
+            index=models.Index(fields=['academic_year', 'payment_status'], name='fee_assign_year_status'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0004_fee_assignment_balance_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['institution', 'is_active', 'full_name', 'id'], name='student_inst_active_name'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['institution', 'program'], name='student_inst_program'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['institution', 'academic_year'], name='student_inst_year'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+from institutions.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('institutions', '0005_student_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='academicyear',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['institution', '-start_date'], name='acad_year_inst_active'),
+        ),
+        AddIndexConcurrently(
+            model_name='institutionauditlog',
+            index=models.Index(fields=['institution', '-created_at'], name='audit_log_inst_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='institutionstaff',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'id'], name='inst_staff_user_active'),
+        ),
+        AddIndexConcurrently(
+            model_name='studentfeeassignment',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['student'], name='fee_assign_overdue_student'),
+        ),
+    ]
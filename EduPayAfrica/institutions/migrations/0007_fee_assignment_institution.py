@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0006_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfeeassignment',
+            name='institution',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fee_assignments', to='institutions.institutionprofile'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+# Assignment IDs per UPDATE; each chunk commits on its own so locks stay short
+CHUNK_SIZE = 10000
+
+
+def backfill_institution(apps, schema_editor):
+    Student = apps.get_model('institutions', 'Student')
+    StudentFeeAssignment = apps.get_model('institutions', 'StudentFeeAssignment')
+
+    db_alias = schema_editor.connection.alias
+    assignments = StudentFeeAssignment.objects.using(db_alias)
+    student_institution = Subquery(
+        Student.objects.using(db_alias).filter(pk=OuterRef('student_id')).values('institution_id')[:1]
+    )
+
+    last_pk = 0
+    max_pk = assignments.order_by('-pk').values_list('pk', flat=True).first() or 0
+    while last_pk < max_pk:
+        with transaction.atomic(using=db_alias):
+            assignments.filter(
+                pk__gt=last_pk, pk__lte=last_pk + CHUNK_SIZE, institution__isnull=True
+            ).update(institution_id=student_institution)
+        last_pk += CHUNK_SIZE
+
+
+class Migration(migrations.Migration):
+
+    # Commit chunk by chunk instead of holding one transaction over the whole table
+    atomic = False
+
+    dependencies = [
+        ('institutions', '0007_fee_assignment_institution'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_institution, migrations.RunPython.noop),
+    ]
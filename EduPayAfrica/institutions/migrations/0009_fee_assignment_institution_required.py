@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from institutions.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('institutions', '0008_backfill_fee_assignment_institution'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentfeeassignment',
+            name='institution',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='fee_assignments', to='institutions.institutionprofile'),
+        ),
+        AddIndexConcurrently(
+            model_name='studentfeeassignment',
+            index=models.Index(fields=['institution', 'academic_year'], name='fee_assign_inst_year'),
+        ),
+        AddIndexConcurrently(
+            model_name='studentfeeassignment',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['institution', 'student'], name='fee_assign_inst_overdue'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='studentfeeassignment',
+            name='fee_assign_overdue_student',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0009_fee_assignment_institution_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=20)),
+                ('recipient', models.CharField(max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='institutions.principalmessage')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_deliveries', to='institutions.parentguardian')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_deliveries', to='institutions.student')),
+            ],
+            options={
+                'verbose_name': 'Message Delivery',
+                'verbose_name_plural': 'Message Deliveries',
+                'indexes': [models.Index(fields=['message', 'status', 'id'], name='msg_delivery_status')],
+                'unique_together': {('message', 'parent', 'channel')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from institutions.migration_operations import RunSQLOnPostgreSQL
+
+# The student search uses istartswith, which PostgreSQL runs as
+# UPPER(column) LIKE 'TERM%'. A btree over UPPER(column) with text_pattern_ops
+# serves that under any collation; Django's Index cannot express the operator
+# class on an expression portably, so these are PostgreSQL-only raw SQL.
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('institutions', '0010_message_delivery'),
+    ]
+
+    operations = [
+        RunSQLOnPostgreSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "student_search_name" ON "institutions_student" '
+                '("institution_id", UPPER("full_name") text_pattern_ops) WHERE "is_active"',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "student_search_name"',
+        ),
+        RunSQLOnPostgreSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "student_search_admission" ON "institutions_student" '
+                '("institution_id", UPPER("admission_number") text_pattern_ops) WHERE "is_active"',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "student_search_admission"',
+        ),
+        RunSQLOnPostgreSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "student_search_email" ON "institutions_student" '
+                '("institution_id", UPPER("email") text_pattern_ops) WHERE "is_active"',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "student_search_email"',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:13
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def delete_duplicate_snapshots(apps, schema_editor):
+    """Keep the most recent snapshot of each academic year and day."""
+    FeeAnalysisSnapshot = apps.get_model('institutions', 'FeeAnalysisSnapshot')
+    snapshots = FeeAnalysisSnapshot.objects.using(schema_editor.connection.alias)
+    latest = (
+        snapshots.values('institution', 'academic_year', 'snapshot_date')
+        .annotate(latest_pk=Max('pk'))
+        .values_list('latest_pk', flat=True)
+    )
+    snapshots.exclude(pk__in=list(latest)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0011_student_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='feeanalysissnapshot',
+            name='fee_snapshot_inst_year_date',
+        ),
+        migrations.AddConstraint(
+            model_name='feeanalysissnapshot',
+            constraint=models.UniqueConstraint(fields=('institution', 'academic_year', 'snapshot_date'), name='fee_snapshot_inst_year_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0012_fee_snapshot_unique_per_day'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='messagedelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
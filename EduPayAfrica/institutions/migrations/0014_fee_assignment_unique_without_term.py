@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:50
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_assignments(apps, schema_editor):
+    """
+    Drop later copies of term-less assignments billed twice by concurrent runs.
+
+    Only copies without any payment, discount or penalty are deleted; if
+    recorded money is involved the duplicates have to be merged by hand.
+    """
+    StudentFeeAssignment = apps.get_model('institutions', 'StudentFeeAssignment')
+    assignments = StudentFeeAssignment.objects.using(schema_editor.connection.alias).filter(term__isnull=True)
+    duplicates = (
+        assignments.values('student', 'fee_structure', 'academic_year')
+        .annotate(first_pk=Min('pk'), copies=Count('pk'))
+        .filter(copies__gt=1)
+    )
+    for group in duplicates:
+        copies = assignments.filter(
+            student=group['student'], fee_structure=group['fee_structure'], academic_year=group['academic_year']
+        ).exclude(pk=group['first_pk'])
+        copies.filter(amount_paid=0, discount_amount=0, penalty_amount=0).delete()
+        if copies.exists():
+            raise RuntimeError(
+                f"Student {group['student']} has several assignments of fee structure {group['fee_structure']} "
+                f"for academic year {group['academic_year']} with payments recorded; merge them before migrating."
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutions', '0013_message_delivery_sending'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_assignments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentfeeassignment',
+            constraint=models.UniqueConstraint(condition=models.Q(('term__isnull', True)), fields=('student', 'fee_structure', 'academic_year'), name='fee_assign_unique_without_term'),
+        ),
+    ]
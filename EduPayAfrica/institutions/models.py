@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -52,6 +52,14 @@ class AcademicYear(models.Model):
     class Meta:
         unique_together = ("institution", "year_code")
         ordering = ["-start_date"]
+        indexes = [
+            # "The institution's active year": at most a handful of rows per institution
+            models.Index(
+                fields=["institution", "-start_date"],
+                condition=models.Q(is_active=True),
+                name="acad_year_inst_active",
+            ),
+        ]
         verbose_name = "Academic Year"
         verbose_name_plural = "Academic Years"
 
@@ -163,6 +171,20 @@ class Program(models.Model):
         return f"{self.program_name} ({self.get_program_type_display()})"
 
 
+class StudentQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Move the students' fee assignments along when their institution changes."""
+        if "institution" not in kwargs and "institution_id" not in kwargs:
+            return super().update(**kwargs)
+        institution = kwargs.get("institution", kwargs.get("institution_id"))
+        if hasattr(institution, "resolve_expression"):
+            raise ValueError("Students can only be moved to a given institution, not a computed one")
+        with transaction.atomic(using=self.db):
+            # Before the students, while this queryset still matches them
+            StudentFeeAssignment.objects.filter(student__in=self.values("pk")).update(institution=institution)
+            return super().update(**kwargs)
+
+
 class Student(models.Model):
     """Student records (no authentication yet)."""
 
@@ -188,14 +210,39 @@ class Student(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StudentQuerySet.as_manager()
+
     class Meta:
         unique_together = ("institution", "admission_number")
+        indexes = [
+            # Keyset pagination of the student listing: (full_name, id) within an institution
+            models.Index(fields=["institution", "is_active", "full_name", "id"], name="student_inst_active_name"),
+            models.Index(fields=["institution", "program"], name="student_inst_program"),
+            models.Index(fields=["institution", "academic_year"], name="student_inst_year"),
+        ]
         verbose_name = "Student"
         verbose_name_plural = "Students"
 
     def __str__(self):
         return f"{self.full_name} ({self.admission_number})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_institution_id = instance.__dict__.get("institution_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_institution_id", None)
+        if loaded is None or loaded == self.institution_id:
+            super().save(*args, **kwargs)
+        else:
+            # Moved to another institution: StudentFeeAssignment.institution copies the student's
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+                self.fee_assignments.update(institution_id=self.institution_id)
+        self._loaded_institution_id = self.institution_id
+
 
 class FeeStructure(models.Model):
     """Fee structure definition (versioned)."""
@@ -253,9 +300,72 @@ class FeeItem(models.Model):
         return f"{self.name} ({self.fee_structure})"
 
 
+# Amount due after discounts and penalties; shared with fee statistics queries
+NET_FEES = models.F("total_fees") - models.F("discount_amount") + models.F("penalty_amount")
+
+
+class StudentFeeAssignmentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fill in each assignment's institution from its student (one query for all of them)."""
+        objs = list(objs)
+        missing = {obj.student_id for obj in objs if obj.institution_id is None}
+        if missing:
+            institutions = dict(Student.objects.filter(pk__in=missing).values_list("pk", "institution_id"))
+            for obj in objs:
+                if obj.institution_id is None:
+                    obj.institution_id = institutions.get(obj.student_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """Re-derive the institution of every assignment when students change (one query)."""
+        if "student" not in fields and "student_id" not in fields:
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        objs = list(objs)
+        institutions = dict(
+            Student.objects.filter(pk__in={obj.student_id for obj in objs}).values_list("pk", "institution_id")
+        )
+        for obj in objs:
+            obj.institution_id = institutions.get(obj.student_id)
+        return super().bulk_update(objs, [*fields, "institution"], *args, **kwargs)
+
+    def update(self, **kwargs):
+        """
+        Keep the institution copy in step when assignments move to another student.
+
+        `updated_at` is stamped like save() would (bulk_update() goes through
+        here too), since fee snapshots detect changes by the newest one.
+        """
+        kwargs.setdefault("updated_at", timezone.now())
+        for name in ("student", "student_id"):
+            # bulk_update() passes the institutions it derived alongside the students
+            if name not in kwargs or "institution" in kwargs or "institution_id" in kwargs:
+                continue
+            student = kwargs[name]
+            if hasattr(student, "resolve_expression"):
+                raise ValueError("Fee assignments can only be moved to a given student, not a computed one")
+            if isinstance(student, Student):
+                kwargs["institution_id"] = student.institution_id
+            else:
+                kwargs["institution_id"] = models.Subquery(
+                    Student.objects.filter(pk=student).values("institution_id")[:1]
+                )
+        return super().update(**kwargs)
+
+
 class StudentFeeAssignment(models.Model):
     """Assigns fees to individual students (accounting entry)."""
 
+    PAYMENT_STATUS_CHOICES = [
+        ("paid", "Paid in Full"),
+        ("partial", "Partially Paid"),
+        ("unpaid", "Not Paid"),
+    ]
+
+    # Copy of student.institution, so tenant-scoped fee queries need no join to Student.
+    # Indexed by fee_assign_inst_year rather than a single-column index.
+    institution = models.ForeignKey(
+        InstitutionProfile, on_delete=models.CASCADE, related_name="fee_assignments", editable=False, db_index=False
+    )
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="fee_assignments")
     fee_structure = models.ForeignKey(FeeStructure, on_delete=models.PROTECT)
     academic_year = models.ForeignKey(AcademicYear, on_delete=models.PROTECT)
@@ -266,6 +376,23 @@ class StudentFeeAssignment(models.Model):
     penalty_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Computed and stored by the database, so they stay correct for save(),
+    # update(), bulk_update() and raw SQL alike
+    outstanding_balance = models.GeneratedField(
+        expression=NET_FEES - models.F("amount_paid"),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
+    payment_status = models.GeneratedField(
+        expression=models.Case(
+            models.When(amount_paid__gte=NET_FEES, then=models.Value("paid")),
+            models.When(amount_paid__gt=0, then=models.Value("partial")),
+            default=models.Value("unpaid"),
+        ),
+        output_field=models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES),
+        db_persist=True,
+    )
     
     due_date = models.DateField(null=True, blank=True)
     is_overdue = models.BooleanField(default=False)
@@ -273,30 +400,74 @@ class StudentFeeAssignment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StudentFeeAssignmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ("student", "fee_structure", "academic_year", "term")
+        constraints = [
+            # NULLs are distinct in unique_together, so term-less assignments need their own
+            models.UniqueConstraint(
+                fields=["student", "fee_structure", "academic_year"],
+                condition=models.Q(term__isnull=True),
+                name="fee_assign_unique_without_term",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["institution", "academic_year"], name="fee_assign_inst_year"),
+            models.Index(fields=["academic_year", "payment_status"], name="fee_assign_year_status"),
+            # Overdue rows are a small slice of the table; only they are indexed
+            models.Index(
+                fields=["institution", "student"],
+                condition=models.Q(is_overdue=True),
+                name="fee_assign_inst_overdue",
+            ),
+        ]
         verbose_name = "Student Fee Assignment"
         verbose_name_plural = "Student Fee Assignments"
 
     def __str__(self):
         return f"{self.student.full_name} - {self.academic_year.year_code}"
 
-    @property
-    def outstanding_balance(self):
-        """Calculate outstanding balance."""
-        return self.total_fees - self.discount_amount + self.penalty_amount - self.amount_paid
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The student the row was loaded with; save() re-derives the institution if it changes
+        instance._loaded_student_id = instance.__dict__.get("student_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.student_id is not None:
+            if StudentFeeAssignment.student.is_cached(self):
+                institution_id = self.student.institution_id
+            elif self.institution_id is None or self.student_id != getattr(self, "_loaded_student_id", None):
+                institution_id = Student.objects.filter(pk=self.student_id).values_list("institution_id", flat=True).first()
+            else:
+                institution_id = self.institution_id
+            if institution_id != self.institution_id:
+                self.institution_id = institution_id
+                update_fields = kwargs.get("update_fields")
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "institution"}
+        super().save(*args, **kwargs)
+        self._loaded_student_id = self.student_id
 
     @property
     def is_paid_in_full(self):
         """Check if fees are paid in full."""
-        return self.outstanding_balance <= 0
+        return self.payment_status == "paid"
 
     def update_overdue_status(self):
-        """Update overdue status based on due date."""
-        if self.due_date and self.due_date < timezone.now().date():
-            if not self.is_paid_in_full:
-                self.is_overdue = True
-                self.save()
+        """
+        Update overdue status of this one assignment based on its due date.
+
+        Use institutions.services.overdue.sweep_overdue to update many rows.
+        """
+        overdue = bool(
+            self.due_date and self.due_date < timezone.localdate() and self.outstanding_balance > 0
+        )
+        if overdue != self.is_overdue:
+            self.is_overdue = overdue
+            self.save(update_fields=["is_overdue", "updated_at"])
 
 
 class InstitutionAuditLog(models.Model):
@@ -329,6 +500,9 @@ class InstitutionAuditLog(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["institution", "-created_at"], name="audit_log_inst_created"),
+        ]
         verbose_name = "Institution Audit Log"
         verbose_name_plural = "Institution Audit Logs"
 
@@ -369,6 +543,10 @@ class InstitutionStaff(models.Model):
 
     class Meta:
         unique_together = ("institution", "user")
+        indexes = [
+            # Resolving a signed-in user's staff role (institutions.context)
+            models.Index(fields=["user", "id"], condition=models.Q(is_active=True), name="inst_staff_user_active"),
+        ]
         verbose_name = "Institution Staff"
         verbose_name_plural = "Institution Staff"
 
@@ -443,6 +621,50 @@ class PrincipalMessage(models.Model):
         return f"{self.subject} - {self.institution.institution_name}"
 
 
+class MessageDelivery(models.Model):
+    """One principal message to one parent over one channel."""
+
+    CHANNEL_CHOICES = [
+        ("email", "Email"),
+        ("sms", "SMS"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    message = models.ForeignKey(PrincipalMessage, on_delete=models.CASCADE, related_name="deliveries")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="message_deliveries")
+    parent = models.ForeignKey(ParentGuardian, on_delete=models.CASCADE, related_name="message_deliveries")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)  # Email address or phone number
+
+    # Delivery
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # Audit
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("message", "parent", "channel")
+        indexes = [
+            # The dispatcher walks a message's pending deliveries in primary key order
+            models.Index(fields=["message", "status", "id"], name="msg_delivery_status"),
+        ]
+        verbose_name = "Message Delivery"
+        verbose_name_plural = "Message Deliveries"
+
+    def __str__(self):
+        return f"{self.message.subject} -> {self.recipient} ({self.status})"
+
+
 class FeeAnalysisSnapshot(models.Model):
     """Daily snapshot of fee collection for analysis."""
 
@@ -466,14 +688,89 @@ class FeeAnalysisSnapshot(models.Model):
     collection_rate = models.DecimalField(max_digits=5, decimal_places=2)  # Percentage
     average_fee_per_student = models.DecimalField(max_digits=15, decimal_places=2)
     
+    # Change detection for incremental refreshes (see refresh_fee_snapshots)
+    assignment_count = models.IntegerField(default=0)
+    source_updated_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
     # Audit
     snapshot_date = models.DateField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-snapshot_date"]
+        constraints = [
+            # One snapshot per academic year and day; refresh_fee_snapshot updates it in place
+            models.UniqueConstraint(
+                fields=["institution", "academic_year", "snapshot_date"],
+                name="fee_snapshot_inst_year_date_uniq",
+            ),
+        ]
         verbose_name = "Fee Analysis Snapshot"
         verbose_name_plural = "Fee Analysis Snapshots"
 
     def __str__(self):
         return f"{self.institution.institution_name} - {self.snapshot_date}"
+
+
+class InstitutionJob(models.Model):
+    """Background job queued on the database and processed by run_institution_jobs."""
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    institution = models.ForeignKey(
+        InstitutionProfile, on_delete=models.CASCADE, related_name="jobs"
+    )
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    job_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to="institution_jobs/%Y/%m/", blank=True)
+
+    # Status
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    # Retry / scheduling
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    # Audit
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="inst_job_status_run_after"),
+        ]
+        verbose_name = "Institution Job"
+        verbose_name_plural = "Institution Jobs"
+
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("succeeded", "failed")
+
+    @property
+    def progress_percent(self):
+        """Completion percentage, or None when the total is unknown."""
+        if self.status == "succeeded":
+            return 100
+        if not self.total:
+            return None
+        return min(100, round(self.processed * 100 / self.total))
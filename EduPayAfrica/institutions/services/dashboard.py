@@ -0,0 +1,162 @@
+"""
+Institution Dashboard
+Role-specific dashboard data, with each role's figures fetched in few queries.
+
+Fee totals and the overdue count come from one FeeStatistics aggregate, a
+single scan of the institution's fee assignments. Other counts and the
+active year are scalar subqueries of one SELECT against the institution's
+row; lists (staff, programs, recent messages) add at most two more queries.
+The result is cached per
+(institution, role) for a short TTL and dropped on any write to the
+institution's data (see institutions.cache), so a warm dashboard costs no
+queries beyond the session and user lookups.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from institutions.cache import cached_for_institution
+from institutions.models import (
+    AcademicYear,
+    FeeStructure,
+    InstitutionProfile,
+    InstitutionStaff,
+    PrincipalMessage,
+    Program,
+    Student,
+)
+from institutions.services.fee_analysis import FeeStatistics
+
+ZERO = Decimal("0")
+
+# Seconds a role's dashboard data is cached (writes invalidate it sooner)
+DASHBOARD_TTL = 60
+
+DASHBOARD_TEMPLATES = {
+    "admin": "institutions/dashboards/admin_dashboard.html",
+    "principal": "institutions/dashboards/principal_dashboard.html",
+    "bursar": "institutions/dashboards/bursar_dashboard.html",
+    "accountant": "institutions/dashboards/bursar_dashboard.html",
+    "teacher": "institutions/dashboards/teacher_dashboard.html",
+}
+GENERIC_TEMPLATE = "institutions/dashboards/generic_dashboard.html"
+
+# FeeStatistics fields the dashboards show
+DASHBOARD_FEE_FIELDS = ("total_billed", "total_paid", "total_outstanding", "overdue")
+
+
+def _total(queryset, group_by: str, aggregate, output_field=None):
+    """Scalar subquery: `aggregate` over `queryset`, which must be correlated via OuterRef("pk")."""
+    output_field = output_field or IntegerField()
+    rows = queryset.order_by().values(group_by).annotate(total=aggregate).values("total")[:1]
+    default = Value(ZERO) if isinstance(output_field, DecimalField) else Value(0)
+    return Coalesce(Subquery(rows, output_field=output_field), default, output_field=output_field)
+
+
+def _students_count():
+    return _total(Student.objects.filter(institution=OuterRef("pk"), is_active=True), "institution", Count("pk"))
+
+
+def _active_year():
+    years = AcademicYear.objects.filter(institution=OuterRef("pk"), is_active=True).order_by("-start_date")
+    return {
+        "active_year_id": Subquery(years.values("pk")[:1]),
+        "active_year_code": Subquery(years.values("year_code")[:1]),
+    }
+
+
+def _stats(institution: InstitutionProfile, **figures) -> dict:
+    """Evaluate the active year and all `figures` in one SELECT."""
+    figures.update(_active_year())
+    row = InstitutionProfile.objects.filter(pk=institution.pk).annotate(**figures).values(*figures).get()
+
+    year_id, year_code = row.pop("active_year_id"), row.pop("active_year_code")
+    row["active_academic_year"] = {"pk": year_id, "year_code": year_code} if year_id else None
+    return row
+
+
+def admin_dashboard(institution: InstitutionProfile) -> dict:
+    data = _stats(institution, students_count=_students_count())
+    fees = FeeStatistics.for_institution(institution, fields=DASHBOARD_FEE_FIELDS)
+    data.update(
+        total_fees_billed=fees.total_billed,
+        total_outstanding=fees.total_outstanding,
+        overdue_count=fees.overdue,
+    )
+    data["staff_list"] = list(InstitutionStaff.objects.filter(institution=institution, is_active=True))
+    return data
+
+
+def principal_dashboard(institution: InstitutionProfile) -> dict:
+    data = _stats(
+        institution,
+        messages_sent=_total(PrincipalMessage.objects.filter(institution=OuterRef("pk")), "institution", Count("pk")),
+        staff_count=_total(
+            InstitutionStaff.objects.filter(institution=OuterRef("pk"), is_active=True), "institution", Count("pk")
+        ),
+    )
+    data["recent_messages"] = list(
+        PrincipalMessage.objects.filter(institution=institution)
+        .annotate(recipient_count=Count("target_students"))
+        .order_by("-sent_date")[:5]
+    )
+    return data
+
+
+def bursar_dashboard(institution: InstitutionProfile) -> dict:
+    # The bursar dashboard shows no academic year, so the fee aggregate is its only stats query
+    fees = FeeStatistics.for_institution(institution, fields=DASHBOARD_FEE_FIELDS)
+    data = {
+        "total_billed": fees.total_billed,
+        "total_paid": fees.total_paid,
+        "total_outstanding": fees.total_outstanding,
+        "collection_rate": round(fees.collection_rate, 2),
+    }
+    data["programs"] = list(Program.objects.filter(institution=institution, is_active=True))
+    data["fee_structures"] = list(FeeStructure.objects.filter(institution=institution))
+    return data
+
+
+def teacher_dashboard(institution: InstitutionProfile) -> dict:
+    return _stats(institution, students_count=_students_count())
+
+
+def generic_dashboard(institution: InstitutionProfile) -> dict:
+    return _stats(institution)
+
+
+DASHBOARD_BUILDERS = {
+    "admin": admin_dashboard,
+    "principal": principal_dashboard,
+    "bursar": bursar_dashboard,
+    "accountant": bursar_dashboard,
+    "teacher": teacher_dashboard,
+}
+
+
+def dashboard_data(institution: InstitutionProfile, role) -> dict:
+    """
+    Template context for a role's dashboard, cached per (institution, role).
+
+    Args:
+        institution: Institution whose dashboard is shown
+        role: InstitutionStaff role of the viewer (None for the generic dashboard)
+
+    Returns:
+        Dict of dashboard figures and lists
+    """
+    builder = DASHBOARD_BUILDERS.get(role, generic_dashboard)
+    return cached_for_institution(
+        institution,
+        "dashboard",
+        lambda: builder(institution),
+        role,
+        timeout=getattr(settings, "INSTITUTION_DASHBOARD_TIMEOUT", DASHBOARD_TTL),
+    )
+
+
+def dashboard_template(role) -> str:
+    return DASHBOARD_TEMPLATES.get(role, GENERIC_TEMPLATE)
@@ -0,0 +1,303 @@
+"""
+Fee Analysis
+Fee collection statistics and FeeAnalysisSnapshot recomputation.
+
+Snapshots are materialised by the `refresh_fee_snapshots` management command
+(run nightly from the scheduler). Each snapshot remembers how many assignments
+it covered and the newest assignment update it saw, so a refresh only
+recomputes academic years whose assignments changed since the last run.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import Count, DecimalField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from institutions.cache import invalidate_institution
+from institutions.models import (
+    AcademicYear,
+    FeeAnalysisSnapshot,
+    InstitutionProfile,
+    Student,
+    StudentFeeAssignment,
+)
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal("0")
+
+# Number of snapshots shown in dashboard trend charts
+TREND_LENGTH = 30
+
+_MONEY = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _money_sum(expression):
+    return Coalesce(Sum(expression, output_field=_MONEY), Value(ZERO), output_field=_MONEY)
+
+
+@dataclass(frozen=True)
+class FeeStatistics:
+    """
+    Totals and payment buckets for a set of fee assignments.
+
+    Everything is computed by a single conditional-aggregation query, so a
+    dashboard costs one scan of the assignment table instead of one per metric.
+    """
+
+    assignment_count: int = 0
+    student_count: int = 0
+    total_billed: Decimal = ZERO
+    total_paid: Decimal = ZERO
+    total_outstanding: Decimal = ZERO
+    fully_paid: int = 0
+    partially_paid: int = 0
+    not_paid: int = 0
+    overdue: int = 0
+    last_updated: Optional[datetime] = None
+
+    @classmethod
+    def for_queryset(cls, assignments, fields=None) -> "FeeStatistics":
+        """
+        Aggregate an arbitrary StudentFeeAssignment queryset in one query.
+
+        Args:
+            assignments: Assignments to aggregate
+            fields: Only compute these fields, leaving the others at their
+                defaults; the distinct student count is the costliest
+
+        Returns:
+            FeeStatistics of the assignments
+        """
+        aggregates = {
+            "assignment_count": Count("pk"),
+            "student_count": Count("student_id", distinct=True),
+            "total_billed": _money_sum("total_fees"),
+            "total_paid": _money_sum("amount_paid"),
+            "total_outstanding": _money_sum("outstanding_balance"),
+            "fully_paid": Count("pk", filter=Q(payment_status="paid")),
+            "partially_paid": Count("pk", filter=Q(payment_status="partial")),
+            "not_paid": Count("pk", filter=Q(payment_status="unpaid")),
+            "overdue": Count("pk", filter=Q(is_overdue=True)),
+            "last_updated": Max("updated_at"),
+        }
+        if fields is not None:
+            aggregates = {name: aggregates[name] for name in fields}
+        return cls(**assignments.order_by().aggregate(**aggregates))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: FeeAnalysisSnapshot) -> "FeeStatistics":
+        """Statistics as materialised in a FeeAnalysisSnapshot."""
+        return cls(
+            assignment_count=snapshot.assignment_count,
+            student_count=snapshot.total_students,
+            total_billed=snapshot.total_fees_billed,
+            total_paid=snapshot.total_fees_paid,
+            total_outstanding=snapshot.total_outstanding,
+            fully_paid=snapshot.fully_paid_count,
+            partially_paid=snapshot.partially_paid_count,
+            not_paid=snapshot.not_paid_count,
+            overdue=snapshot.overdue_count,
+            last_updated=snapshot.source_updated_at,
+        )
+
+    @classmethod
+    def for_institution(
+        cls, institution: InstitutionProfile, academic_year: Optional[AcademicYear] = None, fields=None
+    ) -> "FeeStatistics":
+        """Statistics for an institution, optionally limited to one academic year (see for_queryset)."""
+        assignments = StudentFeeAssignment.objects.filter(institution=institution)
+        if academic_year is not None:
+            assignments = assignments.filter(academic_year=academic_year)
+        return cls.for_queryset(assignments, fields)
+
+    @property
+    def collection_rate(self) -> Decimal:
+        """Percentage of billed fees that has been paid."""
+        if self.total_billed <= 0:
+            return ZERO
+        return self.total_paid / self.total_billed * 100
+
+    @property
+    def average_fee_per_student(self) -> Decimal:
+        if not self.student_count:
+            return ZERO
+        return self.total_billed / self.student_count
+
+    def as_dict(self) -> dict:
+        """Template-friendly mapping, including derived rates."""
+        data = asdict(self)
+        data["total_students"] = self.student_count
+        data["collection_rate"] = self.collection_rate
+        data["average_fee_per_student"] = self.average_fee_per_student
+        return data
+
+
+def refresh_fee_snapshot(academic_year: AcademicYear) -> FeeAnalysisSnapshot:
+    """
+    Fill today's FeeAnalysisSnapshot for an academic year with complete metrics.
+
+    Args:
+        academic_year: Academic year to analyse (its institution is implied)
+
+    Returns:
+        The created or updated snapshot
+    """
+    institution = academic_year.institution
+    stats = FeeStatistics.for_institution(institution, academic_year)
+    total_students = Student.objects.filter(
+        institution=institution, academic_year=academic_year, is_active=True
+    ).count()
+    average_fee = (stats.total_billed / total_students) if total_students else ZERO
+
+    snapshot, _ = FeeAnalysisSnapshot.objects.update_or_create(
+        institution=institution,
+        academic_year=academic_year,
+        snapshot_date=timezone.now().date(),
+        defaults={
+            "total_students": total_students,
+            "total_fees_billed": stats.total_billed,
+            "total_fees_paid": stats.total_paid,
+            "total_outstanding": stats.total_outstanding,
+            "overdue_count": stats.overdue,
+            "fully_paid_count": stats.fully_paid,
+            "partially_paid_count": stats.partially_paid,
+            "not_paid_count": stats.not_paid,
+            "collection_rate": round(stats.collection_rate, 2),
+            "average_fee_per_student": round(average_fee, 2),
+            "assignment_count": stats.assignment_count,
+            "source_updated_at": stats.last_updated,
+            "refreshed_at": timezone.now(),
+        },
+    )
+    invalidate_institution(institution.pk)
+    return snapshot
+
+
+@dataclass
+class SnapshotRefreshResult:
+    """Outcome of a refresh_fee_snapshots run."""
+
+    checked: int = 0
+    refreshed: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+
+    @property
+    def skipped(self) -> int:
+        return self.checked - len(self.refreshed) - len(self.failed)
+
+
+def stale_academic_years(institution: Optional[InstitutionProfile] = None, full: bool = False):
+    """
+    Academic years whose latest snapshot no longer matches their assignments.
+
+    A year is stale when it has no snapshot yet, or when its assignment count,
+    newest assignment `updated_at` or active student count differs from what
+    the latest snapshot saw. Assignment writes always move `updated_at`, bulk
+    update() ones included (see StudentFeeAssignmentQuerySet.update). Everything
+    is resolved with correlated subqueries in a single query.
+
+    Args:
+        institution: Limit the check to one institution
+        full: Return every academic year regardless of changes
+
+    Returns:
+        List of AcademicYear objects with their institution selected
+    """
+    years = AcademicYear.objects.filter(institution__is_active=True).select_related("institution")
+    if institution is not None:
+        years = years.filter(institution=institution)
+    if full:
+        return list(years.order_by("institution_id", "start_date"))
+
+    per_year = StudentFeeAssignment.objects.filter(academic_year=OuterRef("pk")).order_by().values("academic_year")
+    # Activating or deactivating a student changes the snapshot's total_students
+    active_students = (
+        Student.objects.filter(academic_year=OuterRef("pk"), is_active=True).order_by().values("academic_year")
+    )
+    latest = FeeAnalysisSnapshot.objects.filter(academic_year=OuterRef("pk")).order_by("-snapshot_date", "-pk")
+    years = years.annotate(
+        live_count=Coalesce(
+            Subquery(per_year.annotate(n=Count("pk")).values("n"), output_field=IntegerField()), 0
+        ),
+        live_updated=Subquery(per_year.annotate(m=Max("updated_at")).values("m")),
+        live_students=Coalesce(
+            Subquery(active_students.annotate(n=Count("pk")).values("n"), output_field=IntegerField()), 0
+        ),
+        snapshot_id=Subquery(latest.values("pk")[:1]),
+        snapshot_count=Subquery(latest.values("assignment_count")[:1]),
+        snapshot_updated=Subquery(latest.values("source_updated_at")[:1]),
+        snapshot_students=Subquery(latest.values("total_students")[:1]),
+    )
+
+    return [
+        year for year in years.order_by("institution_id", "start_date")
+        if year.snapshot_id is None
+        or year.live_count != year.snapshot_count
+        or year.live_updated != year.snapshot_updated
+        or year.live_students != year.snapshot_students
+    ]
+
+
+def refresh_fee_snapshots(
+    institution: Optional[InstitutionProfile] = None, full: bool = False
+) -> SnapshotRefreshResult:
+    """
+    Materialise today's snapshot for every academic year that changed.
+
+    Entry point for the nightly scheduler (via the `refresh_fee_snapshots`
+    management command). A failure in one academic year is logged and does
+    not stop the others.
+
+    Args:
+        institution: Limit the refresh to one institution
+        full: Recompute every academic year, changed or not
+
+    Returns:
+        SnapshotRefreshResult with the refreshed and failed academic years
+    """
+    result = SnapshotRefreshResult()
+    result.checked = AcademicYear.objects.filter(
+        institution__is_active=True, **({"institution": institution} if institution else {})
+    ).count()
+
+    for academic_year in stale_academic_years(institution=institution, full=full):
+        try:
+            refresh_fee_snapshot(academic_year)
+        except Exception:
+            logger.exception("Fee snapshot refresh failed for academic year %s", academic_year.pk)
+            result.failed.append(academic_year)
+        else:
+            result.refreshed.append(academic_year)
+    return result
+
+
+def latest_snapshot(institution: InstitutionProfile, academic_year: AcademicYear) -> Optional[FeeAnalysisSnapshot]:
+    """Most recent snapshot for an academic year, or None if never refreshed."""
+    return (
+        FeeAnalysisSnapshot.objects.filter(institution=institution, academic_year=academic_year)
+        .order_by("-snapshot_date", "-pk")
+        .first()
+    )
+
+
+def snapshot_trend(institution: InstitutionProfile, academic_year: AcademicYear, limit: int = TREND_LENGTH) -> list:
+    """
+    Snapshot history for trend charts, oldest first.
+
+    Returns:
+        List of dicts with snapshot_date, collection_rate, total_fees_paid,
+        total_outstanding and overdue_count
+    """
+    rows = list(
+        FeeAnalysisSnapshot.objects.filter(institution=institution, academic_year=academic_year)
+        .order_by("-snapshot_date", "-pk")
+        .values("snapshot_date", "collection_rate", "total_fees_paid", "total_outstanding", "overdue_count")[:limit]
+    )
+    rows.reverse()
+    return rows
@@ -0,0 +1,186 @@
+"""
+Bulk Fee Assignment
+Bill a whole cohort of students against a FeeStructure in batched statements.
+
+The mandatory FeeItem amounts are summed once, then students are walked in
+primary-key order. Each batch costs one lookup of existing assignments, one
+bulk INSERT for new ones and one UPDATE for existing ones whose amount or
+due date changed, so billing thousands of students takes seconds. The
+(student, fee structure, academic year, term) unique constraints, including
+the one for term-less assignments, make concurrent runs skip rows the other
+already inserted instead of billing a student twice.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from institutions.cache import invalidate_institution
+from institutions.models import (
+    AcademicYear,
+    Faculty,
+    FeeStructure,
+    Program,
+    Student,
+    StudentFeeAssignment,
+    Term,
+)
+
+
+@dataclass
+class FeeAssignmentResult:
+    """Counts and totals for a bulk fee assignment (or its dry run)."""
+
+    amount_per_student: Decimal
+    dry_run: bool = False
+    students: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def total_billed(self) -> Decimal:
+        return self.amount_per_student * self.students
+
+
+class BulkFeeAssigner:
+    """
+    Apply a fee structure to a cohort of students.
+
+    Existing assignments for the same (student, fee structure, academic year,
+    term) are updated in place, honouring StudentFeeAssignment.unique_together;
+    payments, discounts and penalties on them are left untouched.
+    """
+
+    def __init__(
+        self,
+        fee_structure: FeeStructure,
+        academic_year: AcademicYear,
+        term: Optional[Term] = None,
+        program: Optional[Program] = None,
+        faculty: Optional[Faculty] = None,
+        student_year: Optional[AcademicYear] = None,
+        due_date: Optional[date] = None,
+        batch_size: int = 1000,
+    ):
+        institution = fee_structure.institution_id
+        if academic_year.institution_id != institution:
+            raise ValueError("Academic year does not belong to this institution.")
+        if term is not None and term.academic_year_id != academic_year.pk:
+            raise ValueError("Term does not belong to the selected academic year.")
+        for scope in (program, faculty, student_year):
+            if scope is not None and scope.institution_id != institution:
+                raise ValueError(f"{scope._meta.verbose_name} does not belong to this institution.")
+
+        self.fee_structure = fee_structure
+        self.academic_year = academic_year
+        self.term = term
+        self.program = program
+        self.faculty = faculty
+        self.student_year = student_year
+        self.due_date = due_date
+        self.batch_size = batch_size
+
+    def amount_per_student(self) -> Decimal:
+        """Sum of the structure's mandatory fee items."""
+        total = self.fee_structure.fee_items.filter(is_mandatory=True).aggregate(total=Sum("amount"))["total"]
+        return total or Decimal("0")
+
+    def cohort(self):
+        """Active students selected by the program/faculty/year filters."""
+        students = Student.objects.filter(institution_id=self.fee_structure.institution_id, is_active=True)
+        if self.program is not None:
+            students = students.filter(program=self.program)
+        if self.faculty is not None:
+            students = students.filter(program__faculty=self.faculty)
+        if self.student_year is not None:
+            students = students.filter(academic_year=self.student_year)
+        return students
+
+    def _existing(self, student_ids):
+        """Map student_id -> (pk, total_fees, due_date) of assignments already billed."""
+        assignments = StudentFeeAssignment.objects.filter(
+            student_id__in=student_ids,
+            fee_structure=self.fee_structure,
+            academic_year=self.academic_year,
+        )
+        # term=None would compare with NULL, so match "no term" explicitly
+        assignments = assignments.filter(Q(term=self.term) if self.term else Q(term__isnull=True))
+        return {
+            student_id: (pk, total_fees, due_date)
+            for student_id, pk, total_fees, due_date in assignments.order_by().values_list(
+                "student_id", "pk", "total_fees", "due_date"
+            )
+        }
+
+    def run(self, dry_run: bool = False) -> FeeAssignmentResult:
+        """
+        Bill the cohort.
+
+        Args:
+            dry_run: Only count what would be created or updated
+
+        Returns:
+            FeeAssignmentResult with counts and the total billed
+        """
+        amount = self.amount_per_student()
+        result = FeeAssignmentResult(amount_per_student=amount, dry_run=dry_run)
+        cohort = self.cohort().order_by("pk").values_list("pk", flat=True)
+
+        last_pk = 0
+        while True:
+            student_ids = list(cohort.filter(pk__gt=last_pk)[:self.batch_size])
+            if not student_ids:
+                break
+            last_pk = student_ids[-1]
+            self._apply_batch(student_ids, amount, result, dry_run)
+
+        return result
+
+    def _apply_batch(self, student_ids, amount, result, dry_run):
+        existing = self._existing(student_ids)
+        due_date = self.due_date
+        stale = [
+            pk for pk, total_fees, current_due in existing.values()
+            if total_fees != amount or (due_date is not None and current_due != due_date)
+        ]
+        new_ids = [student_id for student_id in student_ids if student_id not in existing]
+
+        result.students += len(student_ids)
+        result.created += len(new_ids)
+        result.updated += len(stale)
+        result.unchanged += len(existing) - len(stale)
+        if dry_run:
+            return
+
+        with transaction.atomic():
+            StudentFeeAssignment.objects.bulk_create(
+                [
+                    StudentFeeAssignment(
+                        institution_id=self.fee_structure.institution_id,
+                        student_id=student_id,
+                        fee_structure=self.fee_structure,
+                        academic_year=self.academic_year,
+                        term=self.term,
+                        total_fees=amount,
+                        due_date=due_date,
+                    )
+                    for student_id in new_ids
+                ],
+                batch_size=self.batch_size,
+                # A concurrent run may have billed some of these students since _existing()
+                ignore_conflicts=True,
+            )
+            if stale:
+                changes = {"total_fees": amount, "updated_at": timezone.now()}
+                if due_date is not None:
+                    changes["due_date"] = due_date
+                StudentFeeAssignment.objects.filter(pk__in=stale).update(**changes)
+            if new_ids or stale:
+                # bulk_create and update() send no signals
+                invalidate_institution(self.fee_structure.institution_id)
@@ -0,0 +1,291 @@
+"""
+Institution Job Queue
+Database-backed background jobs for long-running institution operations.
+
+The database doubles as the broker: jobs are rows in InstitutionJob, claimed
+with a compare-and-swap UPDATE (plus SELECT ... FOR UPDATE SKIP LOCKED where
+the backend supports it), so any number of `run_institution_jobs` workers can
+share a queue without Redis.
+"""
+
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.after_response import run_after_response
+from institutions.models import InstitutionJob, InstitutionProfile
+
+logger = logging.getLogger(__name__)
+
+# job_type -> handler(job, progress) returning a JSON-serialisable result
+JOB_HANDLERS: dict[str, Callable] = {}
+
+# Seconds before the first retry; doubles with every failed attempt
+RETRY_BACKOFF_SECONDS = getattr(settings, "INSTITUTION_JOBS_RETRY_BACKOFF", 30)
+
+# Running jobs whose worker has been silent this long are put back on the queue
+STALE_AFTER = timedelta(seconds=getattr(settings, "INSTITUTION_JOBS_STALE_AFTER", 30 * 60))
+
+# Minimum seconds between progress writes for one job
+PROGRESS_INTERVAL = 1.0
+
+
+class JobProgress:
+    """Throttled progress reporter handed to job handlers."""
+
+    def __init__(self, job: InstitutionJob):
+        self.job = job
+        self._last_write = 0.0
+
+    def __call__(self, processed: int, total: Optional[int] = None, force: bool = False):
+        self.job.processed = processed
+        if total is not None:
+            self.job.total = total
+
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        InstitutionJob.objects.filter(pk=self.job.pk, status="running", attempts=self.job.attempts).update(
+            processed=self.job.processed,
+            total=self.job.total,
+            locked_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+
+
+def job_handler(job_type: str):
+    """Register a function as the handler for a job type."""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue_job(
+    job_type: str,
+    institution: InstitutionProfile,
+    payload: Optional[dict] = None,
+    created_by=None,
+    input_file=None,
+    max_attempts: int = 3,
+) -> InstitutionJob:
+    """
+    Queue a job for a background worker.
+
+    Args:
+        job_type: Registered handler name
+        institution: Institution the job belongs to
+        payload: JSON-serialisable arguments for the handler
+        created_by: User who requested the job
+        input_file: Optional uploaded file stored alongside the job
+        max_attempts: Attempts before the job is marked failed
+
+    Returns:
+        The queued InstitutionJob. When INSTITUTION_JOBS_EAGER is enabled the
+        job runs in-process once the transaction commits: after the response
+        has been sent during a request, immediately otherwise.
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job = InstitutionJob(
+        institution=institution,
+        created_by=created_by,
+        job_type=job_type,
+        payload=payload or {},
+        max_attempts=max_attempts,
+    )
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+
+    if getattr(settings, "INSTITUTION_JOBS_EAGER", False):
+        transaction.on_commit(lambda: run_after_response(partial(_run_eagerly, job.pk)))
+
+    return job
+
+
+def _run_eagerly(job_pk: int):
+    job = claim_job(worker_id="eager", job_pk=job_pk)
+    if job:
+        execute_job(job)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_job(worker_id: str, job_pk: Optional[int] = None) -> Optional[InstitutionJob]:
+    """
+    Claim the next runnable job (or a specific one) for this worker.
+
+    Returns:
+        The claimed job marked as running, or None if nothing is runnable
+    """
+    now = timezone.now()
+    candidates = InstitutionJob.objects.filter(status="queued", run_after__lte=now)
+    if job_pk is not None:
+        candidates = candidates.filter(pk=job_pk)
+    candidates = candidates.order_by("run_after", "pk")
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        job = candidates.first()
+        if job is None:
+            return None
+
+        # Compare-and-swap so backends without row locks (SQLite) never double-claim
+        claimed = InstitutionJob.objects.filter(pk=job.pk, status="queued").update(
+            status="running",
+            attempts=job.attempts + 1,
+            locked_by=worker_id,
+            locked_at=now,
+            started_at=now,
+            updated_at=now,
+        )
+    if not claimed:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def execute_job(job: InstitutionJob) -> InstitutionJob:
+    """
+    Run a claimed job, recording its result or scheduling a retry.
+
+    The outcome is only written while the job is still this worker's claim
+    (same attempt, still running). If the run outlived STALE_AFTER and the
+    job was requeued or reclaimed meanwhile, the late result is discarded so
+    it cannot overwrite the newer attempt.
+    """
+    handler = JOB_HANDLERS.get(job.job_type)
+    progress = JobProgress(job)
+
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job type {job.job_type}")
+        result = handler(job, progress)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.job_type, job.attempts)
+        job.error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        job.locked_by = ""
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = "failed"
+            job.finished_at = timezone.now()
+        if _record_outcome(job, [
+            "status", "error", "run_after", "locked_by", "locked_at",
+            "finished_at", "processed", "total",
+        ]) and job.status == "failed":
+            _delete_input_file(job)
+        return job
+
+    job.status = "succeeded"
+    job.result = result
+    job.error = ""
+    job.finished_at = timezone.now()
+    job.locked_by = ""
+    job.locked_at = None
+    if _record_outcome(job, [
+        "status", "result", "error", "finished_at", "locked_by", "locked_at",
+        "processed", "total",
+    ]):
+        _delete_input_file(job)
+    return job
+
+
+def _record_outcome(job: InstitutionJob, fields: list) -> bool:
+    """
+    Write the outcome of a run if the job is still claimed by it (compare-and-swap).
+
+    Returns:
+        False, after reloading the job, when another attempt has taken over
+    """
+    job.updated_at = timezone.now()
+    recorded = InstitutionJob.objects.filter(pk=job.pk, status="running", attempts=job.attempts).update(
+        updated_at=job.updated_at, **{name: getattr(job, name) for name in fields}
+    )
+    if not recorded:
+        logger.warning("Job %s (%s): attempt %s lost its claim, outcome discarded", job.pk, job.job_type, job.attempts)
+        job.refresh_from_db()
+    return bool(recorded)
+
+
+def _delete_input_file(job: InstitutionJob):
+    if job.input_file:
+        job.input_file.delete(save=False)
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Recover jobs whose worker died mid-run.
+
+    The lost run already counted as an attempt when it was claimed, so a job
+    that keeps crashing (or OOM-killing) its worker is marked failed once its
+    attempts are used up instead of being reclaimed forever.
+
+    Returns:
+        Number of jobs put back on the queue or marked failed
+    """
+    now = timezone.now()
+    stale = InstitutionJob.objects.filter(status="running", locked_at__lt=now - STALE_AFTER)
+
+    failed = 0
+    for job in stale.filter(attempts__gte=F("max_attempts")):
+        # Compare-and-swap so a job another worker just recovered is left alone
+        if InstitutionJob.objects.filter(pk=job.pk, status="running", locked_at=job.locked_at).update(
+            status="failed",
+            error=f"Worker {job.locked_by} stopped responding during attempt {job.attempts}",
+            locked_by="",
+            locked_at=None,
+            finished_at=now,
+            updated_at=now,
+        ):
+            logger.warning("Job %s (%s) failed: worker %s stopped responding", job.pk, job.job_type, job.locked_by)
+            _delete_input_file(job)
+            failed += 1
+
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status="queued",
+        locked_by="",
+        locked_at=None,
+        run_after=now,
+        updated_at=now,
+    )
+    return requeued + failed
+
+
+def job_status_payload(job: InstitutionJob) -> dict:
+    """Serialise a job for progress polling."""
+    return {
+        "id": job.pk,
+        "job_type": job.job_type,
+        "status": job.status,
+        "processed": job.processed,
+        "total": job.total,
+        "progress": job.progress_percent,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "finished": job.is_finished,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,335 @@
+"""
+Message Delivery
+Fan-out of principal messages to parents over pluggable channels.
+
+Recipients are resolved in the database: one INSERT ... SELECT fills the
+message's target students and one per channel creates a MessageDelivery row
+for every parent with a contact on that channel, so a whole-school broadcast
+never loads students into Python. Pending deliveries are then dispatched in
+chunks to the channel backends, each rate limited, and every delivery keeps
+its own status.
+
+Channel backends are configured with MESSAGE_CHANNEL_BACKENDS, a mapping of
+channel name to dotted class path. A backend has open() and close(), called
+around each chunk, and send(message, delivery), which raises on failure.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import groupby
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import DateTimeField, Exists, F, OuterRef, Value
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from institutions.cache import invalidate_institution
+from institutions.models import (
+    MessageDelivery,
+    ParentGuardian,
+    PrincipalMessage,
+    Student,
+    StudentFeeAssignment,
+)
+
+logger = logging.getLogger(__name__)
+
+TARGET_TYPES = ("all", "overdue", "specific")
+
+# Pending deliveries claimed and sent per chunk
+DELIVERY_CHUNK_SIZE = 500
+
+# Deliveries left in "sending" this long (a worker died mid-chunk) are sent again
+SENDING_STALE_AFTER = timedelta(minutes=30)
+
+DEFAULT_CHANNEL_BACKENDS = {
+    "email": "institutions.services.messaging.EmailChannel",
+    "sms": "institutions.services.messaging.LoggingSmsChannel",
+}
+
+# Messages per second and channel; None disables the limit
+DEFAULT_RATE_LIMITS = {
+    "email": 20,
+    "sms": 5,
+}
+
+# Contact field of ParentGuardian used by each channel
+CHANNEL_CONTACT_FIELDS = {
+    "email": "email",
+    "sms": "phone_number",
+}
+
+
+@dataclass
+class RecipientResult:
+    """Rows created when resolving a message's recipients."""
+
+    students: int = 0
+    deliveries: int = 0
+
+
+@dataclass
+class DispatchResult:
+    """Outcome of one dispatch run over a message's pending deliveries."""
+
+    sent: int = 0
+    failed: int = 0
+    remaining: int = 0
+    seconds: float = 0.0
+
+
+class EmailChannel:
+    """Sends each delivery as an email, over one SMTP connection per chunk."""
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def send(self, message, delivery):
+        EmailMessage(
+            subject=message.subject,
+            body=f"{message.content}\n\n{message.institution.institution_name}",
+            to=[delivery.recipient],
+            connection=self.connection,
+        ).send()
+
+
+class LoggingSmsChannel:
+    """SMS stand-in that logs each message until an SMS gateway is configured."""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, message, delivery):
+        logger.info("SMS to %s: %s: %s", delivery.recipient, message.institution.institution_name, message.subject)
+
+
+class RateLimiter:
+    """Spaces calls to wait() so they never exceed `rate` per second."""
+
+    def __init__(self, rate: Optional[float], clock: Callable = time.monotonic, sleep: Callable = time.sleep):
+        self.interval = 1 / rate if rate else 0
+        self.clock = clock
+        self.sleep = sleep
+        self.next_at = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = self.clock()
+        if self.next_at is not None and now < self.next_at:
+            self.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def get_channel(name: str):
+    """Instantiate the configured backend of a channel."""
+    backends = getattr(settings, "MESSAGE_CHANNEL_BACKENDS", DEFAULT_CHANNEL_BACKENDS)
+    return import_string(backends[name])()
+
+
+def _insert_select(model, columns: dict, queryset) -> int:
+    """
+    INSERT the rows selected by a queryset into another table.
+
+    Args:
+        model: Model whose table receives the rows
+        columns: Field name of `model` -> expression evaluated on `queryset`
+        queryset: Rows to select from
+
+    Returns:
+        Number of rows inserted
+    """
+    aliases = {f"insert_{i}": expression for i, expression in enumerate(columns.values())}
+    select = queryset.order_by().annotate(**aliases).values_list(*aliases)
+    sql, params = select.query.sql_with_params()
+    quote = connection.ops.quote_name
+    target = ", ".join(quote(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(model._meta.db_table)} ({target}) {sql}", params)
+        return cursor.rowcount
+
+
+def target_students(message: PrincipalMessage, target_type: str, student_ids: Iterable = ()):
+    """Active students of the message's institution selected by a target type."""
+    students = Student.objects.filter(institution_id=message.institution_id, is_active=True)
+    if target_type == "overdue":
+        students = students.filter(Exists(StudentFeeAssignment.objects.filter(
+            institution_id=message.institution_id, student=OuterRef("pk"), is_overdue=True
+        )))
+    elif target_type == "specific":
+        students = students.filter(pk__in=list(student_ids))
+    elif target_type != "all":
+        raise ValueError(f"Unknown target type: {target_type}")
+    return students
+
+
+def resolve_recipients(
+    message: PrincipalMessage,
+    target_type: str = "all",
+    student_ids: Iterable = (),
+    channels: Iterable = ("email",),
+) -> RecipientResult:
+    """
+    Record the target students and create a pending delivery per parent and channel.
+
+    Students and parents already attached to the message are skipped, so a
+    retried job never duplicates recipients.
+
+    Args:
+        message: Message to deliver
+        target_type: "all", "overdue" or "specific"
+        student_ids: Student IDs for the "specific" target type
+        channels: Channels to deliver on (see CHANNEL_CONTACT_FIELDS)
+
+    Returns:
+        RecipientResult with the students and deliveries added
+    """
+    students = target_students(message, target_type, student_ids)
+    now = Value(timezone.now(), output_field=DateTimeField())
+    Through = PrincipalMessage.target_students.through
+    result = RecipientResult()
+
+    with transaction.atomic():
+        result.students = _insert_select(
+            Through,
+            {"principalmessage": Value(message.pk), "student": F("pk")},
+            students.exclude(Exists(Through.objects.filter(principalmessage=message.pk, student=OuterRef("pk")))),
+        )
+        for channel in channels:
+            contact = CHANNEL_CONTACT_FIELDS[channel]
+            parents = ParentGuardian.objects.filter(student__in=students).exclude(**{contact: ""}).exclude(
+                Exists(MessageDelivery.objects.filter(message=message.pk, parent=OuterRef("pk"), channel=channel))
+            )
+            result.deliveries += _insert_select(MessageDelivery, {
+                "message": Value(message.pk),
+                "student": F("student_id"),
+                "parent": F("pk"),
+                "channel": Value(channel),
+                "recipient": F(contact),
+                "status": Value("pending"),
+                "attempts": Value(0),
+                "error": Value(""),
+                "created_at": now,
+                "updated_at": now,
+            }, parents)
+
+    # Raw inserts send no m2m_changed signal
+    invalidate_institution(message.institution_id)
+    return result
+
+
+def _claim_chunk(message: PrincipalMessage, chunk_size: int) -> list:
+    """Mark up to chunk_size pending deliveries of a message as sending and return them."""
+    now = timezone.now()
+    pending = MessageDelivery.objects.filter(message=message, status="pending").order_by("pk")
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        ids = list(pending.values_list("pk", flat=True)[:chunk_size])
+        # Compare-and-swap so backends without row locks (SQLite) never double-claim
+        MessageDelivery.objects.filter(pk__in=ids, status="pending").update(status="sending", updated_at=now)
+    return list(MessageDelivery.objects.filter(pk__in=ids, status="sending", updated_at=now).order_by("pk"))
+
+
+def dispatch_deliveries(
+    message: PrincipalMessage,
+    max_seconds: Optional[float] = None,
+    chunk_size: int = DELIVERY_CHUNK_SIZE,
+    progress: Optional[Callable] = None,
+) -> DispatchResult:
+    """
+    Send a message's pending deliveries, chunk by chunk.
+
+    Each chunk is claimed (marked sending) before any of it is handed to a
+    channel, so concurrent dispatchers of the same message never send a
+    delivery twice. Each delivery is marked sent or failed (with the error)
+    as soon as its chunk is done, so an interrupted run resumes where it
+    stopped; deliveries a dead worker left in sending are retried after
+    SENDING_STALE_AFTER.
+
+    Args:
+        message: Message whose deliveries to send
+        max_seconds: Stop after this long and leave the rest pending
+            (callers requeue); None sends everything
+        chunk_size: Deliveries loaded and sent per chunk
+        progress: Optional callable(sent + failed) after each chunk
+
+    Returns:
+        DispatchResult with the sent, failed and still pending counts
+    """
+    started = time.perf_counter()
+    rate_limits = getattr(settings, "MESSAGE_RATE_LIMITS", DEFAULT_RATE_LIMITS)
+    limiters = {}
+    backends = {}
+    result = DispatchResult()
+    MessageDelivery.objects.filter(
+        message=message, status="sending", updated_at__lt=timezone.now() - SENDING_STALE_AFTER
+    ).update(status="pending", updated_at=timezone.now())
+
+    def out_of_time():
+        return max_seconds is not None and time.perf_counter() - started >= max_seconds
+
+    while not out_of_time():
+        chunk = _claim_chunk(message, chunk_size)
+        if not chunk:
+            break
+
+        sent, failed = [], []
+        for channel, deliveries in groupby(sorted(chunk, key=lambda d: d.channel), key=lambda d: d.channel):
+            if channel not in backends:
+                backends[channel] = get_channel(channel)
+                limiters[channel] = RateLimiter(rate_limits.get(channel))
+            backend = backends[channel]
+            backend.open()
+            try:
+                for delivery in deliveries:
+                    if out_of_time():
+                        break
+                    limiters[channel].wait()
+                    try:
+                        backend.send(message, delivery)
+                    except Exception as e:
+                        logger.warning("Delivery %s to %s failed: %s", delivery.pk, delivery.recipient, e)
+                        delivery.status = "failed"
+                        delivery.error = str(e)
+                        delivery.attempts += 1
+                        delivery.updated_at = timezone.now()
+                        failed.append(delivery)
+                    else:
+                        sent.append(delivery.pk)
+            finally:
+                backend.close()
+
+        # Successes share one UPDATE; failures are rare and carry their own error
+        now = timezone.now()
+        MessageDelivery.objects.filter(pk__in=sent).update(
+            status="sent", sent_at=now, attempts=F("attempts") + 1, updated_at=now
+        )
+        MessageDelivery.objects.bulk_update(failed, ["status", "error", "attempts", "updated_at"])
+        # Claimed but not reached before time ran out
+        done = set(sent) | {delivery.pk for delivery in failed}
+        unsent = [delivery.pk for delivery in chunk if delivery.pk not in done]
+        if unsent:
+            MessageDelivery.objects.filter(pk__in=unsent, status="sending").update(status="pending", updated_at=now)
+        result.sent += len(sent)
+        result.failed += len(failed)
+        if progress:
+            progress(result.sent + result.failed)
+
+    result.remaining = MessageDelivery.objects.filter(message=message, status="pending").count()
+    result.seconds = time.perf_counter() - started
+    return result
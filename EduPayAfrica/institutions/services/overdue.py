@@ -0,0 +1,124 @@
+"""
+Overdue Sweep
+Set-based maintenance of StudentFeeAssignment.is_overdue.
+
+An assignment is overdue when its due date has passed and it still carries an
+outstanding balance. Instead of saving rows one by one, each institution is
+swept with two UPDATE statements: one flags newly overdue rows, the other
+clears rows that have since been paid (or whose due date moved out).
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from institutions.cache import invalidate_institution
+from institutions.models import InstitutionAuditLog, InstitutionProfile, StudentFeeAssignment
+
+
+@dataclass
+class InstitutionSweep:
+    """Rows changed for one institution."""
+
+    institution: InstitutionProfile
+    marked: int = 0
+    cleared: int = 0
+    seconds: float = 0.0
+
+    @property
+    def changed(self) -> int:
+        return self.marked + self.cleared
+
+
+@dataclass
+class OverdueSweepResult:
+    """Outcome of a sweep across one or more institutions."""
+
+    today: date
+    institutions: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def marked(self) -> int:
+        return sum(sweep.marked for sweep in self.institutions)
+
+    @property
+    def cleared(self) -> int:
+        return sum(sweep.cleared for sweep in self.institutions)
+
+
+def sweep_institution(institution: InstitutionProfile, today: Optional[date] = None) -> InstitutionSweep:
+    """
+    Bring is_overdue up to date for one institution.
+
+    Both UPDATEs also bump updated_at so incremental fee snapshot refreshes
+    pick up the change. A summary audit log entry is written only when rows
+    actually changed.
+
+    Args:
+        institution: Institution to sweep
+        today: Reference date (defaults to the current local date)
+
+    Returns:
+        InstitutionSweep with the number of rows marked and cleared
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    started = time.perf_counter()
+    assignments = StudentFeeAssignment.objects.filter(institution=institution)
+
+    with transaction.atomic():
+        marked = assignments.filter(
+            is_overdue=False, due_date__lt=today, outstanding_balance__gt=0
+        ).update(is_overdue=True, updated_at=now)
+
+        cleared = assignments.filter(is_overdue=True).filter(
+            Q(outstanding_balance__lte=0) | Q(due_date__isnull=True) | Q(due_date__gte=today)
+        ).update(is_overdue=False, updated_at=now)
+
+        if marked or cleared:
+            invalidate_institution(institution.pk)
+            InstitutionAuditLog.objects.create(
+                institution=institution,
+                action="overdue_sweep",
+                entity_type="StudentFeeAssignment",
+                description=f"Overdue sweep: {marked} marked overdue, {cleared} cleared",
+                changes={"marked": marked, "cleared": cleared, "as_of": today.isoformat()},
+            )
+
+    return InstitutionSweep(
+        institution=institution,
+        marked=marked,
+        cleared=cleared,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def sweep_overdue(institution: Optional[InstitutionProfile] = None, today: Optional[date] = None) -> OverdueSweepResult:
+    """
+    Sweep every active institution (or just one) for overdue fee assignments.
+
+    Args:
+        institution: Limit the sweep to one institution
+        today: Reference date (defaults to the current local date)
+
+    Returns:
+        OverdueSweepResult with per-institution counts and timings
+    """
+    today = today or timezone.localdate()
+    started = time.perf_counter()
+
+    institutions = InstitutionProfile.objects.filter(is_active=True).order_by("pk")
+    if institution is not None:
+        institutions = institutions.filter(pk=institution.pk)
+
+    result = OverdueSweepResult(today=today)
+    for profile in institutions:
+        result.institutions.append(sweep_institution(profile, today=today))
+    result.seconds = time.perf_counter() - started
+    return result
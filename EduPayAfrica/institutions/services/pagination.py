@@ -0,0 +1,94 @@
+"""
+Keyset Pagination
+Cursor-based paging for large listings.
+
+Pages are selected with `WHERE (sort_key, pk) > (last_sort_key, last_pk)`
+instead of OFFSET, so page 200 costs the same index range scan as page 1 and
+rows inserted mid-scroll never shift later pages.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass
+class KeysetPage:
+    """One page of results plus the cursor for the next page."""
+
+    items: list
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(values: list) -> str:
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[list]:
+    """Decode a cursor, returning None for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _cursor_position(model, sort_field: str, cursor: str) -> Optional[tuple]:
+    """(sort value, pk) a cursor points after, or None if it is malformed or tampered with."""
+    values = decode_cursor(cursor)
+    if not values or len(values) != 2 or None in values:
+        return None
+    try:
+        return (
+            model._meta.get_field(sort_field).to_python(values[0]),
+            model._meta.pk.to_python(values[1]),
+        )
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def keyset_paginate(queryset, sort_field: str, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> KeysetPage:
+    """
+    Return the page of `queryset` after `cursor`, ordered by (sort_field, pk).
+
+    Args:
+        queryset: Queryset to page through (its own ordering is replaced)
+        sort_field: Ascending sort column; pk breaks ties
+        cursor: Opaque cursor from a previous page, or None for the first page
+            (an invalid cursor also returns the first page)
+        page_size: Rows per page (capped at MAX_PAGE_SIZE)
+
+    Returns:
+        KeysetPage with the rows and the cursor for the next page
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    queryset = queryset.order_by(sort_field, "pk")
+
+    position = _cursor_position(queryset.model, sort_field, cursor) if cursor else None
+    if position is not None:
+        last_value, last_pk = position
+        queryset = queryset.filter(
+            Q(**{f"{sort_field}__gt": last_value}) | Q(**{sort_field: last_value, "pk__gt": last_pk})
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, sort_field), last.pk])
+    return KeysetPage(items=items, next_cursor=next_cursor)
@@ -0,0 +1,141 @@
+"""
+PDF Writer
+Minimal pure-Python writer for text-only PDF documents.
+
+Pages are laid out in the built-in Courier fonts (every PDF viewer ships
+them, so nothing is embedded) and written to the output as soon as they are
+complete; only the page offsets are kept in memory. This is all statements
+need, and it avoids a native rendering dependency on the worker.
+"""
+
+import zlib
+
+PAGE_WIDTH = 595  # A4, in points
+PAGE_HEIGHT = 842
+MARGIN = 42
+FONT_SIZE = 9
+LEADING = 12
+
+# Courier glyphs are 600/1000 em wide
+CHAR_WIDTH = FONT_SIZE * 0.6
+LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / CHAR_WIDTH)
+PAGE_LINES = int((PAGE_HEIGHT - 2 * MARGIN) / LEADING)
+
+# Lines starting with this marker are set in bold
+BOLD_PREFIX = "# "
+
+# Object numbers reserved for the document-wide objects
+_CATALOG, _PAGES, _FONT, _FONT_BOLD = 1, 2, 3, 4
+
+
+def _escape(text: str) -> bytes:
+    """Encode text as the body of a PDF string literal."""
+    data = text.encode("cp1252", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _wrap(line: str) -> list:
+    if len(line) <= LINE_CHARS:
+        return [line]
+    return [line[i:i + LINE_CHARS] for i in range(0, len(line), LINE_CHARS)]
+
+
+class PdfWriter:
+    """
+    Write a PDF document of text pages to a binary file object.
+
+    Usage:
+        writer = PdfWriter(output)
+        writer.add_text(lines)  # one or more pages
+        writer.close()
+    """
+
+    def __init__(self, output, compress: bool = True):
+        self.output = output
+        self.compress = compress
+        self.page_ids = []
+        self._offsets = {}
+        self._position = 0
+        self._next_id = _FONT_BOLD + 1
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(_FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._object(_FONT_BOLD, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>")
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_ids)
+
+    def _write(self, data: bytes):
+        self.output.write(data)
+        self._position += len(data)
+
+    def _object(self, object_id: int, body: bytes):
+        self._offsets[object_id] = self._position
+        self._write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def _allocate(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def add_text(self, lines) -> int:
+        """
+        Add the lines as one or more pages, starting on a new page.
+
+        Args:
+            lines: Text lines; a line starting with BOLD_PREFIX is set in bold,
+                and lines wider than the page are wrapped
+
+        Returns:
+            Number of pages added
+        """
+        page_lines = []
+        for line in lines:
+            bold = line.startswith(BOLD_PREFIX)
+            if bold:
+                line = line[len(BOLD_PREFIX):]
+            page_lines.extend((part, bold) for part in _wrap(line.rstrip()))
+
+        pages = [page_lines[i:i + PAGE_LINES] for i in range(0, len(page_lines), PAGE_LINES)] or [[]]
+        for page in pages:
+            self._add_page(page)
+        return len(pages)
+
+    def _add_page(self, lines):
+        ops = [b"BT", b"%d TL" % LEADING, b"%d %d Td" % (MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)]
+        bold = None
+        for text, line_bold in lines:
+            if line_bold != bold:
+                bold = line_bold
+                ops.append(b"/F%d %d Tf" % (2 if bold else 1, FONT_SIZE))
+            ops.append(b"(" + _escape(text) + b") Tj T*")
+        ops.append(b"ET")
+        content = b"\n".join(ops)
+
+        stream_id, page_id = self._allocate(), self._allocate()
+        if self.compress:
+            content = zlib.compress(content)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(content)
+        else:
+            header = b"<< /Length %d >>" % len(content)
+        self._object(stream_id, header + b"\nstream\n" + content + b"\nendstream")
+        self._object(page_id, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+        ) % (_PAGES, PAGE_WIDTH, PAGE_HEIGHT, _FONT, _FONT_BOLD, stream_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        """Write the page tree, cross-reference table and trailer."""
+        if not self.page_ids:
+            self._add_page([])
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._object(_PAGES, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.page_ids))
+        self._object(_CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES)
+
+        xref_at = self._position
+        size = self._next_id
+        entries = [b"0000000000 65535 f \n"]
+        entries.extend(b"%010d 00000 n \n" % self._offsets[object_id] for object_id in range(1, size))
+        self._write(b"xref\n0 %d\n" % size + b"".join(entries))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, _CATALOG, xref_at))
@@ -0,0 +1,219 @@
+"""
+Fee Statements
+Batch generation of student fee statements as PDF.
+
+A cohort is read in chunks of STATEMENT_CHUNK_SIZE students; each chunk costs
+three queries (students with program and year, their fee assignments, their
+parents), and the fee items of every fee structure are loaded once up front.
+The statement template is compiled once and reused for every student, and
+pages go straight to the output through the pure-Python writer in
+institutions.services.pdf, as one merged PDF or a zip of per-student PDFs.
+"""
+
+import io
+import re
+import time
+import zipfile
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Optional
+
+from django.db.models import Exists, OuterRef, Prefetch
+from django.template.loader import get_template
+from django.utils import timezone
+
+from institutions.models import (
+    AcademicYear,
+    FeeItem,
+    InstitutionProfile,
+    ParentGuardian,
+    Program,
+    Student,
+    StudentFeeAssignment,
+)
+from institutions.services.pdf import PdfWriter
+
+STATEMENT_TEMPLATE = "institutions/statements/statement.txt"
+
+# Students fetched (with their assignments and parents) per round of queries
+STATEMENT_CHUNK_SIZE = 500
+
+STATEMENT_FORMATS = ("pdf", "zip")
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+@dataclass
+class StatementBatchResult:
+    """Outcome of a batch statement run."""
+
+    statements: int = 0
+    pages: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_minute(self) -> float:
+        return self.statements * 60 / self.seconds if self.seconds else 0.0
+
+
+def statement_students(
+    institution: InstitutionProfile,
+    academic_year: Optional[AcademicYear] = None,
+    program: Optional[Program] = None,
+    include_inactive: bool = False,
+):
+    """
+    Students to print statements for, with their assignments and parents prefetched.
+
+    Args:
+        institution: Institution whose students are printed
+        academic_year: Only students billed in this year, and only that year's assignments
+        program: Only students of this program
+        include_inactive: Also print statements for inactive students
+
+    Returns:
+        Student queryset ordered by admission number
+    """
+    students = Student.objects.filter(institution=institution)
+    if not include_inactive:
+        students = students.filter(is_active=True)
+    if program is not None:
+        students = students.filter(program=program)
+
+    assignments = StudentFeeAssignment.objects.select_related("academic_year", "term", "fee_structure").order_by(
+        "academic_year__start_date", "term__term_number", "pk"
+    )
+    if academic_year is not None:
+        assignments = assignments.filter(academic_year=academic_year)
+        students = students.filter(
+            Exists(StudentFeeAssignment.objects.filter(student=OuterRef("pk"), academic_year=academic_year))
+        )
+
+    return students.select_related("program", "academic_year").prefetch_related(
+        Prefetch("fee_assignments", queryset=assignments),
+        Prefetch("parents", queryset=ParentGuardian.objects.order_by("-is_primary_contact", "full_name")),
+    ).order_by("admission_number")
+
+
+class StatementRenderer:
+    """Renders statements for one institution with a single compiled template."""
+
+    def __init__(self, institution: InstitutionProfile, statement_date: Optional[date] = None):
+        self.institution = institution
+        self.statement_date = statement_date or timezone.localdate()
+        self.template = get_template(STATEMENT_TEMPLATE)
+
+        # Shared by every student on the same fee structure, so loaded in one query.
+        # Only mandatory items make up an assignment's total_fees; optional ones
+        # are listed separately so the itemised lines add up to the total.
+        self.fee_items = defaultdict(list)
+        self.optional_items = defaultdict(list)
+        for item in FeeItem.objects.filter(fee_structure__institution=institution).order_by("fee_structure_id", "pk"):
+            items = self.fee_items if item.is_mandatory else self.optional_items
+            items[item.fee_structure_id].append(item)
+
+    def lines(self, student: Student) -> list:
+        """Statement text for a student whose assignments and parents are prefetched."""
+        assignments = student.fee_assignments.all()
+        totals = {"billed": Decimal("0"), "paid": Decimal("0"), "outstanding": Decimal("0")}
+        for assignment in assignments:
+            totals["billed"] += assignment.total_fees
+            totals["paid"] += assignment.amount_paid
+            totals["outstanding"] += assignment.outstanding_balance
+
+        text = self.template.render({
+            "institution": self.institution,
+            "student": student,
+            "statement_date": self.statement_date,
+            "parents": student.parents.all(),
+            "rows": [
+                {
+                    "assignment": assignment,
+                    "items": self.fee_items[assignment.fee_structure_id],
+                    "optional_items": self.optional_items[assignment.fee_structure_id],
+                }
+                for assignment in assignments
+            ],
+            "totals": totals,
+        })
+        return text.splitlines()
+
+
+def statement_filename(student: Student) -> str:
+    return f"statement-{_UNSAFE_FILENAME.sub('-', student.admission_number).strip('-') or student.pk}.pdf"
+
+
+def write_statements(
+    students,
+    output,
+    renderer: StatementRenderer,
+    file_format: str = "pdf",
+    progress: Optional[Callable] = None,
+    chunk_size: int = STATEMENT_CHUNK_SIZE,
+) -> StatementBatchResult:
+    """
+    Write a statement for every student to `output`.
+
+    Args:
+        students: Queryset from statement_students()
+        output: Binary file object to write to
+        renderer: StatementRenderer for the students' institution
+        file_format: "pdf" for one merged document, "zip" for one PDF per student
+        progress: Optional callable(processed, total)
+        chunk_size: Students fetched per round of queries
+
+    Returns:
+        StatementBatchResult with the statement and page counts
+    """
+    if file_format not in STATEMENT_FORMATS:
+        raise ValueError(f"Unsupported statement format: {file_format}")
+
+    started = time.perf_counter()
+    result = StatementBatchResult()
+    total = students.count() if progress else None
+
+    if file_format == "pdf":
+        writer = PdfWriter(output)
+        for student in students.iterator(chunk_size=chunk_size):
+            result.pages += writer.add_text(renderer.lines(student))
+            result.statements += 1
+            if progress:
+                progress(result.statements, total)
+        writer.close()
+    else:
+        # Page streams are already deflated, so the archive just stores them
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+            for student in students.iterator(chunk_size=chunk_size):
+                buffer = io.BytesIO()
+                writer = PdfWriter(buffer)
+                result.pages += writer.add_text(renderer.lines(student))
+                writer.close()
+                archive.writestr(statement_filename(student), buffer.getvalue())
+                result.statements += 1
+                if progress:
+                    progress(result.statements, total)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def generate_statements(
+    institution: InstitutionProfile,
+    output,
+    file_format: str = "pdf",
+    academic_year: Optional[AcademicYear] = None,
+    program: Optional[Program] = None,
+    include_inactive: bool = False,
+    progress: Optional[Callable] = None,
+) -> StatementBatchResult:
+    """
+    Write fee statements for an institution's students (optionally one year or program).
+
+    Returns:
+        StatementBatchResult with the statement and page counts
+    """
+    students = statement_students(institution, academic_year, program, include_inactive)
+    renderer = StatementRenderer(institution)
+    return write_statements(students, output, renderer, file_format, progress=progress)
@@ -0,0 +1,197 @@
+"""
+Student Import Engine
+Set-based bulk import of student rows for a single institution.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional, Sequence
+
+from django.db import IntegrityError, transaction
+
+from institutions.cache import invalidate_institution
+from institutions.models import AcademicYear, InstitutionProfile, Program, Student
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Column order expected in uploaded files (after the header row)
+STUDENT_IMPORT_COLUMNS = ("full_name", "admission_number", "email", "program_code", "year_code")
+
+
+@dataclass
+class StudentImportResult:
+    """Outcome of a bulk student import."""
+
+    rows_processed: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        return len(self.errors)
+
+
+def _clean_cell(value) -> str:
+    """Normalize a CSV/XLSX cell into a stripped string."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Excel stores admission numbers typed as digits as floats
+        value = int(value)
+    return str(value).strip()
+
+
+class StudentImporter:
+    """
+    Validate student rows in memory and write them with batched bulk_create.
+
+    Program and academic year codes for the institution are loaded once up
+    front, so each row costs no lookup queries. Rows that fail validation are
+    reported as "Row N: reason" without aborting the rest of the batch.
+    """
+
+    def __init__(self, institution: InstitutionProfile, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.institution = institution
+        self.batch_size = batch_size
+        self.programs = dict(
+            Program.objects.filter(institution=institution).order_by().values_list("program_code", "pk")
+        )
+        self.academic_years = dict(
+            AcademicYear.objects.filter(institution=institution).order_by().values_list("year_code", "pk")
+        )
+        self._seen_admission_numbers = set()
+
+    def run(
+        self,
+        rows: Iterable[tuple[int, Sequence]],
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> StudentImportResult:
+        """
+        Import rows given as (row_number, cells) pairs.
+
+        Args:
+            rows: Iterable of (row_number, cells) where cells follow STUDENT_IMPORT_COLUMNS
+            progress: Optional callback receiving the rows processed so far after each batch
+
+        Returns:
+            StudentImportResult with created count and per-row errors
+        """
+        result = StudentImportResult()
+        batch = []
+
+        for row_number, cells in rows:
+            if not cells or not any(_clean_cell(cell) for cell in cells):
+                continue
+            result.rows_processed += 1
+
+            student, error = self._build_student(cells)
+            if error:
+                result.errors.append(f"Row {row_number}: {error}")
+                continue
+
+            batch.append((row_number, student))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, result)
+                batch = []
+                if progress:
+                    progress(result.rows_processed)
+
+        if batch:
+            self._flush(batch, result)
+        if progress:
+            progress(result.rows_processed)
+
+        return result
+
+    def _build_student(self, cells: Sequence):
+        """Validate one row and return an unsaved Student or an error message."""
+        values = [_clean_cell(cell) for cell in cells[: len(STUDENT_IMPORT_COLUMNS)]]
+        if len(values) < len(STUDENT_IMPORT_COLUMNS):
+            return None, f"expected {len(STUDENT_IMPORT_COLUMNS)} columns, got {len(values)}"
+
+        full_name, admission_number, email, program_code, year_code = values
+
+        if not full_name or not admission_number:
+            return None, "full name and admission number are required"
+
+        program_id = self.programs.get(program_code)
+        if program_id is None:
+            return None, f"unknown program code '{program_code}'"
+
+        academic_year_id = self.academic_years.get(year_code)
+        if academic_year_id is None:
+            return None, f"unknown academic year '{year_code}'"
+
+        if admission_number in self._seen_admission_numbers:
+            return None, f"duplicate admission number '{admission_number}' in file"
+        self._seen_admission_numbers.add(admission_number)
+
+        student = Student(
+            institution=self.institution,
+            program_id=program_id,
+            academic_year_id=academic_year_id,
+            full_name=full_name,
+            admission_number=admission_number,
+            email=email,
+        )
+        return student, None
+
+    def _flush(self, batch: list, result: StudentImportResult):
+        """
+        Write one batch, skipping admission numbers that already exist.
+
+        If concurrent writers keep inserting overlapping rows, the batch falls
+        back to one insert per row so a single conflict only rejects its own
+        row (reported in the result errors) instead of failing the import.
+        """
+        for attempt in range(2):
+            pending, batch_errors = self._split_existing(batch)
+            try:
+                with transaction.atomic():
+                    Student.objects.bulk_create(pending)
+            except IntegrityError:
+                # Another writer inserted overlapping rows between the check and the
+                # insert; re-check once against the committed state.
+                if attempt == 0:
+                    continue
+                created = self._insert_rows(batch, result)
+            else:
+                created = len(pending)
+                result.created += created
+                result.errors.extend(batch_errors)
+            if created:
+                # bulk_create sends no post_save signals
+                invalidate_institution(self.institution.pk)
+            return
+
+    def _split_existing(self, batch: list):
+        """Students of the batch not yet in the database, and errors for the rest."""
+        existing = set(
+            Student.objects.filter(
+                institution=self.institution,
+                admission_number__in=[student.admission_number for _, student in batch],
+            ).values_list("admission_number", flat=True)
+        )
+        pending = []
+        errors = []
+        for row_number, student in batch:
+            if student.admission_number in existing:
+                errors.append(f"Row {row_number}: admission number '{student.admission_number}' already exists")
+            else:
+                pending.append(student)
+        return pending, errors
+
+    def _insert_rows(self, batch: list, result: StudentImportResult) -> int:
+        """Insert the batch row by row, recording rows that still conflict as errors."""
+        created = 0
+        for row_number, student in batch:
+            try:
+                with transaction.atomic():
+                    Student.objects.bulk_create([student])
+            except IntegrityError:
+                result.errors.append(
+                    f"Row {row_number}: admission number '{student.admission_number}' already exists"
+                )
+            else:
+                created += 1
+        result.created += created
+        return created
@@ -0,0 +1,444 @@
+"""
+Synthetic Datasets
+Deterministic, seedable institution data for load tests and benchmarks.
+
+Every institution, and every student within it, draws from its own random
+generator seeded with (seed, institution index[, student number]), so the
+same seed and `as_of` date always produce the same rows, whatever the batch
+size, and growing a dataset leaves the existing rows unchanged. Students, parents and fee assignments are generated and
+written chunk by chunk with bulk_create or, on PostgreSQL, COPY, so
+datasets of millions of rows use bounded memory.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from institutions.cache import invalidate_institution
+from institutions.models import (
+    AcademicYear,
+    Faculty,
+    FeeItem,
+    FeeStructure,
+    InstitutionProfile,
+    InstitutionStaff,
+    ParentGuardian,
+    Program,
+    Student,
+    StudentFeeAssignment,
+    Term,
+)
+
+User = get_user_model()
+
+# Students generated (and written, with their parents and assignments) per chunk
+DEFAULT_BATCH_SIZE = 5000
+
+# Password of every generated staff account
+STAFF_PASSWORD = "synthetic-pass"
+
+# Roles given a login per institution, so benchmarks can view each dashboard
+STAFF_ROLES = ("admin", "principal", "bursar", "teacher")
+
+FIRST_NAMES = [
+    "Amina", "Baraka", "Chidi", "Daudi", "Esi", "Faith", "Grace", "Hassan", "Imani", "Jabari",
+    "Kofi", "Lulu", "Mwangi", "Nia", "Otieno", "Pendo", "Rehema", "Sefu", "Tendai", "Uzoma",
+    "Wanjiru", "Yaw", "Zawadi", "Abena", "Kwame", "Achieng", "Njeri", "Kamau", "Adaeze", "Themba",
+    "John", "Mary", "Peter", "Sarah", "David", "Ruth", "James", "Esther", "Joseph", "Mercy",
+]
+
+LAST_NAMES = [
+    "Mensah", "Okafor", "Mutua", "Kariuki", "Ochieng", "Njoroge", "Banda", "Phiri", "Moyo", "Dlamini",
+    "Owusu", "Adeyemi", "Wafula", "Kiplagat", "Mwale", "Nkosi", "Abubakar", "Odhiambo", "Boateng", "Chege",
+    "Kimani", "Achebe", "Nyambura", "Otieno", "Tembo", "Mahlangu", "Asante", "Kibet", "Wanyama", "Sithole",
+]
+
+CITIES = [
+    "Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Kampala", "Arusha", "Dodoma", "Kigali", "Accra",
+    "Kumasi", "Lagos", "Abuja", "Ibadan", "Lusaka", "Harare", "Gaborone", "Windhoek", "Durban", "Addis Ababa",
+]
+
+INSTITUTION_KINDS = [
+    ("university", "University"),
+    ("college", "College"),
+    ("secondary_school", "High School"),
+]
+
+# (faculty name, code, [(program name, code, months)])
+FACULTIES = [
+    ("Faculty of Science", "SCI", [
+        ("BSc Computer Science", "BSC-CS", 48), ("BSc Mathematics", "BSC-MATH", 48),
+        ("BSc Biochemistry", "BSC-BCH", 48), ("Diploma in IT", "DIP-IT", 24),
+    ]),
+    ("Faculty of Business", "BUS", [
+        ("Bachelor of Commerce", "BCOM", 48), ("BBA Finance", "BBA-FIN", 48),
+        ("Diploma in Accounting", "DIP-ACC", 24), ("Certificate in Procurement", "CERT-PRC", 12),
+    ]),
+    ("Faculty of Education", "EDU", [
+        ("BEd Arts", "BED-ART", 48), ("BEd Science", "BED-SCI", 48), ("Diploma in ECDE", "DIP-ECDE", 24),
+    ]),
+    ("Faculty of Engineering", "ENG", [
+        ("BSc Civil Engineering", "BSC-CIV", 60), ("BSc Electrical Engineering", "BSC-EEE", 60),
+        ("Diploma in Mechanical Engineering", "DIP-MEC", 36),
+    ]),
+    ("Faculty of Health Sciences", "HSC", [
+        ("BSc Nursing", "BSC-NUR", 48), ("Diploma in Clinical Medicine", "DIP-CLM", 36),
+        ("Certificate in Community Health", "CERT-CH", 12),
+    ]),
+    ("Faculty of Arts and Social Sciences", "ASS", [
+        ("BA Economics", "BA-ECON", 48), ("BA Journalism", "BA-JRN", 48), ("BA Sociology", "BA-SOC", 48),
+    ]),
+]
+
+# (name, fee type, share of tuition, mandatory)
+FEE_ITEMS = [
+    ("Tuition", "tuition", Decimal("1"), True),
+    ("Accommodation", "accommodation", Decimal("0.35"), False),
+    ("Library", "library", Decimal("0.03"), True),
+    ("Laboratory", "lab_fees", Decimal("0.06"), True),
+    ("Student Activities", "activity", Decimal("0.02"), True),
+    ("ICT Levy", "technology", Decimal("0.025"), True),
+]
+
+CENT = Decimal("0.01")
+
+
+@dataclass
+class SyntheticDataset:
+    """Rows created by generate_dataset, per model."""
+
+    institutions: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def add(self, model, count: int):
+        name = model._meta.object_name
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.counts.values())
+
+
+def synthetic_username(prefix: str, index: int, role: str) -> str:
+    return f"{prefix}-{index}-{role}@synthetic.edupay.test"
+
+
+def _money(value) -> Decimal:
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _use_copy(use_copy: Optional[bool]) -> bool:
+    if use_copy is None:
+        return connection.vendor == "postgresql"
+    if use_copy and connection.vendor != "postgresql":
+        raise ValueError("COPY is only available on PostgreSQL")
+    return use_copy
+
+
+def _copy_rows(model, objs):
+    """Write objects with COPY ... FROM STDIN (PostgreSQL + psycopg 3); primary keys are not returned."""
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key and not f.generated]
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for obj in objs:
+                copy.write_row([f.get_db_prep_save(f.pre_save(obj, True), connection) for f in fields])
+
+
+class _Writer:
+    """Inserts generated rows with bulk_create or COPY and counts them."""
+
+    def __init__(self, dataset: SyntheticDataset, batch_size: int, use_copy: bool):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+
+    def write(self, model, objs, need_pks: bool = False):
+        objs = list(objs)
+        if self.use_copy and not need_pks:
+            _copy_rows(model, objs)
+        else:
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.dataset.add(model, len(objs))
+        return objs
+
+
+class _InstitutionGenerator:
+    """Builds one institution; all randomness comes from its own seeded generator."""
+
+    def __init__(self, seed: int, index: int, prefix: str, as_of: date, years: int, terms: int, password: str):
+        self.password = password
+        self.seed = seed
+        self.rng = random.Random(f"{seed}:{index}")
+        self.index = index
+        self.prefix = prefix
+        self.as_of = as_of
+        self.years = years
+        self.terms = terms
+
+    def build_structure(self, writer: _Writer):
+        """Owner and staff accounts, faculties, programs, years, terms and fee structures."""
+        rng = self.rng
+        kind, label = rng.choice(INSTITUTION_KINDS)
+        city = CITIES[self.index % len(CITIES)]
+        suffix = f" {self.index // len(CITIES) + 1}" if self.index >= len(CITIES) else ""
+
+        users = {
+            role: User(
+                username=synthetic_username(self.prefix, self.index, role),
+                email=synthetic_username(self.prefix, self.index, role),
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+            )
+            for role in STAFF_ROLES
+        }
+        for user in users.values():
+            user.password = self.password
+        writer.write(User, users.values(), need_pks=True)
+
+        self.institution = InstitutionProfile.objects.create(
+            user=users["admin"],
+            institution_name=f"{city} {label}{suffix}",
+            institution_type=kind,
+            contact_email=users["admin"].email,
+            phone_number=f"+2547{rng.randrange(10_000_000, 99_999_999)}",
+            address=f"P.O. Box {rng.randrange(100, 99999)}, {city}",
+        )
+        writer.dataset.add(InstitutionProfile, 1)
+        writer.write(InstitutionStaff, [
+            InstitutionStaff(
+                institution=self.institution,
+                user=user,
+                full_name=f"{user.first_name} {user.last_name}",
+                role=role,
+                email=user.email,
+            )
+            for role, user in users.items()
+        ])
+
+        faculties = rng.sample(FACULTIES, rng.randint(3, len(FACULTIES)))
+        faculty_rows = writer.write(Faculty, [
+            Faculty(institution=self.institution, name=name, code=code) for name, code, _ in faculties
+        ], need_pks=True)
+        programs = []
+        for faculty, (_, _, templates) in zip(faculty_rows, faculties):
+            for name, code, months in rng.sample(templates, rng.randint(2, len(templates))):
+                programs.append(Program(
+                    institution=self.institution,
+                    faculty=faculty,
+                    program_name=name,
+                    program_code=code,
+                    program_type=rng.choice(Program.PROGRAM_TYPE_CHOICES)[0],
+                    duration_months=months,
+                ))
+        self.programs = writer.write(Program, programs, need_pks=True)
+
+        # Academic years run September to July; the last one contains as_of
+        last_start = self.as_of.year if self.as_of.month >= 9 else self.as_of.year - 1
+        years = [
+            AcademicYear(
+                institution=self.institution,
+                year_code=f"{start}/{start + 1}",
+                start_date=date(start, 9, 1),
+                end_date=date(start + 1, 7, 31),
+                is_active=start == last_start,
+            )
+            for start in range(last_start - self.years + 1, last_start + 1)
+        ]
+        self.academic_years = writer.write(AcademicYear, years, need_pks=True)
+
+        term_length = 334 // self.terms
+        self.terms_by_year = {}
+        terms = []
+        for year in self.academic_years:
+            for number in range(1, self.terms + 1):
+                start = year.start_date + timedelta(days=term_length * (number - 1))
+                terms.append(Term(
+                    academic_year=year,
+                    term_number=number,
+                    term_name=f"Term {number}",
+                    start_date=start,
+                    end_date=start + timedelta(days=term_length - 1),
+                ))
+        for term in writer.write(Term, terms, need_pks=True):
+            self.terms_by_year.setdefault(term.academic_year_id, []).append(term)
+
+        # One fee structure per academic year, tuition rising a little each year
+        tuition = Decimal(rng.randrange(30_000, 150_000, 500))
+        structures = writer.write(FeeStructure, [
+            FeeStructure(institution=self.institution, version=version, is_active=version == self.years)
+            for version in range(1, self.years + 1)
+        ], need_pks=True)
+        self.structure_by_year = {}
+        items = []
+        for year, structure in zip(self.academic_years, structures):
+            year_tuition = tuition * Decimal("1.05") ** (structure.version - 1)
+            per_term = Decimal("0")
+            for name, fee_type, share, mandatory in FEE_ITEMS:
+                amount = _money(year_tuition * share)
+                items.append(FeeItem(
+                    fee_structure=structure, name=name, fee_type=fee_type, amount=amount, is_mandatory=mandatory
+                ))
+                if mandatory:
+                    per_term += amount
+            self.structure_by_year[year.pk] = (structure, _money(per_term / self.terms))
+        writer.write(FeeItem, items)
+
+    def student_rows(self, first: int, count: int) -> tuple:
+        """
+        Students first..first+count, each with its own generator, which then
+        also draws the student's parents and assignments; the rows therefore
+        do not depend on how students are chunked.
+        """
+        students, rngs = [], []
+        for n in range(first, first + count):
+            rng = random.Random(f"{self.seed}:{self.index}:{n}")
+            rngs.append(rng)
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            program = self.programs[n % len(self.programs)]
+            intake = rng.choice(self.academic_years)
+            slug = f"{first_name}.{last_name}.{n}".lower()
+            students.append(Student(
+                institution=self.institution,
+                program=program,
+                academic_year=intake,
+                full_name=f"{first_name} {rng.choice(FIRST_NAMES)} {last_name}",
+                admission_number=f"{program.program_code}/{intake.start_date.year}/{n:06d}",
+                email=f"{slug}@students.edupay.test" if rng.random() < 0.7 else "",
+                phone_number=f"+2547{rng.randrange(10_000_000, 99_999_999)}",
+                gender=rng.choice(("M", "F")),
+                date_of_birth=date(intake.start_date.year - rng.randint(14, 24), rng.randint(1, 12), rng.randint(1, 28)),
+                is_active=rng.random() < 0.97,
+            ))
+        return students, rngs
+
+    def parent_rows(self, students, rngs) -> list:
+        parents = []
+        for student, rng in zip(students, rngs):
+            last_name = student.full_name.rsplit(" ", 1)[-1]
+            for position in range(1 if rng.random() < 0.6 else 2):
+                parents.append(ParentGuardian(
+                    student=student,
+                    full_name=f"{rng.choice(FIRST_NAMES)} {last_name}",
+                    relationship=rng.choice(("parent", "parent", "parent", "guardian", "uncle_aunt", "grandparent")),
+                    email=f"parent.{student.admission_number.lower().replace('/', '.')}.{position}@families.edupay.test"
+                    if rng.random() < 0.5 else "",
+                    phone_number=f"+2547{rng.randrange(10_000_000, 99_999_999)}",
+                    is_primary_contact=position == 0,
+                ))
+        return parents
+
+    def assignment_rows(self, students, rngs) -> list:
+        """One assignment per term of every year from the student's intake onwards."""
+        assignments = []
+        for student, rng in zip(students, rngs):
+            for year in self.academic_years:
+                if year.start_date < student.academic_year.start_date:
+                    continue
+                structure, per_term = self.structure_by_year[year.pk]
+                for term in self.terms_by_year[year.pk]:
+                    due_date = term.start_date + timedelta(days=30)
+                    if term.start_date > self.as_of:
+                        paid = Decimal("0")
+                    else:
+                        roll = rng.random()
+                        if roll < 0.5:
+                            paid = per_term
+                        elif roll < 0.8:
+                            paid = _money(per_term * Decimal(rng.randint(10, 90)) / 100)
+                        else:
+                            paid = Decimal("0")
+                    discount = _money(per_term * Decimal("0.1")) if rng.random() < 0.05 else Decimal("0")
+                    paid = min(paid, per_term - discount)
+                    assignments.append(StudentFeeAssignment(
+                        institution=self.institution,
+                        student=student,
+                        fee_structure=structure,
+                        academic_year=year,
+                        term=term,
+                        total_fees=per_term,
+                        discount_amount=discount,
+                        amount_paid=paid,
+                        due_date=due_date,
+                        is_overdue=due_date < self.as_of and paid < per_term - discount,
+                    ))
+        return assignments
+
+
+def generate_dataset(
+    institutions: int = 1,
+    students: int = 1000,
+    seed: int = 0,
+    years: int = 2,
+    terms: int = 3,
+    prefix: str = "synthetic",
+    as_of: Optional[date] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    use_copy: Optional[bool] = None,
+    progress: Optional[Callable] = None,
+) -> SyntheticDataset:
+    """
+    Generate institutions with faculties, programs, years, terms, fee structures,
+    staff logins, students, parents and fee assignments.
+
+    Args:
+        institutions: Number of institutions
+        students: Students per institution
+        seed: Seed; the same arguments always generate the same rows
+        years: Academic years per institution, the last one active
+        terms: Terms per academic year (at most 3)
+        prefix: Prefix of generated usernames, so datasets can coexist
+        as_of: Reference date for the calendar, payments and overdue flags (defaults to today)
+        batch_size: Students generated and written per chunk
+        use_copy: Write parents and fee assignments, the bulk of the rows, with COPY
+            (defaults to True on PostgreSQL; students need their keys back and use bulk_create)
+        progress: Optional callable(institution_index, students_written)
+
+    Returns:
+        SyntheticDataset with the institutions created and per-model row counts
+
+    Raises:
+        ValueError: If users with this prefix already exist
+    """
+    if not 1 <= terms <= 3:
+        raise ValueError("An academic year has between 1 and 3 terms")
+    if User.objects.filter(username__startswith=f"{prefix}-", username__endswith="@synthetic.edupay.test").exists():
+        raise ValueError(f"A synthetic dataset with prefix {prefix!r} already exists")
+
+    started = time.perf_counter()
+    as_of = as_of or timezone.localdate()
+    dataset = SyntheticDataset()
+    writer = _Writer(dataset, batch_size, _use_copy(use_copy))
+    # Hashing is deliberately slow; every staff login shares one hash
+    password = make_password(STAFF_PASSWORD)
+
+    for index in range(institutions):
+        generator = _InstitutionGenerator(seed, index, prefix, as_of, years, terms, password)
+        with transaction.atomic():
+            generator.build_structure(writer)
+
+        for first in range(0, students, batch_size):
+            with transaction.atomic():
+                student_rows, rngs = generator.student_rows(first, min(batch_size, students - first))
+                writer.write(Student, student_rows, need_pks=True)
+                writer.write(ParentGuardian, generator.parent_rows(student_rows, rngs))
+                writer.write(StudentFeeAssignment, generator.assignment_rows(student_rows, rngs))
+            if progress:
+                progress(index, first + len(student_rows))
+
+        # Nothing above sent signals
+        invalidate_institution(generator.institution.pk)
+        dataset.institutions.append(generator.institution)
+
+    dataset.seconds = time.perf_counter() - started
+    return dataset
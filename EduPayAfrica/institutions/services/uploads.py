@@ -0,0 +1,139 @@
+"""
+Upload Parsing
+Streaming row readers for CSV/XLSX uploads with encoding and BOM sniffing.
+
+Django spools uploads above FILE_UPLOAD_MAX_MEMORY_SIZE to a temporary file;
+the readers below decode that file incrementally so memory use stays flat
+no matter how large the registrar's export is.
+"""
+
+import codecs
+import csv
+import io
+from typing import Iterator, Sequence
+
+import openpyxl
+
+# Bytes inspected to detect the encoding and CSV dialect
+SNIFF_SIZE = 64 * 1024
+
+# Checked longest-first so UTF-32 LE is not mistaken for UTF-16 LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+CP1252_FALLBACK = "cp1252_fallback"
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    """Decode bytes that are not valid UTF-8 as Windows-1252 instead of failing."""
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    return error.object[error.start:error.end].decode("cp1252", errors="replace"), error.end
+
+
+codecs.register_error(CP1252_FALLBACK, _cp1252_fallback)
+
+
+def sniff_encoding(sample: bytes) -> tuple[str, str]:
+    """
+    Guess the text encoding of an upload from its first bytes.
+
+    Args:
+        sample: Leading bytes of the file
+
+    Returns:
+        (encoding, errors) pair suitable for io.TextIOWrapper
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, "strict"
+
+    # UTF-16 without a BOM: ASCII text leaves every other byte NUL
+    if len(sample) >= 4:
+        even_nuls = sample[0::2].count(0)
+        odd_nuls = sample[1::2].count(0)
+        half = len(sample) // 2
+        if odd_nuls > half * 0.4 and even_nuls < half * 0.1:
+            return "utf-16-le", "strict"
+        if even_nuls > half * 0.4 and odd_nuls < half * 0.1:
+            return "utf-16-be", "strict"
+
+    try:
+        # final=False tolerates a multibyte character cut off by the sample boundary
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return "cp1252", "replace"
+
+    # Valid so far; later non-UTF-8 bytes (typical cp1252 exports) are decoded as cp1252
+    return "utf-8", CP1252_FALLBACK
+
+
+def _sniff_dialect(text_sample: str):
+    """Detect comma, semicolon or tab delimited exports, defaulting to Excel CSV."""
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=",;\t")
+    except csv.Error:
+        return csv.excel
+
+
+def iter_csv_rows(uploaded_file, skip_header: bool = True) -> Iterator[tuple[int, list]]:
+    """
+    Stream (row_number, cells) pairs from a CSV upload.
+
+    Args:
+        uploaded_file: Django UploadedFile (in-memory or spooled to disk)
+        skip_header: Whether the first row is a header
+
+    Yields:
+        (row_number, cells) with 1-based row numbers as shown in a spreadsheet
+    """
+    raw = getattr(uploaded_file, "file", uploaded_file)
+    raw.seek(0)
+    sample = raw.read(SNIFF_SIZE)
+    raw.seek(0)
+
+    encoding, errors = sniff_encoding(sample)
+    text = io.TextIOWrapper(raw, encoding=encoding, errors=errors, newline="")
+    try:
+        dialect = _sniff_dialect(text.read(SNIFF_SIZE // 4))
+        text.seek(0)
+
+        reader = csv.reader(text, dialect)
+        start = 1
+        if skip_header:
+            next(reader, None)
+            start = 2
+        for row_number, row in enumerate(reader, start):
+            yield row_number, row
+    finally:
+        # Leave the upload open for Django to clean up
+        text.detach()
+
+
+def iter_xlsx_rows(uploaded_file, skip_header: bool = True) -> Iterator[tuple[int, Sequence]]:
+    """
+    Stream (row_number, cells) pairs from the active sheet of an XLSX upload.
+
+    Uses openpyxl read-only mode, which parses the sheet XML lazily instead
+    of building the whole workbook in memory.
+    """
+    wb = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        start = 2 if skip_header else 1
+        for row_number, row in enumerate(ws.iter_rows(min_row=start, values_only=True), start):
+            yield row_number, row
+    finally:
+        wb.close()
+
+
+def iter_upload_rows(uploaded_file, skip_header: bool = True) -> Iterator[tuple[int, Sequence]]:
+    """Stream rows from a CSV or XLSX upload, chosen by file extension."""
+    if uploaded_file.name.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(uploaded_file, skip_header)
+    return iter_csv_rows(uploaded_file, skip_header)
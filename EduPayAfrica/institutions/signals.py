@@ -0,0 +1,55 @@
+"""
+Signal handlers for the institutions app.
+Connected when the app is ready (see apps.py).
+"""
+
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from institutions.cache import invalidate_institution
+from institutions.context import bump_context_version, get_institution_context
+from institutions.models import (
+    AcademicYear,
+    FeeStructure,
+    InstitutionProfile,
+    InstitutionStaff,
+    PrincipalMessage,
+    Program,
+    Student,
+    StudentFeeAssignment,
+)
+
+
+@receiver([post_save, post_delete], sender=InstitutionStaff)
+def invalidate_institution_context(sender, instance, **kwargs):
+    """Force the affected user to re-resolve their institution and role."""
+    bump_context_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=InstitutionProfile)
+def invalidate_institution_staff_contexts(sender, instance, **kwargs):
+    """Force the owner and every staff member of the institution to re-resolve their context."""
+    bump_context_version(instance.user_id)
+    for user_id in InstitutionStaff.objects.filter(institution_id=instance.pk).values_list("user_id", flat=True):
+        bump_context_version(user_id)
+
+
+@receiver(user_logged_in)
+def prime_institution_context(sender, request, user, **kwargs):
+    """Resolve the context at login so the first institution page is already cached."""
+    if request is not None and hasattr(request, "session"):
+        get_institution_context(request, refresh=True, user=user)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=StudentFeeAssignment)
+@receiver([post_save, post_delete], sender=FeeStructure)
+@receiver([post_save, post_delete], sender=AcademicYear)
+@receiver([post_save, post_delete], sender=Program)
+@receiver([post_save, post_delete], sender=InstitutionStaff)
+@receiver([post_save, post_delete], sender=PrincipalMessage)
+@receiver(m2m_changed, sender=PrincipalMessage.target_students.through)
+def invalidate_institution_cache(sender, instance, **kwargs):
+    """Drop cached dashboards, reports and listings of the instance's institution."""
+    invalidate_institution(instance.institution_id)
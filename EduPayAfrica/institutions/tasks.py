@@ -0,0 +1,152 @@
+"""
+Background job handlers for the institutions app.
+Registered with the job queue when the app is ready (see apps.py).
+"""
+
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from institutions.models import (
+    AcademicYear,
+    InstitutionAuditLog,
+    PrincipalMessage,
+    Program,
+)
+from institutions.services.fee_analysis import refresh_fee_snapshot
+from institutions.services.jobs import enqueue_job, job_handler
+from institutions.services.messaging import dispatch_deliveries, resolve_recipients
+from institutions.services.statements import generate_statements
+from institutions.services.student_import import StudentImporter
+from institutions.services.uploads import iter_upload_rows
+
+# Errors kept on the job result for display; the full count is always reported
+MAX_REPORTED_ERRORS = 100
+
+# Longest a message delivery job sends before handing over to a follow-up job
+MESSAGE_DISPATCH_SECONDS = 60
+
+
+@job_handler("bulk_upload_students")
+def bulk_upload_students(job, progress):
+    """Import the uploaded student file attached to the job."""
+    with job.input_file.open("rb") as upload:
+        result = StudentImporter(job.institution).run(iter_upload_rows(upload), progress=progress)
+
+    InstitutionAuditLog.objects.create(
+        institution=job.institution,
+        actor=job.created_by,
+        action="bulk_upload",
+        entity_type="Student",
+        description=f"Bulk uploaded {result.created} students ({result.error_count} rows rejected)",
+    )
+
+    return {
+        "created": result.created,
+        "rows_processed": result.rows_processed,
+        "error_count": result.error_count,
+        "errors": result.errors[:MAX_REPORTED_ERRORS],
+    }
+
+
+@job_handler("send_principal_message")
+def send_principal_message(job, progress):
+    """Resolve the recipients of a principal message and start delivering it."""
+    message = PrincipalMessage.objects.select_related("institution").get(
+        pk=job.payload["message_id"], institution=job.institution
+    )
+    recipients = resolve_recipients(
+        message,
+        target_type=job.payload.get("target_type", "all"),
+        student_ids=job.payload.get("student_ids", ()),
+        channels=job.payload.get("channels", ["email"]),
+    )
+
+    InstitutionAuditLog.objects.create(
+        institution=job.institution,
+        actor=job.created_by,
+        action="message_sent",
+        entity_type="PrincipalMessage",
+        entity_id=str(message.pk),
+        description=f"Sent message to {recipients.students} students ({recipients.deliveries} deliveries)",
+    )
+
+    result = _dispatch(job, message, progress, recipients.deliveries)
+    result.update(recipients=recipients.students, deliveries=recipients.deliveries)
+    return result
+
+
+@job_handler("dispatch_message_deliveries")
+def dispatch_message_deliveries(job, progress):
+    """Continue sending a message's pending deliveries."""
+    message = PrincipalMessage.objects.select_related("institution").get(
+        pk=job.payload["message_id"], institution=job.institution
+    )
+    return _dispatch(job, message, progress)
+
+
+def _dispatch(job, message, progress, total=None):
+    """Send for at most MESSAGE_DISPATCH_SECONDS, then hand the rest to a follow-up job."""
+    result = dispatch_deliveries(
+        message,
+        max_seconds=getattr(settings, "MESSAGE_DISPATCH_SECONDS", MESSAGE_DISPATCH_SECONDS),
+        progress=lambda processed: progress(processed, total),
+    )
+    progress(result.sent + result.failed, total, force=True)
+
+    follow_up = None
+    if result.remaining:
+        follow_up = enqueue_job(
+            "dispatch_message_deliveries",
+            job.institution,
+            payload={"message_id": message.pk},
+            created_by=job.created_by,
+        ).pk
+    return {"sent": result.sent, "failed": result.failed, "remaining": result.remaining, "follow_up_job": follow_up}
+
+
+@job_handler("recompute_fee_analysis")
+def recompute_fee_analysis(job, progress):
+    """Rebuild today's fee analysis snapshot for an academic year."""
+    academic_year = AcademicYear.objects.select_related("institution").get(
+        pk=job.payload["academic_year_id"], institution=job.institution
+    )
+    snapshot = refresh_fee_snapshot(academic_year)
+    return {"snapshot_id": snapshot.pk, "snapshot_date": snapshot.snapshot_date.isoformat()}
+
+
+@job_handler("generate_fee_statements")
+def generate_fee_statements(job, progress):
+    """Write fee statements for a cohort to storage as one PDF or a zip of PDFs."""
+    file_format = job.payload.get("format", "pdf")
+    academic_year = program = None
+    if job.payload.get("academic_year_id"):
+        academic_year = AcademicYear.objects.get(pk=job.payload["academic_year_id"], institution=job.institution)
+    if job.payload.get("program_id"):
+        program = Program.objects.get(pk=job.payload["program_id"], institution=job.institution)
+
+    with tempfile.TemporaryFile() as output:
+        result = generate_statements(
+            job.institution,
+            output,
+            file_format,
+            academic_year=academic_year,
+            program=program,
+            include_inactive=job.payload.get("include_inactive", False),
+            progress=progress,
+        )
+        output.seek(0)
+        name = f"institution_statements/{job.institution.pk}/statements-{timezone.now():%Y%m%d-%H%M%S}-{job.pk}.{file_format}"
+        name = default_storage.save(name, File(output))
+
+    InstitutionAuditLog.objects.create(
+        institution=job.institution,
+        actor=job.created_by,
+        action="statements_generated",
+        entity_type="StudentFeeAssignment",
+        description=f"Generated {result.statements} fee statements ({file_format.upper()})",
+    )
+    return {"statements": result.statements, "pages": result.pages, "file": name}
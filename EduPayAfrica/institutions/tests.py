@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from EduPayAfrica.middleware import QueryBudgetExceeded
+
+from .cache import cached_for_institution, institution_cache_key
+from .checks import check_shared_context_versions, check_shared_institution_cache
+from .context import context_version
+from .management.commands.benchmark_institution_views import SCENARIOS, compare_results
+from .models import (
+    AcademicYear,
+    Faculty,
+    FeeAnalysisSnapshot,
+    FeeItem,
+    FeeStructure,
+    InstitutionAuditLog,
+    InstitutionJob,
+    InstitutionProfile,
+    InstitutionStaff,
+    MessageDelivery,
+    ParentGuardian,
+    PrincipalMessage,
+    Program,
+    Student,
+    StudentFeeAssignment,
+)
+from .services.fee_analysis import FeeStatistics, refresh_fee_snapshots
+from .services.exports import iter_export_rows
+from .services.fee_assignment import BulkFeeAssigner
+from .services.jobs import JOB_HANDLERS, claim_job, enqueue_job, execute_job, requeue_stale_jobs
+from .services.messaging import RateLimiter, dispatch_deliveries, resolve_recipients
+from .services.overdue import sweep_overdue
+from .services.pagination import encode_cursor
+from .services.statements import StatementRenderer, generate_statements, statement_students
+from .services.student_import import StudentImporter
+from .services.synthetic import generate_dataset
+from .services.uploads import iter_upload_rows
+
+User = get_user_model()
+
+
+class InstitutionTestMixin:
+    """Shared fixture: one institution with a faculty, program and active year."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="admin@school.test", email="admin@school.test", password="pass1234")
+        cls.institution = InstitutionProfile.objects.create(
+            user=cls.user,
+            institution_name="Test School",
+            institution_type="secondary_school",
+            contact_email="admin@school.test",
+        )
+        cls.faculty = Faculty.objects.create(institution=cls.institution, name="Sciences", code="SCI")
+        cls.program = Program.objects.create(
+            institution=cls.institution, faculty=cls.faculty, program_name="Science", program_code="SCI-1"
+        )
+        cls.academic_year = AcademicYear.objects.create(
+            institution=cls.institution,
+            year_code="2025/2026",
+            start_date=date(2025, 9, 1),
+            end_date=date(2026, 7, 31),
+            is_active=True,
+        )
+
+    def setUp(self):
+        super().setUp()
+        # Cached pages are keyed by institution ID, which rolled-back tests reuse
+        cache.clear()
+
+
+class StudentImporterTests(InstitutionTestMixin, TestCase):
+    def test_valid_rows_are_created_in_batches(self):
+        rows = [(i + 2, [f"Student {i}", f"ADM{i}", "", "SCI-1", "2025/2026"]) for i in range(25)]
+
+        # program/year maps, then per batch of 10: existence check + savepoint/insert/release
+        with self.assertNumQueries(2 + 3 * 4):
+            result = StudentImporter(self.institution, batch_size=10).run(rows)
+
+        self.assertEqual(result.created, 25)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Student.objects.filter(institution=self.institution).count(), 25)
+
+    def test_invalid_rows_are_reported_without_blocking_valid_ones(self):
+        Student.objects.create(
+            institution=self.institution, full_name="Existing", admission_number="ADM1", program=self.program
+        )
+        rows = [
+            (2, ["Existing Again", "ADM1", "", "SCI-1", "2025/2026"]),
+            (3, ["Bad Program", "ADM2", "", "NOPE", "2025/2026"]),
+            (4, ["Bad Year", "ADM3", "", "SCI-1", "1999/2000"]),
+            (5, ["", "ADM4", "", "SCI-1", "2025/2026"]),
+            (6, ["Valid", "ADM5", "valid@school.test", "SCI-1", "2025/2026"]),
+            (7, ["Duplicate", "ADM5", "", "SCI-1", "2025/2026"]),
+            (8, ["", "", "", "", ""]),
+        ]
+
+        result = StudentImporter(self.institution).run(rows)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.rows_processed, 6)
+        self.assertEqual(
+            sorted(error.split(":")[0] for error in result.errors),
+            ["Row 2", "Row 3", "Row 4", "Row 5", "Row 7"],
+        )
+        self.assertTrue(Student.objects.filter(admission_number="ADM5", email="valid@school.test").exists())
+
+    def test_rows_racing_a_concurrent_writer_are_rejected_one_by_one(self):
+        Student.objects.create(
+            institution=self.institution, full_name="Concurrent", admission_number="ADM1", program=self.program
+        )
+        rows = [(i + 2, [f"Student {i}", f"ADM{i}", "", "SCI-1", "2025/2026"]) for i in range(3)]
+        importer = StudentImporter(self.institution)
+
+        # The existence check keeps missing the row another writer just committed
+        with mock.patch.object(importer, "_split_existing", side_effect=lambda batch: ([s for _, s in batch], [])):
+            result = importer.run(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.errors, ["Row 3: admission number 'ADM1' already exists"])
+        self.assertEqual(Student.objects.filter(institution=self.institution).count(), 3)
+
+
+class UploadParsingTests(SimpleTestCase):
+    header = ["full_name", "admission_number", "email", "program_code", "year_code"]
+    row = ["Zoë Müller", "ADM1", "zoe@school.test", "SCI-1", "2025/2026"]
+
+    def parse(self, name, payload):
+        return list(iter_upload_rows(SimpleUploadedFile(name, payload)))
+
+    def test_utf8_with_bom(self):
+        payload = ("\ufeff" + ",".join(self.header) + "\r\n" + ",".join(self.row) + "\r\n").encode("utf-8")
+        self.assertEqual(self.parse("students.csv", payload), [(2, self.row)])
+
+    def test_excel_utf16_tab_delimited(self):
+        text = "\t".join(self.header) + "\r\n" + "\t".join(self.row) + "\r\n"
+        self.assertEqual(self.parse("students.csv", text.encode("utf-16")), [(2, self.row)])
+
+    def test_cp1252(self):
+        payload = (",".join(self.header) + "\n" + ",".join(self.row) + "\n").encode("cp1252")
+        self.assertEqual(self.parse("students.csv", payload), [(2, self.row)])
+
+    def test_quoted_multiline_field(self):
+        payload = b'name,adm\n"Line one\nLine two",ADM9\nNext,ADM10\n'
+        self.assertEqual(
+            self.parse("students.csv", payload),
+            [(2, ["Line one\nLine two", "ADM9"]), (3, ["Next", "ADM10"])],
+        )
+
+    def test_xlsx_read_only(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(self.header)
+        ws.append(self.row)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        self.assertEqual(self.parse("students.xlsx", buffer.getvalue()), [(2, tuple(self.row))])
+
+
+class InstitutionJobTests(InstitutionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_bulk_upload_job_imports_file(self):
+        upload = SimpleUploadedFile(
+            "students.csv",
+            b"full_name,admission_number,email,program_code,year_code\n"
+            b"Amina,ADM1,,SCI-1,2025/2026\nBaraka,ADM2,,NOPE,2025/2026\n",
+        )
+        job = enqueue_job("bulk_upload_students", self.institution, created_by=self.user, input_file=upload)
+
+        claimed = claim_job("test-worker")
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, "running")
+        self.assertIsNone(claim_job("other-worker"))
+
+        job = execute_job(claimed)
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.result["created"], 1)
+        self.assertEqual(job.result["error_count"], 1)
+        self.assertEqual(job.processed, 2)
+        self.assertTrue(Student.objects.filter(admission_number="ADM1").exists())
+
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        def explode(job, progress):
+            raise RuntimeError("boom")
+
+        JOB_HANDLERS["test_explode"] = explode
+        self.addCleanup(JOB_HANDLERS.pop, "test_explode")
+
+        job = enqueue_job(
+            "test_explode", self.institution, max_attempts=2, input_file=SimpleUploadedFile("input.csv", b"a\n")
+        )
+        name = job.input_file.name
+        job = execute_job(claim_job("test-worker"))
+        self.assertEqual(job.status, "queued")
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("boom", job.error)
+
+        # Not runnable until the backoff elapses
+        self.assertIsNone(claim_job("test-worker"))
+        InstitutionJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+        job = execute_job(claim_job("test-worker"))
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_late_outcome_of_a_reclaimed_job_is_discarded(self):
+        def slow(job, progress):
+            # The worker stalls past STALE_AFTER: the job is requeued and another worker claims it
+            InstitutionJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(days=1))
+            requeue_stale_jobs()
+            claim_job("other-worker")
+            return {"late": True}
+
+        JOB_HANDLERS["test_slow"] = slow
+        self.addCleanup(JOB_HANDLERS.pop, "test_slow")
+
+        job = enqueue_job("test_slow", self.institution, input_file=SimpleUploadedFile("input.csv", b"a\n"))
+        job = execute_job(claim_job("test-worker"))
+        self.assertEqual(job.status, "running")
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.locked_by, "other-worker")
+        self.assertIsNone(job.result)
+        self.assertTrue(default_storage.exists(job.input_file.name))
+
+    def test_stale_job_is_failed_once_attempts_are_used_up(self):
+        upload = SimpleUploadedFile("students.csv", b"full_name,admission_number,email,program_code,year_code\n")
+        job = enqueue_job("bulk_upload_students", self.institution, input_file=upload, max_attempts=2)
+        name = job.input_file.name
+        stale = timezone.now() - timedelta(days=1)
+
+        # The worker dies mid-run: the first reclaim requeues, the second gives up
+        claim_job("test-worker")
+        InstitutionJob.objects.filter(pk=job.pk).update(locked_at=stale)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+
+        claim_job("test-worker")
+        InstitutionJob.objects.filter(pk=job.pk).update(locked_at=stale)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("stopped responding", job.error)
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(claim_job("test-worker"))
+
+    def test_job_status_is_scoped_to_institution(self):
+        job = enqueue_job("recompute_fee_analysis", self.institution, payload={"academic_year_id": self.academic_year.pk})
+        self.client.force_login(self.user)
+
+        response = self.client.get(f"/institution/jobs/{job.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "queued")
+
+        other = User.objects.create_user(username="other@school.test", password="pass1234")
+        InstitutionProfile.objects.create(
+            user=other, institution_name="Other", institution_type="college", contact_email="o@school.test"
+        )
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f"/institution/jobs/{job.pk}/").status_code, 404)
+
+
+class FeeStatisticsTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        # (total, discount, penalty, paid, overdue): paid, partial, unpaid, paid via discount
+        for i, (total, discount, penalty, paid, overdue) in enumerate([
+            ("1000", "0", "0", "1000", False),
+            ("1000", "0", "100", "400", True),
+            ("1000", "0", "0", "0", True),
+            ("1000", "1000", "0", "0", False),
+        ]):
+            student = Student.objects.create(
+                institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM{i}",
+                program=cls.program, academic_year=cls.academic_year,
+            )
+            StudentFeeAssignment.objects.create(
+                student=student, fee_structure=cls.fee_structure, academic_year=cls.academic_year,
+                total_fees=Decimal(total), discount_amount=Decimal(discount),
+                penalty_amount=Decimal(penalty), amount_paid=Decimal(paid), is_overdue=overdue,
+            )
+
+    def test_single_query_with_exclusive_buckets(self):
+        with self.assertNumQueries(1):
+            stats = FeeStatistics.for_institution(self.institution, self.academic_year)
+
+        self.assertEqual(stats.assignment_count, 4)
+        self.assertEqual(stats.total_billed, Decimal("4000"))
+        self.assertEqual(stats.total_paid, Decimal("1400"))
+        self.assertEqual(stats.total_outstanding, Decimal("1700"))
+        self.assertEqual((stats.fully_paid, stats.partially_paid, stats.not_paid), (2, 1, 1))
+        self.assertEqual(stats.overdue, 2)
+        self.assertEqual(stats.collection_rate, Decimal("35"))
+
+    def test_selected_fields_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            stats = FeeStatistics.for_institution(self.institution, fields=("total_billed", "overdue"))
+
+        self.assertEqual((stats.total_billed, stats.overdue), (Decimal("4000"), 2))
+        self.assertEqual(stats.student_count, 0)
+        self.assertNotIn("DISTINCT", queries[0]["sql"])
+
+    def test_stored_balance_follows_update_and_bulk_update(self):
+        unpaid = StudentFeeAssignment.objects.filter(payment_status="unpaid")
+        assignment = unpaid.get()
+
+        unpaid.update(amount_paid=Decimal("250"))
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.outstanding_balance, Decimal("750"))
+        self.assertEqual(assignment.payment_status, "partial")
+
+        assignment.amount_paid = Decimal("1000")
+        StudentFeeAssignment.objects.bulk_update([assignment], ["amount_paid"])
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.outstanding_balance, Decimal("0"))
+        self.assertTrue(assignment.is_paid_in_full)
+        self.assertEqual(
+            StudentFeeAssignment.objects.filter(academic_year=self.academic_year, payment_status="paid").count(), 3
+        )
+
+    def test_fee_analysis_dashboard_reads_snapshot(self):
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar",
+            role="bursar", email="admin@school.test",
+        )
+        refresh_fee_snapshots()
+        self.client.force_login(self.user)
+
+        # session, user, active year, snapshot, trend, detail list - independent of
+        # row count; authorization comes from the session
+        with self.assertNumQueries(6):
+            response = self.client.get("/institution/fee-analysis/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context["snapshot"])
+        self.assertEqual(response.context["stats"]["not_paid"], 1)
+        self.assertEqual(len(response.context["trend"]), 1)
+
+    def test_snapshot_refresh_is_incremental(self):
+        first = refresh_fee_snapshots()
+        self.assertEqual(first.refreshed, [self.academic_year])
+        snapshot = self.institution.fee_snapshots.get()
+        self.assertEqual(snapshot.total_fees_billed, Decimal("4000"))
+        self.assertEqual(snapshot.fully_paid_count, 2)
+        self.assertEqual(snapshot.assignment_count, 4)
+
+        self.assertEqual(refresh_fee_snapshots().refreshed, [])
+
+        assignment = StudentFeeAssignment.objects.filter(amount_paid=0, discount_amount=0).get()
+        assignment.amount_paid = Decimal("1000")
+        assignment.save()
+        self.assertEqual(refresh_fee_snapshots().refreshed, [self.academic_year])
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.fully_paid_count, 3)
+
+        # Bulk writes and student activation bypass save() on the assignments
+        StudentFeeAssignment.objects.filter(pk=assignment.pk).update(amount_paid=Decimal("400"))
+        self.assertEqual(refresh_fee_snapshots().refreshed, [self.academic_year])
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.partially_paid_count, 2)
+
+        Student.objects.filter(pk=assignment.student_id).update(is_active=False)
+        self.assertEqual(refresh_fee_snapshots().refreshed, [self.academic_year])
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.total_students, 3)
+        self.assertEqual(refresh_fee_snapshots().refreshed, [])
+
+        assignment.delete()
+        self.assertEqual(refresh_fee_snapshots().refreshed, [self.academic_year])
+        self.assertEqual(self.institution.fee_snapshots.count(), 1)
+
+        # Concurrent refreshes cannot both insert today's row
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FeeAnalysisSnapshot.objects.create(institution=self.institution, academic_year=self.academic_year)
+
+
+class OverdueSweepTests(InstitutionTestMixin, TestCase):
+    def test_sweep_marks_and_clears_in_bulk(self):
+        fee_structure = FeeStructure.objects.create(institution=self.institution, version=1)
+        today = date(2026, 3, 1)
+        # (due date, paid, currently overdue) -> expected overdue
+        cases = [
+            (date(2026, 2, 1), "0", False, True),
+            (date(2026, 2, 1), "1000", True, False),
+            (date(2026, 4, 1), "0", False, False),
+            (None, "0", True, False),
+        ]
+        assignments = []
+        for i, (due_date, paid, overdue, _) in enumerate(cases):
+            student = Student.objects.create(
+                institution=self.institution, full_name=f"Student {i}", admission_number=f"ADM{i}",
+                program=self.program,
+            )
+            assignments.append(StudentFeeAssignment.objects.create(
+                student=student, fee_structure=fee_structure, academic_year=self.academic_year,
+                total_fees=Decimal("1000"), amount_paid=Decimal(paid), due_date=due_date, is_overdue=overdue,
+            ))
+
+        # institution list, then per institution: savepoint, mark, clear, audit log, release
+        with self.assertNumQueries(6):
+            result = sweep_overdue(today=today)
+
+        self.assertEqual((result.marked, result.cleared), (1, 2))
+        for assignment, (*_, expected) in zip(assignments, cases):
+            assignment.refresh_from_db()
+            self.assertEqual(assignment.is_overdue, expected)
+        log = self.institution.audit_logs.get(action="overdue_sweep")
+        self.assertEqual(log.changes["marked"], 1)
+
+        # A second sweep changes nothing and logs nothing
+        self.assertEqual(sweep_overdue(today=today).institutions[0].changed, 0)
+        self.assertEqual(self.institution.audit_logs.filter(action="overdue_sweep").count(), 1)
+
+
+class HotQueryIndexTests(InstitutionTestMixin, TestCase):
+    def test_indexes_exist(self):
+        expected = {
+            AcademicYear: "acad_year_inst_active",
+            InstitutionAuditLog: "audit_log_inst_created",
+            InstitutionStaff: "inst_staff_user_active",
+            StudentFeeAssignment: "fee_assign_inst_overdue",
+        }
+        with connection.cursor() as cursor:
+            for model, name in expected.items():
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                self.assertTrue(constraints[name]["index"], name)
+
+    def test_explain_command_reports_every_query(self):
+        out = io.StringIO()
+        call_command("explain_hot_queries", institution=self.institution.pk, stdout=out)
+        for name in ("active_year", "students", "year_assignments", "overdue_students", "audit_log", "staff_role"):
+            self.assertIn(f"{name}:", out.getvalue())
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    DUMMY = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache"}}
+
+    def test_process_local_cache_fails_with_a_separate_worker(self):
+        with override_settings(CACHES=self.LOCMEM, INSTITUTION_JOBS_EAGER=False):
+            self.assertEqual([e.id for e in check_shared_institution_cache(None)], ["institutions.E001"])
+        with override_settings(CACHES=self.LOCMEM, INSTITUTION_JOBS_EAGER=True):
+            self.assertEqual(check_shared_institution_cache(None), [])
+        with override_settings(CACHES=self.REDIS, INSTITUTION_JOBS_EAGER=False):
+            self.assertEqual(check_shared_institution_cache(None), [])
+
+    def test_context_versions_need_a_shared_cache(self):
+        for caches in (self.LOCMEM, self.DUMMY):
+            with override_settings(CACHES=caches, INSTITUTION_JOBS_EAGER=True):
+                self.assertEqual([e.id for e in check_shared_context_versions(None)], ["institutions.E002"])
+        with override_settings(CACHES=self.REDIS):
+            self.assertEqual(check_shared_context_versions(None), [])
+
+
+class InstitutionCacheTests(InstitutionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar", role="bursar", email="admin@school.test"
+        )
+        self.client.force_login(self.user)
+        self.fee_structure = FeeStructure.objects.create(institution=self.institution, version=1)
+        self.student = Student.objects.create(
+            institution=self.institution, full_name="Student", admission_number="ADM1", program=self.program
+        )
+
+    def test_dashboard_served_from_cache_until_a_write(self):
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["total_billed"], 0)
+
+        # Only the session and user are read once the dashboard is cached
+        with self.assertNumQueries(2):
+            self.client.get(reverse("institutions:dashboard"))
+
+        StudentFeeAssignment.objects.create(
+            student=self.student, fee_structure=self.fee_structure, academic_year=self.academic_year,
+            total_fees=Decimal("750"),
+        )
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["total_billed"], Decimal("750"))
+
+    def test_bulk_writes_invalidate(self):
+        FeeItem.objects.create(fee_structure=self.fee_structure, name="Tuition", fee_type="tuition", amount=Decimal("500"))
+        self.client.get(reverse("institutions:dashboard"))
+
+        BulkFeeAssigner(self.fee_structure, self.academic_year).run()
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["total_billed"], Decimal("500"))
+
+    def test_keys_are_namespaced_per_institution(self):
+        other = InstitutionProfile.objects.create(
+            user=User.objects.create_user(username="other@school.test"),
+            institution_name="Other School",
+            institution_type="secondary_school",
+            contact_email="other@school.test",
+        )
+        self.assertEqual(cached_for_institution(self.institution, "probe", lambda: "mine"), "mine")
+        self.assertEqual(cached_for_institution(other, "probe", lambda: "theirs"), "theirs")
+
+        key = institution_cache_key(self.institution.pk, "probe")
+        Program.objects.create(institution=self.institution, faculty=self.faculty, program_name="Arts", program_code="ART-1")
+        self.assertNotEqual(institution_cache_key(self.institution.pk, "probe"), key)
+
+
+class DashboardTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        cls.students = [
+            Student.objects.create(
+                institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM{i}", program=cls.program
+            )
+            for i in range(3)
+        ]
+        for student, paid, overdue in zip(cls.students, ("1000", "250", "0"), (False, True, True)):
+            StudentFeeAssignment.objects.create(
+                student=student, fee_structure=fee_structure, academic_year=cls.academic_year,
+                total_fees=Decimal("1000"), amount_paid=Decimal(paid), is_overdue=overdue,
+            )
+
+    def login_as(self, role):
+        staff = InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Staff", role=role, email="admin@school.test"
+        )
+        self.client.force_login(self.user)
+        return staff
+
+    def test_admin_figures_from_one_fee_aggregate(self):
+        self.login_as("admin")
+        # session, user, student count and active year, fee aggregate, staff list
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("institutions:dashboard"))
+
+        self.assertEqual(response.context["students_count"], 3)
+        self.assertEqual(response.context["total_fees_billed"], Decimal("3000"))
+        self.assertEqual(response.context["total_outstanding"], Decimal("1750"))
+        self.assertEqual(response.context["overdue_count"], 2)
+        self.assertEqual(response.context["active_academic_year"]["year_code"], "2025/2026")
+
+    def test_bursar_collection_rate(self):
+        self.login_as("bursar")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("institutions:dashboard"))
+        # Billed, paid and outstanding come from a single scan of the assignments
+        assignment_reads = [q["sql"] for q in queries if 'FROM "institutions_studentfeeassignment"' in q["sql"]]
+        self.assertEqual(len(assignment_reads), 1)
+        self.assertEqual(response.context["total_paid"], Decimal("1250"))
+        self.assertEqual(response.context["collection_rate"], Decimal("41.67"))
+        self.assertEqual(len(response.context["programs"]), 1)
+
+    def test_first_request_of_a_session_stays_within_budget(self):
+        self.login_as("bursar")
+        session = self.client.session
+        del session["institution_context"]
+        session.save()
+
+        # The strict test runner fails the request if the cold path overruns QUERY_BUDGETS
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("institution_context", self.client.session)
+
+    def test_principal_message_counts(self):
+        staff = self.login_as("principal")
+        message = PrincipalMessage.objects.create(
+            institution=self.institution, sent_by=staff, subject="Fees", message_type="reminder", content="Pay"
+        )
+        message.target_students.set(self.students[:2])
+
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["messages_sent"], 1)
+        self.assertEqual(response.context["staff_count"], 1)
+        self.assertEqual(response.context["recent_messages"][0].recipient_count, 2)
+
+        message.target_students.add(self.students[2])
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["recent_messages"][0].recipient_count, 3)
+
+
+class FeeAssignmentInstitutionTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        cls.students = Student.objects.bulk_create([
+            Student(institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM{i}")
+            for i in range(3)
+        ])
+
+    def assignment(self, student, **kwargs):
+        return StudentFeeAssignment(
+            fee_structure=self.fee_structure, academic_year=self.academic_year, total_fees=Decimal("100"),
+            student_id=student.pk, **kwargs
+        )
+
+    def test_save_copies_institution_from_student(self):
+        assignment = self.assignment(self.students[0])
+        assignment.save()
+        self.assertEqual(assignment.institution_id, self.institution.pk)
+
+    def test_bulk_create_fills_institutions_in_one_query(self):
+        # institution lookup, then the insert
+        with self.assertNumQueries(2):
+            StudentFeeAssignment.objects.bulk_create([self.assignment(student) for student in self.students])
+        self.assertEqual(StudentFeeAssignment.objects.filter(institution=self.institution).count(), 3)
+
+        # Nothing to look up when the caller already knows the institution
+        StudentFeeAssignment.objects.all().delete()
+        with self.assertNumQueries(1):
+            StudentFeeAssignment.objects.bulk_create([
+                self.assignment(student, institution=self.institution) for student in self.students
+            ])
+
+    def other_student(self):
+        other = InstitutionProfile.objects.create(
+            user=User.objects.create_user(username="other@school.test"),
+            institution_name="Other School",
+            institution_type="secondary_school",
+            contact_email="other@school.test",
+        )
+        return Student.objects.create(institution=other, full_name="Transfer", admission_number="T1")
+
+    def test_save_follows_a_changed_student_id(self):
+        self.assignment(self.students[0]).save()
+        other = self.other_student()
+
+        assignment = StudentFeeAssignment.objects.get()
+        assignment.student_id = other.pk
+        assignment.save()
+        self.assertEqual(StudentFeeAssignment.objects.get().institution_id, other.institution_id)
+
+    def test_update_and_bulk_update_follow_the_student(self):
+        StudentFeeAssignment.objects.bulk_create([self.assignment(student) for student in self.students[:2]])
+        other = self.other_student()
+
+        StudentFeeAssignment.objects.filter(student=self.students[0]).update(student=other.pk)
+        self.assertEqual(StudentFeeAssignment.objects.get(student=other).institution_id, other.institution_id)
+
+        assignment = StudentFeeAssignment.objects.get(student=self.students[1])
+        assignment.student_id = self.students[0].pk
+        StudentFeeAssignment.objects.bulk_update([assignment], ["student"])
+        self.assertEqual(StudentFeeAssignment.objects.get(pk=assignment.pk).institution_id, self.institution.pk)
+
+        with self.assertRaises(ValueError):
+            StudentFeeAssignment.objects.update(student=F("student_id"))
+
+    def test_moving_a_student_moves_its_assignments(self):
+        StudentFeeAssignment.objects.bulk_create([self.assignment(student) for student in self.students])
+        other = self.other_student().institution
+
+        student = Student.objects.get(pk=self.students[0].pk)
+        student.institution = other
+        student.save()
+        Student.objects.filter(pk=self.students[1].pk).update(institution=other)
+
+        moved = StudentFeeAssignment.objects.filter(institution=other)
+        self.assertEqual(set(moved.values_list("student_id", flat=True)), {self.students[0].pk, self.students[1].pk})
+        self.assertEqual(StudentFeeAssignment.objects.filter(institution=self.institution).count(), 1)
+
+
+class BulkFeeAssignerTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        FeeItem.objects.create(fee_structure=cls.fee_structure, name="Tuition", fee_type="tuition", amount=Decimal("500"))
+        FeeItem.objects.create(fee_structure=cls.fee_structure, name="Library", fee_type="library", amount=Decimal("300"))
+        FeeItem.objects.create(
+            fee_structure=cls.fee_structure, name="Trip", fee_type="activity", amount=Decimal("200"), is_mandatory=False
+        )
+        other_program = Program.objects.create(
+            institution=cls.institution, faculty=cls.faculty, program_name="Arts", program_code="ART-1"
+        )
+        Student.objects.bulk_create(
+            [
+                Student(institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM{i}", program=cls.program)
+                for i in range(25)
+            ]
+            + [
+                Student(institution=cls.institution, full_name="Arts", admission_number="ART0", program=other_program),
+                Student(
+                    institution=cls.institution, full_name="Gone", admission_number="OLD0",
+                    program=cls.program, is_active=False,
+                ),
+            ]
+        )
+
+    def assigner(self, **kwargs):
+        return BulkFeeAssigner(self.fee_structure, self.academic_year, program=self.program, batch_size=10, **kwargs)
+
+    def test_dry_run_reports_without_writing(self):
+        result = self.assigner().run(dry_run=True)
+        self.assertEqual((result.students, result.created), (25, 25))
+        self.assertEqual(result.total_billed, Decimal("20000"))
+        self.assertFalse(StudentFeeAssignment.objects.exists())
+
+    def test_cohort_is_billed_in_batches_and_upserted(self):
+        # item total, then per batch of 10: cohort ids, existing lookup, savepoint/insert/release;
+        # plus the final empty cohort page
+        with self.assertNumQueries(1 + 3 * 5 + 1):
+            result = self.assigner().run()
+        self.assertEqual(result.created, 25)
+        self.assertEqual(StudentFeeAssignment.objects.filter(total_fees=Decimal("800")).count(), 25)
+
+        paid = StudentFeeAssignment.objects.first()
+        StudentFeeAssignment.objects.filter(pk=paid.pk).update(amount_paid=Decimal("100"))
+        self.assertEqual(self.assigner().run().unchanged, 25)
+
+        FeeItem.objects.filter(name="Library").update(amount=Decimal("400"))
+        result = self.assigner(due_date=date(2026, 1, 31)).run()
+        self.assertEqual((result.created, result.updated), (0, 25))
+        paid.refresh_from_db()
+        self.assertEqual((paid.total_fees, paid.amount_paid), (Decimal("900"), Decimal("100")))
+        self.assertEqual(paid.due_date, date(2026, 1, 31))
+        self.assertEqual(StudentFeeAssignment.objects.count(), 25)
+
+    def test_concurrent_runs_bill_each_student_once_without_a_term(self):
+        self.assigner().run()
+        # The other run's rows were committed after this one looked for existing assignments
+        with mock.patch.object(BulkFeeAssigner, "_existing", return_value={}):
+            self.assigner().run()
+        self.assertEqual(StudentFeeAssignment.objects.count(), 25)
+
+        assignment = StudentFeeAssignment.objects.first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentFeeAssignment.objects.create(
+                student=assignment.student, fee_structure=self.fee_structure, academic_year=self.academic_year
+            )
+
+    def test_rejects_scope_from_another_institution(self):
+        other_user = User.objects.create_user(username="other@school.test", password="pass1234")
+        other = InstitutionProfile.objects.create(
+            user=other_user, institution_name="Other", institution_type="secondary_school", contact_email="o@x.test"
+        )
+        other_year = AcademicYear.objects.create(
+            institution=other, year_code="2025/2026", start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        with self.assertRaises(ValueError):
+            BulkFeeAssigner(self.fee_structure, other_year)
+
+    def test_preview_view(self):
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar",
+            role="bursar", email="admin@school.test",
+        )
+        self.client.force_login(self.user)
+        response = self.client.post("/institution/fee-structures/assign/", {
+            "fee_structure": self.fee_structure.pk,
+            "academic_year": self.academic_year.pk,
+            "dry_run": "1",
+        }, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["students"], 26)
+        self.assertEqual(Decimal(response.json()["total_billed"]), Decimal("20800"))
+        self.assertFalse(StudentFeeAssignment.objects.exists())
+
+        response = self.client.get("/institution/fee-structures/")
+        self.assertContains(response, "Assign Fees to Students")
+
+
+class StudentListingTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        InstitutionStaff.objects.create(
+            institution=cls.institution, user=cls.user, full_name="Admin", role="admin", email="admin@school.test"
+        )
+        # Duplicate names exercise the pk tie-breaker in the cursor
+        Student.objects.bulk_create([
+            Student(
+                institution=cls.institution, full_name=f"Student {i % 40:02d}", admission_number=f"ADM{i:03d}",
+                email=f"s{i}@school.test", program=cls.program, academic_year=cls.academic_year,
+            )
+            for i in range(120)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_json_cursor_walks_every_student_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"format": "json"}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.client.get("/institution/students/", params).json()
+            seen.extend(row["id"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len(set(seen)), 120)
+
+    def test_tampered_cursor_returns_first_page(self):
+        first = self.client.get("/institution/students/", {"format": "json"}).json()
+        for values in (["Student 05", "x"], ["Student 05", None], [["Student 05"], {"pk": 1}], "not a list"):
+            cursor = encode_cursor(values)
+            response = self.client.get("/institution/students/", {"format": "json", "cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["results"], first["results"])
+        response = self.client.get("/institution/students/", {"format": "json", "cursor": "%%%"})
+        self.assertEqual(response.json()["results"], first["results"])
+
+    def test_page_queries_do_not_grow_with_rows(self):
+        # session, user, page, count, programs, years
+        with self.assertNumQueries(6):
+            response = self.client.get("/institution/students/")
+        self.assertEqual(len(response.context["students"]), 50)
+        self.assertEqual(response.context["students_count"], 120)
+        self.assertIsNotNone(response.context["next_cursor"])
+
+    def test_search_and_filters(self):
+        data = self.client.get("/institution/students/", {"format": "json", "q": "adm11"}).json()
+        self.assertEqual(
+            sorted(row["admission_number"] for row in data["results"]),
+            ["ADM110", "ADM111", "ADM112", "ADM113", "ADM114", "ADM115", "ADM116", "ADM117", "ADM118", "ADM119"],
+        )
+        # Names match by prefix, which the PostgreSQL search indexes can serve
+        data = self.client.get("/institution/students/", {"format": "json", "q": "student 05"}).json()
+        self.assertEqual(len(data["results"]), 3)
+        data = self.client.get("/institution/students/", {"format": "json", "q": "05"}).json()
+        self.assertEqual(data["results"], [])
+        data = self.client.get("/institution/students/", {"format": "json", "program": self.program.pk + 1}).json()
+        self.assertEqual(data["results"], [])
+
+
+class FeeReportExportTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        fee_structure = FeeStructure.objects.create(institution=cls.institution, version=2)
+        students = Student.objects.bulk_create([
+            Student(institution=cls.institution, full_name=f"Student {i:02d}", admission_number=f"ADM{i}", program=cls.program)
+            for i in range(12)
+        ])
+        StudentFeeAssignment.objects.bulk_create([
+            StudentFeeAssignment(
+                student=student, fee_structure=fee_structure, academic_year=cls.academic_year,
+                total_fees=Decimal("1000"), amount_paid=Decimal("1000") if i % 3 == 0 else Decimal("0"),
+            )
+            for i, student in enumerate(students)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar", role="bursar", email="admin@school.test"
+        )
+        self.client.force_login(self.user)
+
+    def test_rows_read_in_one_query(self):
+        assignments = StudentFeeAssignment.objects.order_by("pk")
+        with self.assertNumQueries(1):
+            rows = list(iter_export_rows(assignments, chunk_size=5))
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[1][:4], ["ADM0", "Student 00", "Science", "2025/2026"])
+        self.assertEqual(rows[1][5], 2)
+
+    def test_csv_is_streamed(self):
+        response = self.client.get(reverse("institutions:export_fee_report", args=["csv"]), {"status": "unpaid"})
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(lines[0].split(",")[0], "admission_number")
+        self.assertEqual(len(lines), 1 + 8)
+        self.assertTrue(InstitutionAuditLog.objects.filter(action="report_exported").exists())
+
+    def test_xlsx_export(self):
+        response = self.client.get(reverse("institutions:export_fee_report", args=["xlsx"]))
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[1][6], 1000)
+
+    def test_report_page_is_bounded(self):
+        with mock.patch("institutions.views.REPORT_PREVIEW_ROWS", 5):
+            response = self.client.get(reverse("institutions:reports"))
+        self.assertEqual(len(response.context["assignments"]), 5)
+        self.assertContains(response, "Showing the latest 5 of 12")
+
+
+class FeeStatementTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        FeeItem.objects.create(fee_structure=fee_structure, name="Tuition", fee_type="tuition", amount=Decimal("900"))
+        FeeItem.objects.create(fee_structure=fee_structure, name="Library (annual)", fee_type="library", amount=Decimal("100"))
+        FeeItem.objects.create(
+            fee_structure=fee_structure, name="Accommodation", fee_type="accommodation", amount=Decimal("400"),
+            is_mandatory=False,
+        )
+        students = Student.objects.bulk_create([
+            Student(institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM/{i}", program=cls.program)
+            for i in range(5)
+        ])
+        StudentFeeAssignment.objects.bulk_create([
+            StudentFeeAssignment(
+                student=student, fee_structure=fee_structure, academic_year=cls.academic_year,
+                total_fees=Decimal("1000"), amount_paid=Decimal("250"),
+            )
+            for student in students
+        ])
+        ParentGuardian.objects.bulk_create([
+            ParentGuardian(student=student, full_name=f"Parent {i}", relationship="parent", phone_number="0700000000")
+            for i, student in enumerate(students)
+        ])
+
+    def test_statement_text(self):
+        student = statement_students(self.institution).first()
+        lines = StatementRenderer(self.institution).lines(student)
+
+        self.assertEqual(lines[0], "# TEST SCHOOL")
+        self.assertIn("Admission number: ADM/0", lines)
+        self.assertIn("Parent 0 (Parent)  0700000000", lines)
+        self.assertTrue(any(line.startswith("  Library (annual)") and line.endswith("100.00") for line in lines))
+        # Optional items are listed after the assignment, outside its 1,000.00 total
+        total = lines.index(next(line for line in lines if line.startswith("  Total fees")))
+        optional = lines.index("  Optional items (not included in total fees):")
+        self.assertGreater(optional, total)
+        self.assertTrue(lines[optional + 1].startswith("    Accommodation") and lines[optional + 1].endswith("400.00"))
+        self.assertFalse(any(line.startswith("  Accommodation") for line in lines))
+        self.assertTrue(any(line.startswith("# Total outstanding") and line.endswith("750.00") for line in lines))
+
+    def test_cohort_rendered_in_a_handful_of_queries(self):
+        output = io.BytesIO()
+        # fee items, students, then assignments and parents per chunk
+        with self.assertNumQueries(4):
+            result = generate_statements(self.institution, output, "pdf")
+
+        self.assertEqual(result.statements, 5)
+        self.assertEqual(result.pages, 5)
+        pdf = output.getvalue()
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf.endswith(b"%%EOF\n"))
+        self.assertIn(b"/Count 5", pdf)
+
+    def test_zip_of_per_student_pdfs(self):
+        output = io.BytesIO()
+        generate_statements(self.institution, output, "zip", academic_year=self.academic_year)
+
+        with zipfile.ZipFile(output) as archive:
+            names = archive.namelist()
+            self.assertEqual(len(names), 5)
+            self.assertIn("statement-ADM-0.pdf", names)
+            self.assertTrue(archive.read(names[0]).startswith(b"%PDF"))
+
+    def test_statement_job_saves_file(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            enqueue_job("generate_fee_statements", self.institution, payload={"program_id": self.program.pk})
+            job = execute_job(claim_job("test-worker"))
+
+            self.assertEqual(job.status, "succeeded")
+            self.assertEqual(job.result["statements"], 5)
+            self.assertEqual(job.processed, 5)
+            with default_storage.open(job.result["file"]) as saved:
+                self.assertTrue(saved.read().startswith(b"%PDF"))
+
+
+class SyntheticDatasetTests(TestCase):
+    def snapshot(self, institution):
+        students = list(
+            Student.objects.filter(institution=institution)
+            .order_by("admission_number")
+            .values_list("full_name", "admission_number", "email", "gender", "is_active")
+        )
+        assignments = list(
+            StudentFeeAssignment.objects.filter(institution=institution)
+            .order_by("student__admission_number", "academic_year__start_date", "term__term_number")
+            .values_list("total_fees", "discount_amount", "amount_paid", "due_date", "is_overdue")
+        )
+        return institution.institution_name, students, assignments
+
+    def test_same_seed_generates_same_rows(self):
+        as_of = date(2026, 3, 1)
+        first = generate_dataset(2, 30, seed=5, prefix="a", as_of=as_of, batch_size=7)
+        second = generate_dataset(2, 30, seed=5, prefix="b", as_of=as_of)
+        other = generate_dataset(1, 30, seed=6, prefix="c", as_of=as_of)
+
+        self.assertEqual(first.counts, second.counts)
+        self.assertEqual(first.counts["Student"], 60)
+        for one, two in zip(first.institutions, second.institutions):
+            self.assertEqual(self.snapshot(one), self.snapshot(two))
+        self.assertNotEqual(self.snapshot(first.institutions[0])[1], self.snapshot(other.institutions[0])[1])
+
+        institution = first.institutions[0]
+        self.assertEqual(institution.academic_years.get(is_active=True).year_code, "2025/2026")
+        self.assertEqual(
+            set(institution.staff.values_list("role", flat=True)), {"admin", "principal", "bursar", "teacher"}
+        )
+        self.assertFalse(
+            StudentFeeAssignment.objects.filter(institution=institution, due_date__gte=as_of, is_overdue=True).exists()
+        )
+
+    def test_existing_prefix_is_rejected(self):
+        generate_dataset(1, 1, prefix="dup")
+        with self.assertRaises(ValueError):
+            generate_dataset(1, 1, prefix="dup")
+
+
+class FailingSmsChannel:
+    """SMS backend double that rejects one number."""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, message, delivery):
+        if delivery.recipient == "+254700000002":
+            raise ConnectionError("gateway refused")
+
+
+@override_settings(
+    MESSAGE_CHANNEL_BACKENDS={
+        "email": "institutions.services.messaging.EmailChannel",
+        "sms": "institutions.tests.FailingSmsChannel",
+    },
+    MESSAGE_RATE_LIMITS={},
+)
+class MessageDeliveryTests(InstitutionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        fee_structure = FeeStructure.objects.create(institution=cls.institution, version=1)
+        cls.students = Student.objects.bulk_create([
+            Student(institution=cls.institution, full_name=f"Student {i}", admission_number=f"ADM{i}", is_active=i < 2)
+            for i in range(3)
+        ])
+        ParentGuardian.objects.bulk_create([
+            ParentGuardian(student=cls.students[0], full_name="Parent A", relationship="parent",
+                           email="a@family.test", phone_number="+254700000001"),
+            ParentGuardian(student=cls.students[0], full_name="Parent B", relationship="guardian",
+                           phone_number="+254700000002"),
+            ParentGuardian(student=cls.students[1], full_name="Parent C", relationship="parent",
+                           email="c@family.test", phone_number="+254700000003"),
+            ParentGuardian(student=cls.students[2], full_name="Parent D", relationship="parent",
+                           email="d@family.test", phone_number="+254700000004"),
+        ])
+        StudentFeeAssignment.objects.create(
+            student=cls.students[1], fee_structure=fee_structure, academic_year=cls.academic_year,
+            total_fees=Decimal("100"), is_overdue=True,
+        )
+        cls.staff = InstitutionStaff.objects.create(
+            institution=cls.institution, user=cls.user, full_name="Principal", role="principal", email="p@school.test"
+        )
+
+    def message(self):
+        return PrincipalMessage.objects.create(
+            institution=self.institution, sent_by=self.staff, subject="Fees due", message_type="reminder",
+            content="Please pay.",
+        )
+
+    def test_recipients_resolved_once_per_parent_and_channel(self):
+        message = self.message()
+        result = resolve_recipients(message, "all", channels=["email", "sms"])
+
+        # Active students only; parent B has no email address
+        self.assertEqual(result.students, 2)
+        self.assertEqual(result.deliveries, 5)
+        self.assertEqual(set(message.target_students.all()), set(self.students[:2]))
+        self.assertEqual(
+            set(message.deliveries.filter(channel="email").values_list("recipient", flat=True)),
+            {"a@family.test", "c@family.test"},
+        )
+
+        again = resolve_recipients(message, "all", channels=["email", "sms"])
+        self.assertEqual((again.students, again.deliveries), (0, 0))
+
+        overdue = self.message()
+        resolve_recipients(overdue, "overdue")
+        self.assertEqual(list(overdue.target_students.all()), [self.students[1]])
+
+    def test_send_message_delivers_in_background(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("institutions:send_message"), {
+            "subject": "Fees due", "content": "Please pay.", "message_type": "reminder",
+            "target_type": "all", "channels": ["email", "sms"],
+        })
+        self.assertRedirects(response, reverse("institutions:messaging_panel"))
+        self.assertEqual(len(mail.outbox), 0)
+
+        job = execute_job(claim_job("test-worker"))
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.result["recipients"], 2)
+        self.assertEqual((job.result["sent"], job.result["failed"], job.result["remaining"]), (4, 1, 0))
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), ["a@family.test", "c@family.test"])
+
+        failed = MessageDelivery.objects.get(status="failed")
+        self.assertEqual(failed.recipient, "+254700000002")
+        self.assertEqual(failed.error, "gateway refused")
+        self.assertEqual(failed.attempts, 1)
+
+        response = self.client.get(reverse("institutions:messaging_panel"))
+        listed = response.context["messages"][0]
+        self.assertEqual(listed.recipient_count, 2)
+        self.assertEqual(listed.delivery_counts, {"sent": 4, "failed": 1})
+
+    def test_concurrent_dispatchers_never_send_a_delivery_twice(self):
+        message = self.message()
+        resolve_recipients(message, "all", channels=["email"])
+        sent = []
+
+        def send(channel, message, delivery):
+            if not sent:
+                # A second worker starts on the same message mid-chunk
+                self.assertEqual(dispatch_deliveries(message).sent, 0)
+            sent.append(delivery.recipient)
+
+        with mock.patch("institutions.services.messaging.EmailChannel.send", autospec=True, side_effect=send):
+            result = dispatch_deliveries(message)
+
+        self.assertEqual((result.sent, result.remaining), (2, 0))
+        self.assertEqual(sorted(sent), ["a@family.test", "c@family.test"])
+
+        # Deliveries a dead worker left claimed are sent again once stale
+        MessageDelivery.objects.filter(message=message).update(
+            status="sending", updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(dispatch_deliveries(message).sent, 2)
+
+    @override_settings(MESSAGE_DISPATCH_SECONDS=0)
+    def test_dispatch_hands_over_when_out_of_time(self):
+        message = self.message()
+        job = enqueue_job("send_principal_message", self.institution, payload={"message_id": message.pk})
+        job = execute_job(claim_job("test-worker", job_pk=job.pk))
+
+        self.assertEqual(job.result["remaining"], 2)
+        follow_up = InstitutionJob.objects.get(pk=job.result["follow_up_job"])
+        self.assertEqual(follow_up.job_type, "dispatch_message_deliveries")
+
+        with override_settings(MESSAGE_DISPATCH_SECONDS=60):
+            follow_up = execute_job(claim_job("test-worker", job_pk=follow_up.pk))
+        self.assertEqual((follow_up.result["sent"], follow_up.result["remaining"]), (2, 0))
+        self.assertIsNone(follow_up.result["follow_up_job"])
+
+    def test_rate_limiter_spaces_calls(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            limiter.wait()
+        self.assertEqual(sleeps, [0.25, 0.25])
+
+
+class ViewBenchmarkTests(TestCase):
+    def test_benchmark_writes_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f"{tmp}/results.json"
+            call_command(
+                "benchmark_institution_views", sizes=[20], repeat=2, upload_rows=5, output=output, stdout=io.StringIO()
+            )
+            with open(output) as f:
+                results = json.load(f)["results"]
+
+        self.assertEqual([entry["scenario"] for entry in results], list(SCENARIOS))
+        for entry in results:
+            self.assertEqual(entry["size"], 20)
+            self.assertGreater(entry["queries"], 0)
+            self.assertGreater(entry["median_ms"], 0)
+        # The rolled-back dataset leaves nothing behind
+        self.assertFalse(InstitutionProfile.objects.exists())
+
+    def test_regressions_are_flagged(self):
+        baseline = [{"scenario": "fee_reports", "size": 100, "median_ms": 10.0, "queries": 5}]
+        self.assertEqual(compare_results([dict(baseline[0], median_ms=12.0)], baseline, 0.25), [])
+        self.assertEqual(len(compare_results([dict(baseline[0], median_ms=13.0)], baseline, 0.25)), 1)
+        self.assertEqual(len(compare_results([dict(baseline[0], queries=6)], baseline, 0.25)), 1)
+        self.assertEqual(compare_results([dict(baseline[0], size=1000, median_ms=50.0)], baseline, 0.25), [])
+
+
+class RequestProfilingTests(InstitutionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar", role="bursar", email="admin@school.test"
+        )
+        self.client.force_login(self.user)
+
+    @override_settings(REQUEST_PROFILING_SERVER_TIMING=True)
+    def test_metrics_are_logged_and_sent_as_server_timing(self):
+        with self.assertLogs("EduPayAfrica.requests", level="INFO") as logs:
+            response = self.client.get("/institution/fee-analysis/")
+
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        metrics = logs.records[0].request_metrics
+        self.assertEqual(metrics["view"], "institutions:fee_analysis")
+        self.assertGreater(metrics["queries"], 0)
+        self.assertGreater(metrics["template_ms"], 0)
+
+    @override_settings(QUERY_BUDGETS={"institutions:fee_analysis": 3}, QUERY_BUDGET_STRICT=True)
+    def test_query_budget_overrun_fails_the_test(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "institutions:fee_analysis issued"):
+            self.client.get("/institution/fee-analysis/")
+
+
+class InstitutionContextTests(InstitutionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Bursar", role="bursar", email="admin@school.test"
+        )
+        self.client.force_login(self.user)
+
+    def test_role_change_invalidates_cached_context(self):
+        self.assertEqual(self.client.get("/institution/fee-analysis/").status_code, 200)
+
+        self.staff.role = "teacher"
+        self.staff.save()
+        response = self.client.get("/institution/fee-analysis/")
+        self.assertRedirects(response, "/institution/", fetch_redirect_response=False)
+
+    def test_revoked_role_is_refused(self):
+        self.assertEqual(self.client.get("/institution/fee-analysis/").status_code, 200)
+
+        self.staff.is_active = False
+        self.staff.save()
+        response = self.client.get("/institution/fee-analysis/")
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_owner_gains_new_staff_row_without_waiting_for_expiry(self):
+        self.staff.delete()
+        self.client.get(reverse("institutions:dashboard"))
+
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=self.user, full_name="Admin", role="admin", email="admin@school.test"
+        )
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["staff_role"], "admin")
+
+    def test_profile_change_invalidates_staff_contexts(self):
+        member = User.objects.create_user(username="bursar@school.test", password="pass1234")
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=member, full_name="Member", role="bursar", email="bursar@school.test"
+        )
+        before = context_version(member.pk)
+        self.institution.save()
+        self.assertGreater(context_version(member.pk), before)
+
+    def test_owner_acts_for_own_institution_over_a_staff_row_elsewhere(self):
+        other = InstitutionProfile.objects.create(
+            user=User.objects.create_user(username="other@school.test"),
+            institution_name="Other School",
+            institution_type="secondary_school",
+            contact_email="other@school.test",
+        )
+        self.staff.institution = other
+        self.staff.save()
+
+        response = self.client.get(reverse("institutions:dashboard"))
+        self.assertEqual(response.context["institution"], self.institution)
+        self.assertIsNone(response.context["staff_role"])
+
+    def test_staff_member_acts_for_employing_institution(self):
+        member = User.objects.create_user(username="bursar@school.test", password="pass1234")
+        InstitutionStaff.objects.create(
+            institution=self.institution, user=member, full_name="Member", role="bursar", email="bursar@school.test"
+        )
+        self.client.force_login(member)
+        response = self.client.get("/institution/fee-analysis/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["institution"], self.institution)
@@ -34,6 +34,7 @@ urlpatterns = [
     # Fee Structure Management (Bursar/Accountant)
     path("fee-structures/", views.fee_structure_management, name="fee_structure_management"),
     path("fee-structures/create/", views.create_fee_structure, name="create_fee_structure"),
+    path("fee-structures/assign/", views.assign_fee_structure, name="assign_fee_structure"),
     
     # Messaging (Principal only)
     path("messages/", views.messaging_panel, name="messaging_panel"),
@@ -41,8 +42,13 @@ urlpatterns = [
     
     # Fee Analysis Dashboard
     path("fee-analysis/", views.fee_analysis_dashboard, name="fee_analysis"),
+    path("fee-analysis/refresh/", views.refresh_fee_analysis, name="refresh_fee_analysis"),
     
     # Reports
     path("reports/", views.fee_reports, name="reports"),
+    path("reports/export/<str:file_format>/", views.export_fee_report, name="export_fee_report"),
     path("student/<int:student_id>/statement/", views.student_fee_statement, name="student_statement"),
+
+    # Background Jobs
+    path("jobs/<int:job_id>/", views.job_status, name="job_status"),
 ]
@@ -3,14 +3,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, F, Count, Case, When
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Q, Sum, Count
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
-from django.utils import timezone
-from datetime import datetime, timedelta
-import csv
-import openpyxl
-from io import BytesIO
+from django.utils.text import slugify
+from datetime import datetime
+from functools import wraps
 
 from .models import (
     InstitutionProfile,
@@ -24,126 +23,45 @@ from .models import (
     StudentFeeAssignment,
     InstitutionAuditLog,
     InstitutionStaff,
-    ParentGuardian,
     PrincipalMessage,
-    FeeAnalysisSnapshot,
-)
-
-# Ensure require_role is defined before its first use
-def require_role(*allowed_roles):
-    """Decorator to check user role at institution."""
-    def decorator(view_func):
-        def wrapper(request, *args, **kwargs):
-            institution = get_institution_or_404(request)
-            if not institution:
-                messages.error(request, "You don't have an institution profile.")
-                return redirect("home")
-            staff_role = get_staff_role(request, institution)
-            if not staff_role or staff_role not in allowed_roles:
-                messages.error(request, f"You don't have permission. Required role: {', '.join(allowed_roles)}")
-                return redirect("institutions:dashboard")
-            return view_func(request, *args, **kwargs)
-        return wrapper
-    return decorator
-
-
-@login_required
-@require_role("admin")
-def edit_staff(request, staff_id):
-    """Edit staff member details."""
-    institution = get_institution_or_404(request)
-    staff = get_object_or_404(InstitutionStaff, pk=staff_id, institution=institution)
-    if request.method == "POST":
-        staff.full_name = request.POST.get("full_name", staff.full_name)
-        staff.email = request.POST.get("email", staff.email)
-        staff.phone_number = request.POST.get("phone_number", staff.phone_number)
-        staff.role = request.POST.get("role", staff.role)
-        password = request.POST.get("password", "")
-        staff.save()
-        # Update password if provided
-        if password and len(password) >= 6:
-            user = staff.user
-            user.set_password(password)
-            user.save()
-            # Update Firebase password
-            try:
-                from accounts.firebase_auth import update_firebase_user
-                update_firebase_user(current_email=staff.email, new_password=password, display_name=staff.full_name)
-            except Exception as e:
-                messages.warning(request, f"Password updated in Django but failed in Firebase: {e}")
-        elif password:
-            messages.warning(request, "Password must be at least 6 characters long.")
-        messages.success(request, "Staff member updated successfully!")
-        return redirect("institutions:staff_management")
-    context = {
-        "institution": institution,
-        "staff": staff,
-        "roles": InstitutionStaff.ROLE_CHOICES,
-    }
-    return render(request, "institutions/edit_staff.html", context)
-
-@login_required
-@require_role("admin")
-@require_http_methods(["POST"])
-def delete_staff(request, staff_id):
-    """Delete staff member."""
-    institution = get_institution_or_404(request)
-    staff = get_object_or_404(InstitutionStaff, pk=staff_id, institution=institution)
-    staff.delete()
-    messages.success(request, "Staff member deleted successfully!")
-    return redirect("institutions:staff_management")
-import csv
-import openpyxl
-from io import BytesIO
-
-from .models import (
-    InstitutionProfile,
-    AcademicYear,
-    Term,
-    Faculty,
-    Program,
-    Student,
-    FeeStructure,
-    FeeItem,
-    StudentFeeAssignment,
-    InstitutionAuditLog,
-    InstitutionStaff,
-    ParentGuardian,
-    PrincipalMessage,
-    FeeAnalysisSnapshot,
+    MessageDelivery,
+    InstitutionJob,
 )
+from .cache import cached_for_institution
+from .context import get_institution_context
+from .services.dashboard import dashboard_data, dashboard_template
+from .services.fee_analysis import FeeStatistics, latest_snapshot, snapshot_trend
+from .services.exports import EXPORT_CONTENT_TYPES, REPORT_PREVIEW_ROWS, iter_export_rows, stream_csv, write_xlsx
+from .services.fee_assignment import BulkFeeAssigner
+from .services.jobs import enqueue_job, job_status_payload
+from .services.messaging import CHANNEL_CONTACT_FIELDS, TARGET_TYPES
+from .services.pagination import keyset_paginate
 
 
 def get_institution_or_404(request):
     """Get institution profile for current user."""
-    try:
-        return request.user.institution_profile
-    except InstitutionProfile.DoesNotExist:
-        return None
+    return get_institution_context(request).institution
 
 
 def get_staff_role(request, institution):
     """Get staff role for current user at this institution."""
-    try:
-        staff = InstitutionStaff.objects.get(
-            institution=institution, user=request.user, is_active=True
-        )
-        return staff.role
-    except InstitutionStaff.DoesNotExist:
+    context = get_institution_context(request)
+    if institution is None or context.institution is None or context.institution.pk != institution.pk:
         return None
+    return context.role
 
 
 def require_role(*allowed_roles):
     """Decorator to check user role at institution."""
     def decorator(view_func):
+        @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            institution = get_institution_or_404(request)
-            if not institution:
+            context = get_institution_context(request)
+            if not context.institution:
                 messages.error(request, "You don't have an institution profile.")
                 return redirect("home")
             
-            staff_role = get_staff_role(request, institution)
-            if not staff_role or staff_role not in allowed_roles:
+            if not context.has_role(*allowed_roles):
                 messages.error(request, f"You don't have permission. Required role: {', '.join(allowed_roles)}")
                 return redirect("institutions:dashboard")
             
@@ -157,9 +75,10 @@ def institution_dashboard(request):
     """Main institution dashboard - role-based content."""
     institution = get_institution_or_404(request)
     
+    platform_profile = getattr(request, 'platform_profile', None)
+    
     # Auto-create InstitutionProfile from PlatformUserProfile if needed
-    if not institution and hasattr(request.user, 'platform_profile'):
-        platform_profile = request.user.platform_profile
+    if not institution and platform_profile:
         if platform_profile.role == 'institution_admin' and platform_profile.institution:
             # Create InstitutionProfile from platform admin data
             institution = InstitutionProfile.objects.create(
@@ -178,97 +97,25 @@ def institution_dashboard(request):
     
     # Auto-create InstitutionStaff record for institution admins if needed
     staff_role = get_staff_role(request, institution)
-    if not staff_role and hasattr(request.user, 'platform_profile'):
-        if request.user.platform_profile.role == 'institution_admin':
-            # Create staff record with admin role
-            InstitutionStaff.objects.create(
+    if not staff_role and platform_profile:
+        if platform_profile.role == 'institution_admin':
+            # Create staff record with admin role; another request may have just created it
+            staff, created = InstitutionStaff.objects.get_or_create(
                 institution=institution,
                 user=request.user,
-                role='admin',
-                is_active=True
+                defaults={'role': 'admin', 'is_active': True},
             )
-            staff_role = 'admin'
-            messages.info(request, "Your admin access has been activated.")
+            staff_role = staff.role if staff.is_active else None
+            if created:
+                messages.info(request, "Your admin access has been activated.")
     
-    # Common data for all roles
+    # Common data for all roles, plus the role's cached figures and lists
     context = {
         "institution": institution,
         "staff_role": staff_role,
+        **dashboard_data(institution, staff_role),
     }
-    
-    # Get active academic year
-    active_academic_year = AcademicYear.objects.filter(
-        institution=institution, is_active=True
-    ).first()
-    context["active_academic_year"] = active_academic_year
-    
-    if staff_role == "admin":
-        # Admin sees full dashboard
-        students_count = Student.objects.filter(institution=institution, is_active=True).count()
-        total_fees_billed = StudentFeeAssignment.objects.filter(
-            student__institution=institution
-        ).aggregate(total=Sum("total_fees"))["total"] or 0
-        
-        total_outstanding = StudentFeeAssignment.objects.filter(
-            student__institution=institution
-        ).aggregate(
-            total=Sum(F("total_fees") - F("discount_amount") + F("penalty_amount") - F("amount_paid"))
-        )["total"] or 0
-        
-        overdue_count = StudentFeeAssignment.objects.filter(
-            student__institution=institution, is_overdue=True
-        ).count()
-        
-        context.update({
-            "students_count": students_count,
-            "total_fees_billed": total_fees_billed,
-            "total_outstanding": total_outstanding,
-            "overdue_count": overdue_count,
-            "staff_list": InstitutionStaff.objects.filter(institution=institution, is_active=True),
-        })
-        return render(request, "institutions/dashboards/admin_dashboard.html", context)
-    
-    elif staff_role == "principal":
-        # Principal sees messaging and analytics
-        context["messages_sent"] = PrincipalMessage.objects.filter(
-            institution=institution
-        ).count()
-        context["recent_messages"] = PrincipalMessage.objects.filter(
-            institution=institution
-        ).order_by("-sent_date")[:5]
-        context["staff_list"] = InstitutionStaff.objects.filter(institution=institution, is_active=True)
-        return render(request, "institutions/dashboards/principal_dashboard.html", context)
-    
-    elif staff_role in ["bursar", "accountant"]:
-        # Bursar/Finance sees fee structures and analysis
-        total_billed = StudentFeeAssignment.objects.filter(
-            student__institution=institution
-        ).aggregate(total=Sum("total_fees"))["total"] or 0
-        
-        total_paid = StudentFeeAssignment.objects.filter(
-            student__institution=institution
-        ).aggregate(total=Sum("amount_paid"))["total"] or 0
-        
-        collection_rate = (total_paid / total_billed * 100) if total_billed > 0 else 0
-        
-        context.update({
-            "total_billed": total_billed,
-            "total_paid": total_paid,
-            "total_outstanding": total_billed - total_paid,
-            "collection_rate": round(collection_rate, 2),
-            "programs": Program.objects.filter(institution=institution, is_active=True),
-            "fee_structures": FeeStructure.objects.filter(institution=institution),
-        })
-        return render(request, "institutions/dashboards/bursar_dashboard.html", context)
-    
-    elif staff_role == "teacher":
-        # Teacher sees their students
-        context["students_count"] = Student.objects.filter(institution=institution, is_active=True).count()
-        return render(request, "institutions/dashboards/teacher_dashboard.html", context)
-    
-    else:
-        # Generic dashboard for other roles
-        return render(request, "institutions/dashboards/generic_dashboard.html", context)
+    return render(request, dashboard_template(staff_role), context)
 
 
 @login_required
@@ -351,21 +198,120 @@ def add_staff(request):
         return redirect("institutions:staff_management")
 
 
+@login_required
+@require_role("admin")
+def edit_staff(request, staff_id):
+    """Edit staff member details."""
+    institution = get_institution_or_404(request)
+    staff = get_object_or_404(InstitutionStaff, pk=staff_id, institution=institution)
+    if request.method == "POST":
+        staff.full_name = request.POST.get("full_name", staff.full_name)
+        staff.email = request.POST.get("email", staff.email)
+        staff.phone_number = request.POST.get("phone_number", staff.phone_number)
+        staff.role = request.POST.get("role", staff.role)
+        password = request.POST.get("password", "")
+        staff.save()
+        # Update password if provided
+        if password and len(password) >= 6:
+            user = staff.user
+            user.set_password(password)
+            user.save()
+            # Update Firebase password
+            try:
+                from accounts.firebase_auth import update_firebase_user
+                update_firebase_user(current_email=staff.email, new_password=password, display_name=staff.full_name)
+            except Exception as e:
+                messages.warning(request, f"Password updated in Django but failed in Firebase: {e}")
+        elif password:
+            messages.warning(request, "Password must be at least 6 characters long.")
+        messages.success(request, "Staff member updated successfully!")
+        return redirect("institutions:staff_management")
+    context = {
+        "institution": institution,
+        "staff": staff,
+        "roles": InstitutionStaff.ROLE_CHOICES,
+    }
+    return render(request, "institutions/edit_staff.html", context)
+
+
+@login_required
+@require_role("admin")
+@require_http_methods(["POST"])
+def delete_staff(request, staff_id):
+    """Delete staff member."""
+    institution = get_institution_or_404(request)
+    staff = get_object_or_404(InstitutionStaff, pk=staff_id, institution=institution)
+    staff.delete()
+    messages.success(request, "Staff member deleted successfully!")
+    return redirect("institutions:staff_management")
+
+
 @login_required
 @require_role("admin")
 def student_management(request):
-    """Manage students - manual add, bulk upload, view all."""
+    """Manage students - manual add, bulk upload, paginated search."""
     institution = get_institution_or_404(request)
     
     students = Student.objects.filter(institution=institution, is_active=True)
-    programs = Program.objects.filter(institution=institution, is_active=True)
-    academic_years = AcademicYear.objects.filter(institution=institution)
+    
+    # Server-side search and filters
+    query = request.GET.get("q", "").strip()
+    program_id = request.GET.get("program", "")
+    year_id = request.GET.get("year", "")
+    if query:
+        students = students.filter(
+            Q(full_name__istartswith=query)
+            | Q(admission_number__istartswith=query)
+            | Q(email__istartswith=query)
+        )
+    if program_id.isdigit():
+        students = students.filter(program_id=program_id)
+    if year_id.isdigit():
+        students = students.filter(academic_year_id=year_id)
+    
+    page = keyset_paginate(
+        students.select_related("program", "academic_year"),
+        "full_name",
+        cursor=request.GET.get("cursor"),
+    )
+    
+    if request.GET.get("format") == "json" or request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return JsonResponse({
+            "results": [
+                {
+                    "id": student.pk,
+                    "full_name": student.full_name,
+                    "admission_number": student.admission_number,
+                    "email": student.email,
+                    "program": student.program.program_name if student.program else None,
+                    "academic_year": student.academic_year.year_code if student.academic_year else None,
+                    "is_active": student.is_active,
+                    "statement_url": reverse("institutions:student_statement", args=[student.pk]),
+                }
+                for student in page.items
+            ],
+            "next_cursor": page.next_cursor,
+            "has_more": page.has_more,
+        })
+    
+    programs, academic_years = cached_for_institution(institution, "student-filters", lambda: (
+        list(Program.objects.filter(institution=institution, is_active=True)),
+        list(AcademicYear.objects.filter(institution=institution)),
+    ))
     
     context = {
         "institution": institution,
-        "students": students,
+        "students": page.items,
+        "next_cursor": page.next_cursor,
+        "students_count": cached_for_institution(
+            institution, "students-count", students.count, query, program_id, year_id
+        ),
         "programs": programs,
         "academic_years": academic_years,
+        "query": query,
+        "selected_program": program_id,
+        "selected_year": year_id,
+        "show_list": bool(query or program_id or year_id or request.GET.get("cursor")),
     }
     
     return render(request, "institutions/students.html", context)
@@ -422,92 +368,34 @@ def bulk_upload_students(request):
     institution = get_institution_or_404(request)
     
     try:
-        file = request.FILES.get("file")
-        
+        file = request.FILES.get("file") or request.FILES.get("csv_file")
+
         if not file:
             messages.error(request, "No file selected.")
             return redirect("institutions:students")
-        
-        # Handle both Excel and CSV
-        students_added = 0
-        errors = []
-        
-        if file.name.endswith(".xlsx"):
-            # Excel file
-            wb = openpyxl.load_workbook(file)
-            ws = wb.active
-            
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
-                try:
-                    full_name, admission_no, email, program_code, year_code = row[:5]
-                    
-                    program = Program.objects.get(
-                        institution=institution, program_code=program_code
-                    )
-                    academic_year = AcademicYear.objects.get(
-                        institution=institution, year_code=year_code
-                    )
-                    
-                    Student.objects.create(
-                        institution=institution,
-                        program=program,
-                        academic_year=academic_year,
-                        full_name=full_name,
-                        admission_number=admission_no,
-                        email=email or "",
-                    )
-                    students_added += 1
-                
-                except Exception as e:
-                    errors.append(f"Row {row_idx}: {str(e)}")
-        
-        else:
-            # CSV file
-            decoded_file = file.read().decode("utf-8").split("\n")
-            reader = csv.reader(decoded_file)
-            next(reader)  # Skip header
-            
-            for row_idx, row in enumerate(reader, 2):
-                if not row:
-                    continue
-                try:
-                    full_name, admission_no, email, program_code, year_code = row[:5]
-                    
-                    program = Program.objects.get(
-                        institution=institution, program_code=program_code
-                    )
-                    academic_year = AcademicYear.objects.get(
-                        institution=institution, year_code=year_code
-                    )
-                    
-                    Student.objects.create(
-                        institution=institution,
-                        program=program,
-                        academic_year=academic_year,
-                        full_name=full_name,
-                        admission_number=admission_no,
-                        email=email or "",
-                    )
-                    students_added += 1
-                
-                except Exception as e:
-                    errors.append(f"Row {row_idx}: {str(e)}")
-        
-        InstitutionAuditLog.objects.create(
-            institution=institution,
-            actor=request.user,
-            action="bulk_upload",
-            entity_type="Student",
-            description=f"Bulk uploaded {students_added} students",
+
+        if not file.name.lower().endswith((".csv", ".xlsx")):
+            messages.error(request, "Please upload a .csv or .xlsx file.")
+            return redirect("institutions:students")
+
+        # Parsing and importing run on a background worker (run_institution_jobs)
+        job = enqueue_job(
+            "bulk_upload_students",
+            institution,
+            payload={"filename": file.name},
+            created_by=request.user,
+            input_file=file,
+        )
+
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return _job_accepted_response(job)
+
+        messages.success(
+            request,
+            f"Upload received. Students are being imported in the background (job #{job.pk}).",
         )
-        
-        messages.success(request, f"Successfully added {students_added} students!")
-        
-        if errors:
-            messages.warning(request, f"Errors: {'; '.join(errors[:5])}")
-        
         return redirect("institutions:students")
-    
+
     except Exception as e:
         messages.error(request, f"Error uploading file: {str(e)}")
         return redirect("institutions:students")
@@ -582,13 +470,18 @@ def fee_structure_management(request):
     """Manage fee structures for different programs."""
     institution = get_institution_or_404(request)
     
-    fee_structures = FeeStructure.objects.filter(institution=institution)
+    fee_structures = FeeStructure.objects.filter(institution=institution).annotate(
+        mandatory_total=Sum("fee_items__amount", filter=Q(fee_items__is_mandatory=True))
+    ).prefetch_related("fee_items")
     programs = Program.objects.filter(institution=institution, is_active=True)
     
     context = {
         "institution": institution,
         "fee_structures": fee_structures,
         "programs": programs,
+        "faculties": Faculty.objects.filter(institution=institution, is_active=True),
+        "academic_years": AcademicYear.objects.filter(institution=institution),
+        "terms": Term.objects.filter(academic_year__institution=institution).select_related("academic_year"),
     }
     
     return render(request, "institutions/fee_structure_management.html", context)
@@ -642,13 +535,93 @@ def create_fee_structure(request):
         return redirect("institutions:fee_structure_management")
 
 
+@login_required
+@require_role("bursar", "accountant")
+@require_http_methods(["POST"])
+def assign_fee_structure(request):
+    """Bill a cohort of students against a fee structure (or preview it)."""
+    institution = get_institution_or_404(request)
+    dry_run = bool(request.POST.get("dry_run"))
+
+    def optional(model, field, **scope):
+        pk = request.POST.get(field)
+        return get_object_or_404(model, pk=pk, **scope) if pk else None
+
+    try:
+        fee_structure = get_object_or_404(FeeStructure, pk=request.POST.get("fee_structure"), institution=institution)
+        academic_year = get_object_or_404(AcademicYear, pk=request.POST.get("academic_year"), institution=institution)
+        due_date = request.POST.get("due_date")
+
+        assigner = BulkFeeAssigner(
+            fee_structure,
+            academic_year,
+            term=optional(Term, "term", academic_year=academic_year),
+            program=optional(Program, "program", institution=institution),
+            faculty=optional(Faculty, "faculty", institution=institution),
+            student_year=optional(AcademicYear, "student_year", institution=institution),
+            due_date=datetime.strptime(due_date, "%Y-%m-%d").date() if due_date else None,
+        )
+        result = assigner.run(dry_run=dry_run)
+    except ValueError as e:
+        messages.error(request, f"Error assigning fees: {str(e)}")
+        return redirect("institutions:fee_structure_management")
+
+    if not dry_run and (result.created or result.updated):
+        InstitutionAuditLog.objects.create(
+            institution=institution,
+            actor=request.user,
+            action="fee_assigned",
+            entity_type="FeeStructure",
+            entity_id=str(fee_structure.pk),
+            description=(
+                f"Billed {result.students} students {result.amount_per_student} for "
+                f"{academic_year.year_code}: {result.created} created, {result.updated} updated"
+            ),
+        )
+
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return JsonResponse({
+            "dry_run": result.dry_run,
+            "students": result.students,
+            "created": result.created,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "amount_per_student": str(result.amount_per_student),
+            "total_billed": str(result.total_billed),
+        })
+
+    summary = (
+        f"{result.students} students at {result.amount_per_student:,.2f} "
+        f"(total {result.total_billed:,.2f}): {result.created} new, "
+        f"{result.updated} updated, {result.unchanged} unchanged."
+    )
+    if dry_run:
+        messages.info(request, f"Preview only - {summary}")
+    else:
+        messages.success(request, f"Fees assigned - {summary}")
+    return redirect("institutions:fee_structure_management")
+
+
 @login_required
 @require_role("principal")
 def messaging_panel(request):
     """Principal messaging panel."""
     institution = get_institution_or_404(request)
     
-    messages_list = PrincipalMessage.objects.filter(institution=institution)
+    messages_list = list(
+        PrincipalMessage.objects.filter(institution=institution).annotate(recipient_count=Count("target_students"))
+    )
+    # Delivery status counts for all listed messages in one query
+    delivery_counts = {}
+    for row in (
+        MessageDelivery.objects.filter(message__in=messages_list)
+        .values("message_id", "status")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        delivery_counts.setdefault(row["message_id"], {})[row["status"]] = row["total"]
+    for message in messages_list:
+        message.delivery_counts = delivery_counts.get(message.pk, {})
     
     context = {
         "institution": institution,
@@ -667,7 +640,7 @@ def send_message(request):
     institution = get_institution_or_404(request)
     
     try:
-        staff = InstitutionStaff.objects.get(institution=institution, user=request.user)
+        staff = get_institution_context(request).staff
         
         subject = request.POST.get("subject")
         content = request.POST.get("content")
@@ -682,33 +655,27 @@ def send_message(request):
             message_type=message_type,
         )
         
-        # Add target students
-        if target_type == "all":
-            students = Student.objects.filter(institution=institution, is_active=True)
-        elif target_type == "overdue":
-            students = Student.objects.filter(
-                institution=institution,
-                fee_assignments__is_overdue=True,
-                is_active=True
-            ).distinct()
-        else:
-            student_ids = request.POST.getlist("student_ids")
-            students = Student.objects.filter(pk__in=student_ids)
-        
-        message.target_students.set(students)
-        
-        InstitutionAuditLog.objects.create(
-            institution=institution,
-            actor=request.user,
-            action="message_sent",
-            entity_type="PrincipalMessage",
-            entity_id=str(message.pk),
-            description=f"Sent message to {message.target_students.count()} students",
+        if target_type not in TARGET_TYPES:
+            target_type = "specific"
+        channels = [c for c in request.POST.getlist("channels") if c in CHANNEL_CONTACT_FIELDS] or ["email"]
+
+        # Recipients are resolved and messages delivered on a background worker
+        job = enqueue_job(
+            "send_principal_message",
+            institution,
+            payload={
+                "message_id": message.pk,
+                "target_type": target_type,
+                "student_ids": [int(pk) for pk in request.POST.getlist("student_ids") if pk.isdigit()],
+                "channels": channels,
+            },
+            created_by=request.user,
         )
-        
-        messages.success(request, f"Message sent to {message.target_students.count()} students!")
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return _job_accepted_response(job)
+        messages.success(request, f"Message queued for delivery (job #{job.pk}).")
         return redirect("institutions:messaging_panel")
-    
+
     except Exception as e:
         messages.error(request, f"Error sending message: {str(e)}")
         return redirect("institutions:messaging_panel")
@@ -725,69 +692,82 @@ def fee_analysis_dashboard(request):
         institution=institution, is_active=True
     ).first()
     
-    if active_year:
-        # Get current snapshot or create if missing
-        today = timezone.now().date()
-        snapshot, created = FeeAnalysisSnapshot.objects.get_or_create(
+    def build_analysis():
+        # Read the materialised snapshot; compute live only if none exists yet
+        snapshot = None
+        trend = []
+        if active_year:
+            snapshot = latest_snapshot(institution, active_year)
+            if snapshot:
+                stats = FeeStatistics.from_snapshot(snapshot).as_dict()
+                trend = snapshot_trend(institution, active_year)
+            else:
+                stats = FeeStatistics.for_institution(institution, active_year).as_dict()
+        else:
+            stats = FeeStatistics().as_dict()
+
+        # Get detailed fees for table
+        detailed_fees = list(StudentFeeAssignment.objects.filter(
             institution=institution,
-            academic_year=active_year,
-            snapshot_date=today,
-            defaults={
-                "total_students": Student.objects.filter(
-                    institution=institution, academic_year=active_year, is_active=True
-                ).count(),
-            }
-        )
-        
-        # Calculate metrics
-        assignments = StudentFeeAssignment.objects.filter(
-            student__institution=institution,
             academic_year=active_year
-        )
-        
-        total_billed = assignments.aggregate(Sum("total_fees"))["total_fees__sum"] or 0
-        total_paid = assignments.aggregate(Sum("amount_paid"))["amount_paid__sum"] or 0
-        
-        stats = {
-            "total_students": snapshot.total_students,
-            "total_billed": total_billed,
-            "total_paid": total_paid,
-            "total_outstanding": total_billed - total_paid,
-            "fully_paid": assignments.filter(amount_paid__gte=F("total_fees") - F("discount_amount") + F("penalty_amount")).count(),
-            "partially_paid": assignments.filter(amount_paid__gt=0, amount_paid__lt=F("total_fees") - F("discount_amount") + F("penalty_amount")).count(),
-            "not_paid": assignments.filter(amount_paid=0).count(),
-            "overdue": assignments.filter(is_overdue=True).count(),
-            "collection_rate": (total_paid / total_billed * 100) if total_billed > 0 else 0,
-        }
-    else:
-        stats = {
-            "total_students": 0,
-            "total_billed": 0,
-            "total_paid": 0,
-            "total_outstanding": 0,
-            "fully_paid": 0,
-            "partially_paid": 0,
-            "not_paid": 0,
-            "overdue": 0,
-            "collection_rate": 0,
-        }
-    
-    # Get detailed fees for table
-    detailed_fees = StudentFeeAssignment.objects.filter(
-        student__institution=institution,
-        academic_year=active_year
-    ).select_related("student").order_by("-created_at")[:100]
+        ).select_related("student__program").order_by("-created_at")[:100])
+        return {"stats": stats, "snapshot": snapshot, "trend": trend, "detailed_fees": detailed_fees}
     
     context = {
         "institution": institution,
         "active_year": active_year,
-        "stats": stats,
-        "detailed_fees": detailed_fees,
+        **cached_for_institution(institution, "fee-analysis", build_analysis, active_year and active_year.pk),
     }
     
     return render(request, "institutions/fee_analysis.html", context)
 
 
+@login_required
+@require_role("principal", "bursar", "accountant")
+@require_http_methods(["POST"])
+def refresh_fee_analysis(request):
+    """Queue a recomputation of today's fee analysis snapshot."""
+    institution = get_institution_or_404(request)
+
+    active_year = AcademicYear.objects.filter(
+        institution=institution, is_active=True
+    ).first()
+    if not active_year:
+        messages.error(request, "There is no active academic year to analyse.")
+        return redirect("institutions:fee_analysis")
+
+    job = enqueue_job(
+        "recompute_fee_analysis",
+        institution,
+        payload={"academic_year_id": active_year.pk},
+        created_by=request.user,
+    )
+
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return _job_accepted_response(job)
+
+    messages.success(request, f"Fee analysis refresh queued (job #{job.pk}).")
+    return redirect("institutions:fee_analysis")
+
+
+@login_required
+def job_status(request, job_id):
+    """Progress polling endpoint for background jobs of the user's institution."""
+    institution = get_institution_context(request).institution
+    if institution is None:
+        raise Http404("No institution profile")
+    # Jobs of other institutions look exactly like missing ones
+    job = get_object_or_404(InstitutionJob, pk=job_id, institution=institution)
+    return JsonResponse(job_status_payload(job))
+
+
+def _job_accepted_response(job):
+    """202 response pointing the client at the job's polling URL."""
+    payload = job_status_payload(job)
+    payload["status_url"] = reverse("institutions:job_status", args=[job.pk])
+    return JsonResponse(payload, status=202)
+
+
 @login_required
 def profile_management(request):
     """Institution profile view/update."""
@@ -992,22 +972,77 @@ def fee_reports(request):
     
     # Get assignments
     assignments = StudentFeeAssignment.objects.filter(
-        student__institution=institution,
+        institution=institution,
         academic_year=active_year
     ) if active_year else StudentFeeAssignment.objects.none()
     
     # Calculate statistics
-    total_billed = assignments.aggregate(Sum("total_fees"))["total_fees__sum"] or 0
-    total_paid = assignments.aggregate(Sum("amount_paid"))["amount_paid__sum"] or 0
-    
+    stats = cached_for_institution(
+        institution, "fee-stats", lambda: FeeStatistics.for_queryset(assignments), active_year and active_year.pk
+    )
+
     context = {
         "institution": institution,
         "active_year": active_year,
-        "total_billed": total_billed,
-        "total_paid": total_paid,
-        "total_outstanding": total_billed - total_paid,
-        "collection_rate": (total_paid / total_billed * 100) if total_billed > 0 else 0,
-        "assignments": assignments.order_by("-created_at"),
+        "total_billed": stats.total_billed,
+        "total_paid": stats.total_paid,
+        "total_outstanding": stats.total_outstanding,
+        "collection_rate": stats.collection_rate,
+        "assignment_count": stats.assignment_count,
+        # The full list is available through the streamed exports
+        "assignments": assignments.select_related("student", "academic_year").order_by("-created_at")[:REPORT_PREVIEW_ROWS],
+        "payment_statuses": StudentFeeAssignment.PAYMENT_STATUS_CHOICES,
     }
     
     return render(request, "institutions/reports.html", context)
+
+
+@login_required
+@require_role("admin", "principal", "bursar", "accountant")
+def export_fee_report(request, file_format):
+    """Download fee assignments as a streamed CSV or XLSX file."""
+    institution = get_institution_or_404(request)
+    
+    if file_format not in EXPORT_CONTENT_TYPES:
+        messages.error(request, "Unsupported export format.")
+        return redirect("institutions:reports")
+    
+    # Active academic year unless another one is requested
+    academic_years = AcademicYear.objects.filter(institution=institution)
+    year_id = request.GET.get("year", "")
+    if year_id.isdigit():
+        academic_year = academic_years.filter(pk=year_id).first()
+    else:
+        academic_year = academic_years.filter(is_active=True).first()
+    if not academic_year:
+        messages.error(request, "There is no academic year to export.")
+        return redirect("institutions:reports")
+    
+    assignments = StudentFeeAssignment.objects.filter(
+        institution=institution,
+        academic_year=academic_year,
+    )
+    status = request.GET.get("status", "")
+    if status in dict(StudentFeeAssignment.PAYMENT_STATUS_CHOICES):
+        assignments = assignments.filter(payment_status=status)
+    if request.GET.get("overdue") == "1":
+        assignments = assignments.filter(is_overdue=True)
+    
+    InstitutionAuditLog.objects.create(
+        institution=institution,
+        actor=request.user,
+        action="report_exported",
+        entity_type="StudentFeeAssignment",
+        description=f"Exported {academic_year.year_code} fee report as {file_format.upper()}",
+        changes={"academic_year": academic_year.pk, "status": status, "overdue": request.GET.get("overdue") == "1"},
+    )
+    
+    rows = iter_export_rows(assignments.order_by("student__full_name", "pk"))
+    filename = f"fee-report-{slugify(academic_year.year_code)}.{file_format}"
+    if file_format == "csv":
+        response = StreamingHttpResponse(stream_csv(rows), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        write_xlsx(rows), as_attachment=True, filename=filename, content_type=EXPORT_CONTENT_TYPES["xlsx"]
+    )
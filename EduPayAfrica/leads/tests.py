@@ -1,3 +1,23 @@
+from django.core import mail
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.models import OutboxEmail
+
+from .models import DemoRequest
+
+
+class BookDemoTests(TestCase):
+    def test_booking_queues_confirmation_email(self):
+        response = self.client.post(reverse("demo"), {
+            "full_name": "Baraka Otieno", "email": "baraka@college.test", "phone": "+254700000001",
+            "job_title": "bursar", "institution_name": "Nairobi College", "institution_type": "college",
+            "student_count": "500_1000", "country": "Kenya", "challenge": "tracking",
+            "preferred_time": "morning", "agree": "on",
+        })
+        self.assertRedirects(response, reverse("demo"))
+        self.assertTrue(DemoRequest.objects.filter(email="baraka@college.test").exists())
+
+        # Nothing is sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().recipient, "baraka@college.test")
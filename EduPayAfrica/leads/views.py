@@ -1,9 +1,8 @@
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
 from django.http import JsonResponse
+from core.outbox import queue_email
 from .models import DemoRequest
 
 @require_http_methods(["GET", "POST"])
@@ -78,7 +77,7 @@ def book_demo(request):
     return render(request, 'leads/demo.html')
 
 def send_confirmation_email(full_name, email):
-    """Send automated confirmation email to demo requestor"""
+    """Queue automated confirmation email to demo requestor"""
     subject = "Welcome to EduPay Africa - Demo Request Confirmed"
     message = f"""Hello {full_name},
 
@@ -94,14 +93,4 @@ Best regards,
 The EduPay Africa Team
 """
     
-    try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        # Log error but don't fail the form submission
-        print(f"Error sending confirmation email: {e}")
+    queue_email(subject, message, email)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PlatformAdminConfig(AppConfig):
     name = 'platform_admin'
+
+    def ready(self):
+        # Provision PlatformUserProfile rows at user creation and login
+        from . import signals  # noqa: F401
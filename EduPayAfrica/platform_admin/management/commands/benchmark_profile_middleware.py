@@ -0,0 +1,152 @@
+"""
+Django management command to benchmark PlatformUserProfileMiddleware
+Usage: python manage.py benchmark_profile_middleware [--rps 200] [--requests 2000] [--touch-profile]
+
+Replays authenticated requests through the session, authentication and
+profile middleware at a fixed rate, once with the previous get_or_create
+middleware and once with the lazy accessor, and reports the queries each
+request issued. All data is created inside a transaction that is rolled back.
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from EduPayAfrica.middleware import PlatformUserProfileMiddleware
+from platform_admin.models import PlatformUserProfile
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Raised to discard benchmark data once measurements are taken."""
+
+
+class LegacyPlatformUserProfileMiddleware:
+    """The previous middleware: get_or_create on every authenticated request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.user.is_authenticated:
+            PlatformUserProfile.objects.get_or_create(user=request.user)
+        return self.get_response(request)
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request queries of the eager and lazy platform profile middleware under paced load'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rps',
+            type=int,
+            default=200,
+            help='Target requests per second'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requests to replay per middleware'
+        )
+        parser.add_argument(
+            '--touch-profile',
+            action='store_true',
+            help='Make the view read request.platform_profile (default: it does not)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rps'] < 1 or options['requests'] < 1:
+            raise CommandError('--rps and --requests must be positive')
+
+        profile_table = PlatformUserProfile._meta.db_table
+        self.stdout.write(
+            f"{'middleware':<10}{'requests':>10}{'rps':>8}{'queries/req':>13}{'profile q/req':>15}"
+            f"{'mean ms':>10}{'p95 ms':>9}"
+        )
+
+        rows = {}
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='bench-profile', email='bench-profile@edupay.test')
+                session_key = self.open_session(user)
+                for label, middleware in (('legacy', LegacyPlatformUserProfileMiddleware), ('lazy', PlatformUserProfileMiddleware)):
+                    rows[label] = self.replay(middleware, session_key, profile_table, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        for label, row in rows.items():
+            self.stdout.write(
+                f"{label:<10}{row['requests']:>10}{row['rps']:>8.0f}{row['queries']:>13.2f}"
+                f"{row['profile_queries']:>15.2f}{row['mean_ms']:>10.2f}{row['p95_ms']:>9.2f}"
+            )
+
+        saved = rows['legacy']['queries'] - rows['lazy']['queries']
+        self.stdout.write(self.style.SUCCESS(
+            f"Lazy profile loading saves {saved:.2f} queries per request, "
+            f"{saved * options['rps']:,.0f} queries/sec at {options['rps']} rps"
+        ))
+
+    def open_session(self, user):
+        """Create a logged-in session for `user` the way django.contrib.auth.login does."""
+        session = SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    def replay(self, middleware, session_key, profile_table, options):
+        touch_profile = options['touch_profile']
+
+        def view(request):
+            if touch_profile:
+                # Views used request.user.platform_profile before the lazy accessor existed
+                profile = getattr(request, 'platform_profile', None) or request.user.platform_profile
+                profile.role
+            return HttpResponse('ok')
+
+        handler = SessionMiddleware(AuthenticationMiddleware(middleware(view)))
+        factory = RequestFactory()
+        interval = 1 / options['rps']
+        latencies = []
+        queries = profile_queries = 0
+
+        started = time.perf_counter()
+        for i in range(options['requests']):
+            # Pace requests on a fixed schedule so the run approximates the target rate
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            request = factory.get('/')
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                handler(request)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            queries += len(captured)
+            profile_queries += sum(profile_table in query['sql'] for query in captured.captured_queries)
+        elapsed = time.perf_counter() - started
+
+        count = options['requests']
+        return {
+            'requests': count,
+            'rps': count / elapsed,
+            'queries': queries / count,
+            'profile_queries': profile_queries / count,
+            'mean_ms': statistics.fmean(latencies),
+            'p95_ms': statistics.quantiles(latencies, n=20)[-1] if count > 1 else latencies[0],
+        }
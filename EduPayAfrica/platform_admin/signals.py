@@ -0,0 +1,30 @@
+"""
+Signal handlers for the platform admin app.
+Connected when the app is ready (see apps.py).
+
+Every user gets a PlatformUserProfile when the account is created, and
+accounts that predate this (or were created with signals bypassed) get one
+at their next login, so request handling never has to write one.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .utils import get_or_create_user_profile
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def provision_profile_on_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        get_or_create_user_profile(instance)
+
+
+@receiver(user_logged_in)
+def provision_profile_on_login(sender, request, user, **kwargs):
+    profile = get_or_create_user_profile(user)
+    if request is not None:
+        request.platform_profile = profile
@@ -1,3 +1,33 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from EduPayAfrica.middleware import PlatformUserProfileMiddleware
+from .models import PlatformUserProfile
+
+User = get_user_model()
+
+
+class PlatformProfileProvisioningTests(TestCase):
+	def test_profile_created_with_user(self):
+		user = User.objects.create_user(username="new-user", email="new@edupay.test")
+		self.assertTrue(PlatformUserProfile.objects.filter(user=user).exists())
+
+	def test_login_provisions_missing_profile(self):
+		user = User.objects.create_user(username="legacy-user", password="pass-1234")
+		PlatformUserProfile.objects.filter(user=user).delete()
+		self.assertTrue(self.client.login(username="legacy-user", password="pass-1234"))
+		self.assertTrue(PlatformUserProfile.objects.filter(user=user).exists())
+
+	def test_middleware_loads_profile_only_on_access(self):
+		user = User.objects.create_user(username="lazy-user")
+		request = RequestFactory().get("/")
+		request.user = user
+		middleware = PlatformUserProfileMiddleware(lambda request: HttpResponse())
+
+		with self.assertNumQueries(0):
+			middleware(request)
+		with self.assertNumQueries(1):
+			self.assertEqual(request.platform_profile.user_id, user.pk)
+			# Shared with the user relation and cached for the rest of the request
+			self.assertEqual(request.user.platform_profile.pk, request.platform_profile.pk)
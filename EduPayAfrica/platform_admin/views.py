@@ -456,12 +456,15 @@ def user_oversight(request):
 					is_active=True,
 				)
 
-				PlatformUserProfile.objects.create(
+				# The profile is provisioned with the user; fill in its role
+				PlatformUserProfile.objects.update_or_create(
 					user=django_user,
-					role=role,
-					institution=institution,
-					is_active=True,
-					notes=f"Created by {request.user.username}",
+					defaults={
+						"role": role,
+						"institution": institution,
+						"is_active": True,
+						"notes": f"Created by {request.user.username}",
+					},
 				)
 
 				AuditLog.record(
@@ -738,12 +741,14 @@ def institution_admins(request):
 			if institution_id:
 				institution = get_object_or_404(Institution, pk=institution_id)
 			
-			profile = PlatformUserProfile.objects.create(
+			profile, _ = PlatformUserProfile.objects.update_or_create(
 				user=user,
-				role="institution_admin",
-				institution=institution,
-				notes=notes,
-				is_active=True
+				defaults={
+					"role": "institution_admin",
+					"institution": institution,
+					"notes": notes,
+					"is_active": True,
+				},
 			)
 			
 			AuditLog.record(